@@ -1,37 +1,118 @@
 -- ============================================================================
--- QUICK FIX: Add match_documents function to enable /ask endpoint
+-- match_documents: the vector search function behind /ask
 -- ============================================================================
--- Run this in Supabase SQL Editor to fix the search functionality
+-- The one definition of match_documents. Run this in Supabase SQL Editor
+-- after setup_supabase.sql, and again whenever a migration says so; every
+-- statement is idempotent. It works on either embedding column type
+-- (VECTOR(384), or HALFVEC(384) after migrate_halfvec.sql): the type is read
+-- from the catalog on each call, so converting the column needs no new copy.
 -- ============================================================================
 
+-- Earlier signatures (PostgREST must see a single function)
+DROP FUNCTION IF EXISTS match_documents(VECTOR(384), INT);
+DROP FUNCTION IF EXISTS match_documents(VECTOR(384), INT, INT, INT);
+DROP FUNCTION IF EXISTS match_documents(VECTOR(384), INT, INT, INT, TEXT);
+DROP FUNCTION IF EXISTS match_documents(VECTOR(384), INT, INT, INT, TEXT, INT);
+
 CREATE OR REPLACE FUNCTION match_documents (
     query_embedding VECTOR(384),
-    match_count INT DEFAULT 5
+    match_count INT DEFAULT 5,
+    ivfflat_probes INT DEFAULT NULL,
+    hnsw_ef_search INT DEFAULT NULL,
+    target_collection TEXT DEFAULT 'public__default',
+    route_count INT DEFAULT NULL,
+    return_embeddings BOOLEAN DEFAULT FALSE
 )
 RETURNS TABLE (
     id TEXT,
     text TEXT,
     metadata JSONB,
-    similarity FLOAT
+    similarity FLOAT,
+    embedding VECTOR(384)  -- NULL unless return_embeddings (for reranking)
 )
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    routed TEXT[];
+    column_type TEXT;  -- 'vector(384)' or 'halfvec(384)'
+    ranking TEXT;
 BEGIN
-    RETURN QUERY
-    SELECT
-        pdf_qa_collection.id,
-        pdf_qa_collection.text,
-        pdf_qa_collection.metadata,
-        1 - (pdf_qa_collection.embedding <=> query_embedding) AS similarity
-    FROM pdf_qa_collection
-    ORDER BY pdf_qa_collection.embedding <=> query_embedding
-    LIMIT match_count;
+    -- Transaction-local: only affects this call
+    IF ivfflat_probes IS NOT NULL THEN
+        PERFORM set_config('ivfflat.probes', ivfflat_probes::text, true);
+    END IF;
+    IF hnsw_ef_search IS NOT NULL THEN
+        PERFORM set_config('hnsw.ef_search', hnsw_ef_search::text, true);
+    END IF;
+
+    -- Two-level retrieval: the route_count documents with the nearest centroid
+    IF route_count IS NOT NULL THEN
+        SELECT array_agg(r.doc_id ORDER BY r.distance) INTO routed
+        FROM (
+            SELECT c.doc_id, min(c.embedding <=> query_embedding) AS distance
+            FROM document_centroids c
+            WHERE c.collection = target_collection
+            GROUP BY c.doc_id
+            ORDER BY distance
+            LIMIT route_count + 1
+        ) r;
+        -- No more documents than route_count: routing would not narrow the search
+        IF coalesce(array_length(routed, 1), 0) <= route_count THEN
+            routed := NULL;
+        ELSE
+            routed := routed[1:route_count];
+            -- Documents without a centroid (ingested before routing, or whose centroids
+            -- failed to save) cannot be routed to, so they are always searched. Their
+            -- doc_ids come from a skip scan of the doc_id index: one probe per document.
+            WITH RECURSIVE ids AS (
+                (SELECT p.doc_id FROM pdf_qa_collection p
+                 WHERE p.collection = target_collection AND p.doc_id IS NOT NULL
+                 ORDER BY p.doc_id LIMIT 1)
+                UNION ALL
+                SELECT (SELECT p.doc_id FROM pdf_qa_collection p
+                        WHERE p.collection = target_collection AND p.doc_id > ids.doc_id
+                        ORDER BY p.doc_id LIMIT 1)
+                FROM ids
+                WHERE ids.doc_id IS NOT NULL
+            )
+            SELECT routed || coalesce(array_agg(ids.doc_id), '{}') INTO routed
+            FROM ids
+            WHERE ids.doc_id IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM document_centroids c
+                            WHERE c.collection = target_collection AND c.doc_id = ids.doc_id);
+        END IF;
+    END IF;
+
+    -- The query is compared in the column's own type, so the vector index applies
+    SELECT format_type(a.atttypid, a.atttypmod) INTO column_type
+    FROM pg_attribute a
+    WHERE a.attrelid = 'pdf_qa_collection'::regclass AND a.attname = 'embedding';
+    ranking := format('(t.embedding <=> $1::%s)', column_type);
+
+    -- EXECUTE plans with the actual arguments: the collection prunes to one partition
+    RETURN QUERY EXECUTE format(
+        'SELECT t.id, t.text, t.metadata, 1 - %1$s AS similarity,
+                CASE WHEN $2 THEN t.embedding::vector(384) END
+         FROM pdf_qa_collection t
+         WHERE t.collection = $3
+         AND t.embedding IS NOT NULL %2$s
+         ORDER BY %3$s
+         LIMIT $4',
+        ranking,
+        -- near-duplicates are stored as references (no embedding); routed:
+        -- exact ranking of the routed documents' chunks (found through the
+        -- doc_id index), "+ 0" keeping the planner off the ANN index, which
+        -- would rank the whole partition and then filter
+        CASE WHEN routed IS NOT NULL THEN 'AND t.doc_id = ANY ($5)' ELSE '' END,
+        CASE WHEN routed IS NOT NULL THEN ranking || ' + 0' ELSE ranking END
+    )
+    USING query_embedding, return_embeddings, target_collection, match_count, routed;
 END;
 $$;
 
 -- Verify the function was created
-SELECT routine_name 
-FROM information_schema.routines 
+SELECT routine_name
+FROM information_schema.routines
 WHERE routine_name = 'match_documents';
 
 -- ============================================================================
@@ -0,0 +1 @@
+"""Offline benchmarks: run the RAG pipeline against local stand-ins for Cohere, Groq and Supabase."""
@@ -0,0 +1,90 @@
+"""
+Deterministic PDF corpora for benchmarks.
+
+PDFs are written directly (no reportlab needed) so every run sees exactly
+the same bytes. Pages carry a running header/footer and a repeated
+disclaimer, like real manuals and reports.
+"""
+import os
+import random
+from typing import List
+
+WORDS = (
+    "data model system learning network memory vector search query answer "
+    "document page index chunk embedding token latency throughput cache "
+    "database server request response storage policy process report user "
+    "analysis result method training feature signal cluster metric value"
+).split()
+
+DISCLAIMER = "This document is provided for information purposes only and may change without notice."
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng: random.Random, page_num: int, title: str, lines_per_page: int) -> List[str]:
+    lines = [f"{title} - Technical Report"]
+    for _ in range(lines_per_page):
+        words = rng.choices(WORDS, k=rng.randint(8, 14))
+        lines.append(" ".join(words).capitalize() + ".")
+    if page_num % 3 == 0:
+        lines.append(DISCLAIMER)
+    lines.append(f"Page {page_num}")
+    return lines
+
+
+def write_pdf(path: str, pages: int, seed: int = 42, lines_per_page: int = 40, title: str = "Benchmark Corpus"):
+    """Write a text-only PDF with `pages` pages of seeded pseudo-prose."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    
+    for page_num in range(1, pages + 1):
+        lines = _page_lines(rng, page_num, title, lines_per_page)
+        content = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = content.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+    
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+
+# Fixed corpora: name -> (pages, seed)
+CORPORA = {
+    "small": (10, 1),
+    "medium": (100, 2),
+    "large": (500, 3),
+}
+
+
+def build_corpus(name: str, directory: str = "benchmarks/.corpus") -> str:
+    """Return the path of a fixed corpus PDF, generating it on first use."""
+    pages, seed = CORPORA[name]
+    path = os.path.join(directory, f"{name}.pdf")
+    if not os.path.exists(path):
+        write_pdf(path, pages=pages, seed=seed, title=f"Corpus {name.title()}")
+    return path
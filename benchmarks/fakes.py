@@ -0,0 +1,457 @@
+"""
+Deterministic local stand-ins for the Cohere, Groq and Supabase clients.
+
+Each fake mimics only the calls this project makes, returns stable results
+(embeddings are hashed bag-of-words vectors, so retrieval still behaves
+sensibly) and sleeps for a configurable latency to model the network.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class LatencyProfile:
+    """Injected latency in seconds (per call unless noted)."""
+    embed: float = 0.05           # Cohere embed call
+    embed_per_text: float = 0.0   # Extra per text in a batch
+    llm_first_token: float = 0.2  # Groq time to first token
+    llm_per_token: float = 0.002  # Groq time per generated token
+    db: float = 0.02              # Supabase request round trip
+    jitter: float = 0.1           # +/- fraction, seeded so runs are repeatable
+    seed: int = 0
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(seconds * factor)
+
+
+NO_LATENCY = LatencyProfile(embed=0, llm_first_token=0, llm_per_token=0, db=0, jitter=0)
+
+
+def fake_embedding(text: str, dimensions: int = 384) -> List[float]:
+    """Stable unit vector from hashed words (shared words -> similar vectors)."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in _WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+# ============================================================================
+# Cohere
+# ============================================================================
+
+class FakeCohereClient:
+    """Stand-in for cohere.Client (embed only)."""
+
+    def __init__(self, api_key: str = None, latency: LatencyProfile = None, **kwargs):
+        self.latency = latency or NO_LATENCY
+        self.calls = 0
+
+    def check_api_key(self):
+        self.latency.sleep(self.latency.embed)
+        return {"valid": True}
+
+    def embed(self, texts: List[str], model: str = None, input_type: str = None, **kwargs):
+        self.calls += 1
+        self.latency.sleep(self.latency.embed + self.latency.embed_per_text * len(texts))
+        return SimpleNamespace(embeddings=[fake_embedding(text) for text in texts])
+
+
+# ============================================================================
+# Groq
+# ============================================================================
+
+class _FakeStream:
+    def __init__(self, tokens: List[str], latency: LatencyProfile):
+        self.tokens = tokens
+        self.latency = latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        self.latency.sleep(self.latency.llm_first_token)
+        for token in self.tokens:
+            self.latency.sleep(self.latency.llm_per_token)
+            delta = SimpleNamespace(content=token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class _FakeCompletions:
+    def __init__(self, owner: "FakeGroq"):
+        self.owner = owner
+
+    def create(self, model: str = None, messages: List[Dict] = None, stream: bool = False,
+               max_tokens: int = 800, **kwargs):
+        self.owner.calls += 1
+        latency = self.owner.latency
+        prompt = " ".join(message["content"] for message in messages or [])
+        prompt_tokens = len(prompt.split())
+        # Answer echoes the start of the prompt's last message, bounded by max_tokens
+        words = (messages[-1]["content"].split() if messages else [])[:min(max_tokens, 120)]
+        tokens = [word + " " for word in words] or ["OK"]
+
+        if stream:
+            return _FakeStream(tokens, latency)
+
+        latency.sleep(latency.llm_first_token + latency.llm_per_token * len(tokens))
+        message = SimpleNamespace(content="".join(tokens).strip())
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(tokens),
+                                total_tokens=prompt_tokens + len(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class FakeGroq:
+    """Stand-in for groq.Groq (chat completions, streaming and non-streaming)."""
+
+    def __init__(self, api_key: str = None, latency: LatencyProfile = None, **kwargs):
+        self.latency = latency or NO_LATENCY
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+        self.models = SimpleNamespace(list=lambda: SimpleNamespace(data=[]))
+
+
+# ============================================================================
+# Supabase
+# ============================================================================
+
+def _as_vector(value):
+    """Parse pgvector text literals the way Postgres casts them; lists pass through."""
+    if isinstance(value, str):
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return value
+
+
+class _FakeQuery:
+    """Chainable table query supporting the PostgREST builder calls used in src/."""
+
+    def __init__(self, db: "FakeSupabaseClient", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.count = None
+        self.payload = None
+        self.filters = []
+        self.order_by = None
+        self.limit_n = None
+
+    # --- actions ---
+    def select(self, columns: str = "*", count: str = None):
+        self.action, self.columns, self.count = "select", columns, count
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self.action, self.payload = "upsert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values: Dict):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # --- filters ---
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def in_(self, column, values):
+        allowed = set(values)
+        self.filters.append(lambda row: row.get(column) in allowed)
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, n: int):
+        self.limit_n = n
+        return self
+
+    def _matches(self, row: Dict) -> bool:
+        return all(check(row) for check in self.filters)
+
+    def execute(self):
+        db = self.db
+        db.latency.sleep(db.latency.db)
+        with db.lock:
+            db.calls += 1
+            if self.table in db.views:
+                rows = {i: row for i, row in enumerate(db.views[self.table](db))}
+            else:
+                rows = db.tables.setdefault(self.table, {})
+            columns = db.primary_keys.get(self.table, ("id",))
+
+            def key(row):
+                return tuple(row[c] for c in columns)
+
+            if self.action in ("upsert", "insert"):
+                if self.table == "pdf_qa_collection":
+                    missing = {row.get("collection") for row in self.payload} - db.partitions
+                    if missing:
+                        raise Exception(f"no partition of relation \"pdf_qa_collection\" found for row: {missing}")
+                for row in self.payload:
+                    stored = dict(row)
+                    if "embedding" in stored:
+                        stored["embedding"] = _as_vector(stored["embedding"])
+                    rows[key(row)] = stored
+                return SimpleNamespace(data=list(self.payload), count=None)
+
+            if self.action == "update":
+                updated = []
+                for row in rows.values():
+                    if self._matches(row):
+                        row.update(self.payload)
+                        updated.append(dict(row))
+                return SimpleNamespace(data=updated, count=None)
+
+            matched = [row for row in rows.values() if self._matches(row)]
+
+            if self.action == "delete":
+                for row in matched:
+                    del rows[key(row)]
+                return SimpleNamespace(data=matched, count=None)
+
+            if self.order_by:
+                column, desc = self.order_by
+                matched.sort(key=lambda row: row.get(column), reverse=desc)
+            total = len(matched)
+            if self.limit_n is not None:
+                matched = matched[:self.limit_n]
+            if self.columns != "*":
+                wanted = [c.strip() for c in self.columns.split(",")]
+                matched = [{c: row.get(c) for c in wanted} for row in matched]
+            else:
+                matched = [dict(row) for row in matched]
+            return SimpleNamespace(data=matched, count=total if self.count else None)
+
+
+class _FakeRPC:
+    def __init__(self, db: "FakeSupabaseClient", name: str, params: Dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        db = self.db
+        db.latency.sleep(db.latency.db)
+        handler = db.functions.get(self.name)
+        if handler is None:
+            raise Exception(f"Could not find the function public.{self.name}")
+        with db.lock:
+            db.calls += 1
+            return SimpleNamespace(data=handler(db, **self.params), count=None)
+
+
+def _cosine(rows: List[Dict], query) -> np.ndarray:
+    matrix = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+    query = np.asarray(_as_vector(query), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+    return matrix @ query / np.where(norms == 0, 1.0, norms)
+
+
+def _route(db: "FakeSupabaseClient", query_embedding, target_collection: str, route_count: int):
+    """Doc ids of the route_count documents with the nearest centroid, or None if that is all of them."""
+    centroids = [row for row in db.tables.get("document_centroids", {}).values()
+                 if row["collection"] == target_collection]
+    if not centroids:
+        return None
+    best: Dict[str, float] = {}
+    for row, similarity in zip(centroids, _cosine(centroids, query_embedding)):
+        best[row["doc_id"]] = max(best.get(row["doc_id"], -1.0), float(similarity))
+    if len(best) <= route_count:
+        return None
+    return set(sorted(best, key=best.get, reverse=True)[:route_count])
+
+
+def _match_documents(db: "FakeSupabaseClient", query_embedding, match_count: int = 5,
+                     target_collection: str = "public__default", route_count: int = None,
+                     return_embeddings: bool = False, table: str = "pdf_qa_collection", **kwargs):
+    """Exact cosine search over one collection (routed like the SQL function), same result shape."""
+    routed = _route(db, query_embedding, target_collection, route_count) if route_count else None
+    collection_rows = [row for row in db.tables.get(table, {}).values()
+                       if row.get("collection") == target_collection]
+    if routed is not None:
+        # Documents without a centroid are always searched
+        with_centroid = {row["doc_id"] for row in db.tables.get("document_centroids", {}).values()
+                         if row["collection"] == target_collection}
+        routed |= {row.get("doc_id") for row in collection_rows
+                   if row.get("doc_id") is not None and row.get("doc_id") not in with_centroid}
+    rows = [row for row in collection_rows
+            if row.get("embedding") is not None and (routed is None or row.get("doc_id") in routed)]
+    db.rows_scanned += len(rows)
+    if not rows:
+        return []
+    similarity = _cosine(rows, query_embedding)
+    top = np.argsort(-similarity)[:match_count]
+    return [
+        {"id": rows[i]["id"], "text": rows[i]["text"], "metadata": rows[i].get("metadata", {}),
+         "similarity": float(similarity[i]),
+         # PostgREST returns vector columns as pgvector text literals
+         "embedding": "[" + ",".join(map(repr, rows[i]["embedding"].tolist())) + "]" if return_embeddings else None}
+        for i in top
+    ]
+
+
+def _document_registry_stats(db: "FakeSupabaseClient") -> List[Dict]:
+    """Same aggregates as the document_registry_stats SQL view."""
+    stats: Dict[str, Dict] = {}
+    for row in db.tables.get("document_registry", {}).values():
+        entry = stats.setdefault(row["collection"], {"collection": row["collection"], "documents": 0,
+                                                      "chunks": 0, "pages": 0, "bytes": 0, "last_ingested_at": None})
+        entry["documents"] += 1
+        for column in ("chunks", "pages", "bytes"):
+            entry[column] += row.get(column) or 0
+        entry["last_ingested_at"] = max(filter(None, (entry["last_ingested_at"], row.get("ingested_at"))), default=None)
+    return list(stats.values())
+
+
+def _create_collection(db: "FakeSupabaseClient", target_collection: str, **kwargs):
+    db.partitions.add(target_collection)
+    return None
+
+
+def _delete_document_chunks(db: "FakeSupabaseClient", target_doc_id: str, batch_size: int = 1000,
+                            target_collection: str = "public__default", table: str = "pdf_qa_collection",
+                            **kwargs) -> int:
+    rows = db.tables.get(table, {})
+    # Near-duplicates in other documents take over the embedding of the chunk they reference
+    embeddings = {row["id"]: row.get("embedding") for row in rows.values()
+                  if row.get("collection") == target_collection and row.get("doc_id") == target_doc_id}
+    for row in rows.values():
+        if (row.get("collection") == target_collection and row.get("duplicate_of") in embeddings
+                and row.get("doc_id") != target_doc_id):
+            row["embedding"], row["duplicate_of"] = embeddings[row["duplicate_of"]], None
+    doomed = [key for key, row in rows.items()
+              if row.get("collection") == target_collection and row.get("doc_id") == target_doc_id][:batch_size]
+    for key in doomed:
+        del rows[key]
+    return len(doomed)
+
+
+def _truncate_collection(db: "FakeSupabaseClient", target_collection: str = "public__default",
+                         table: str = "pdf_qa_collection", **kwargs):
+    for rows in (db.tables.get(table, {}), db.tables.get("document_registry", {}),
+                 db.tables.get("document_centroids", {})):
+        for key in [key for key, row in rows.items() if row.get("collection") == target_collection]:
+            del rows[key]
+    db.tables.get("vector_index_meta", {}).pop((f"{table}__{target_collection}",), None)
+    return None
+
+
+def _reset_collection_index(db: "FakeSupabaseClient", target_collection: str = "public__default",
+                            table: str = "pdf_qa_collection", **kwargs):
+    if any(row.get("collection") == target_collection for row in db.tables.get(table, {}).values()):
+        raise Exception(f"collection {target_collection} is not empty")
+    db.tables.get("vector_index_meta", {}).pop((f"{table}__{target_collection}",), None)
+    return None
+
+
+class FakeSupabaseClient:
+    """Stand-in for supabase.Client: in-memory tables plus the project's RPC functions."""
+
+    def __init__(self, latency: LatencyProfile = None):
+        self.latency = latency or NO_LATENCY
+        self.tables: Dict[str, Dict] = {}
+        self.primary_keys: Dict[str, tuple] = {
+            "pdf_qa_collection": ("collection", "id"),
+            "document_registry": ("collection", "doc_id"),
+            "vector_index_meta": ("table_name",),
+            "document_centroids": ("collection", "doc_id", "section"),
+        }
+        self.partitions = {"public__default"}  # Collections with a partition (create_collection)
+        self.functions = {
+            "create_collection": _create_collection,
+            "match_documents": _match_documents,
+            "delete_document_chunks": _delete_document_chunks,
+            "truncate_collection": _truncate_collection,
+            "reset_collection_index": _reset_collection_index,
+        }
+        self.views = {"document_registry_stats": _document_registry_stats}
+        self.lock = threading.RLock()
+        self.calls = 0
+        self.rows_scanned = 0  # Chunks ranked by match_documents (routing effectiveness)
+        # Only read and replaced by src.transport.share_postgrest_session; never sends
+        self.postgrest = SimpleNamespace(session=httpx.Client(base_url="http://localhost/rest/v1"))
+
+    def table(self, name: str) -> _FakeQuery:
+        return _FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict = None) -> _FakeRPC:
+        return _FakeRPC(self, name, params or {})
+
+
+# ============================================================================
+# Installation
+# ============================================================================
+
+def install_fakes(latency: LatencyProfile = None) -> Dict:
+    """
+    Route the project's client constructors to the fakes.
+
+    Call before constructing RAGSystem. Returns the shared fake instances so
+    callers can inspect call counts.
+    """
+    # The project imports these SDKs lazily, so patch the SDK modules themselves
+    import cohere
+    import groq
+    import supabase
+
+    latency = latency or LatencyProfile()
+    fakes = {
+        "cohere": FakeCohereClient(latency=latency),
+        "groq": FakeGroq(latency=latency),
+        "supabase": FakeSupabaseClient(latency=latency),
+    }
+
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+    os.environ.setdefault("COHERE_API_KEY", "offline")
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "offline")
+
+    cohere.Client = lambda *args, **kwargs: fakes["cohere"]
+    groq.Groq = lambda *args, **kwargs: fakes["groq"]
+    supabase.create_client = lambda *args, **kwargs: fakes["supabase"]
+    return fakes
+
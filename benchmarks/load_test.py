@@ -0,0 +1,210 @@
+"""
+HTTP load test for the FastAPI app.
+
+Sends an open-loop (Poisson) mix of /ask, /ask-stream and /upload requests
+and records HDR-style latency histograms, time-to-first-byte for streaming
+responses and error rates. By default the app is started in-process on a
+free localhost port with the offline fakes, so no API keys are needed.
+
+Usage:
+    python -m benchmarks.load_test --rate 20 --duration 30
+    python -m benchmarks.load_test --mix ask=0.6,ask-stream=0.3,upload=0.1 --output load.json
+    python -m benchmarks.load_test --url http://localhost:10000   # an already running server
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Dict
+
+import httpx
+
+from benchmarks.corpus import WORDS, build_corpus
+from benchmarks.fakes import LatencyProfile, install_fakes
+from benchmarks.run_benchmark import LATENCY_PROFILES
+from benchmarks.stats import LatencyHistogram, peak_rss_mb
+
+
+class EndpointStats:
+    """Latency, TTFB and error accounting for one request type."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.ttfb = LatencyHistogram()
+        self.errors = 0
+        self.status_codes: Dict[str, int] = {}
+
+    def report(self) -> Dict:
+        total = self.latency.total + self.errors
+        report = {
+            "requests": total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "status_codes": self.status_codes,
+            "latency": self.latency.summary(),
+            "latency_histogram": self.latency.buckets(),
+        }
+        if self.ttfb.total:
+            report["ttfb"] = self.ttfb.summary()
+            report["ttfb_histogram"] = self.ttfb.buckets()
+        return report
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"ask", "ask-stream", "upload"}
+    if unknown:
+        raise ValueError(f"Unknown request types: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _question(rng: random.Random) -> Dict:
+    return {"question": f"What does the report say about {rng.choice(WORDS)}?", "threshold": 0.95}
+
+
+async def _send(client: httpx.AsyncClient, kind: str, stats: EndpointStats, rng: random.Random,
+                pdf_bytes: bytes, sequence: int):
+    start = time.perf_counter()
+    try:
+        if kind == "ask":
+            response = await client.post("/ask", json=_question(rng))
+        elif kind == "upload":
+            files = {"file": (f"load_{sequence}.pdf", pdf_bytes, "application/pdf")}
+            response = await client.post("/upload", files=files)
+        else:
+            async with client.stream("POST", "/ask-stream", json=_question(rng)) as response:
+                first = True
+                async for _ in response.aiter_bytes():
+                    if first:
+                        stats.ttfb.record(time.perf_counter() - start)
+                        first = False
+        code = str(response.status_code)
+        stats.status_codes[code] = stats.status_codes.get(code, 0) + 1
+        if response.status_code >= 400:
+            stats.errors += 1
+            return
+        stats.latency.record(time.perf_counter() - start)
+    except Exception as e:
+        name = type(e).__name__
+        stats.status_codes[name] = stats.status_codes.get(name, 0) + 1
+        stats.errors += 1
+
+
+async def run_load(base_url: str, rate: float, duration: float, mix: Dict[str, float],
+                   max_inflight: int, seed: int, timeout: float) -> Dict:
+    """Drive Poisson arrivals at `rate` req/s for `duration` seconds."""
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    stats = {kind: EndpointStats() for kind in kinds}
+    with open(build_corpus("small"), "rb") as f:
+        pdf_bytes = f.read()
+
+    limits = httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+    inflight = asyncio.Semaphore(max_inflight)
+    tasks = []
+    dropped = 0
+
+    async def guarded(kind: str, sequence: int):
+        try:
+            await _send(client, kind, stats[kind], rng, pdf_bytes, sequence)
+        finally:
+            inflight.release()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        next_arrival = start
+        sequence = 0
+        while next_arrival - start < duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            kind = rng.choices(kinds, weights)[0]
+            if inflight.locked():
+                # Open loop: an arrival we cannot send is an error, not a delay
+                dropped += 1
+                stats[kind].errors += 1
+                stats[kind].status_codes["dropped"] = stats[kind].status_codes.get("dropped", 0) + 1
+            else:
+                await inflight.acquire()
+                tasks.append(asyncio.create_task(guarded(kind, sequence)))
+            sequence += 1
+            next_arrival += rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    completed = sum(s.latency.total for s in stats.values())
+    errors = sum(s.errors for s in stats.values())
+    return {
+        "target_rate": rate,
+        "duration_s": round(elapsed, 3),
+        "offered_requests": sequence,
+        "completed": completed,
+        "dropped": dropped,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / sequence, 4) if sequence else 0.0,
+        "endpoints": {kind: s.report() for kind, s in stats.items()},
+    }
+
+
+def start_in_process_server(profile: str) -> str:
+    """Start main.app under uvicorn on a free localhost port, backed by the fakes."""
+    import uvicorn
+
+    install_fakes(LatencyProfile(**LATENCY_PROFILES[profile]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP load test for the PDF Q&A API")
+    parser.add_argument("--url", help="Target a running server instead of starting one in-process")
+    parser.add_argument("--latency", default="default", choices=sorted(LATENCY_PROFILES),
+                        help="Fake API latency profile (in-process mode only)")
+    parser.add_argument("--rate", type=float, default=10.0, help="Mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of arrivals")
+    parser.add_argument("--mix", default="ask=0.7,ask-stream=0.25,upload=0.05")
+    parser.add_argument("--max-inflight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    base_url = args.url or start_in_process_server(args.latency)
+    print(f"🚦 Load test: {args.rate} req/s for {args.duration}s against {base_url}", file=sys.stderr)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = asyncio.run(run_load(base_url, args.rate, args.duration, _parse_mix(args.mix),
+                                      args.max_inflight, args.seed, args.timeout))
+    report["mode"] = "external" if args.url else "in-process"
+    report["latency_profile"] = None if args.url else args.latency
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"✓ Report written: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Offline end-to-end benchmark: ingest fixed PDF corpora and time /ask-style queries.
+
+Cohere, Groq and Supabase are replaced by the deterministic fakes in
+benchmarks/fakes.py, so no API keys or network are needed.
+
+Usage:
+    python -m benchmarks.run_benchmark                       # small + medium corpora
+    python -m benchmarks.run_benchmark --corpus large --questions 200
+    python -m benchmarks.run_benchmark --save-baseline       # record current numbers
+    python -m benchmarks.run_benchmark --compare             # fail on regressions
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.corpus import WORDS, build_corpus
+from benchmarks.fakes import LatencyProfile, install_fakes
+from benchmarks.stats import latency_summary, peak_rss_mb
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+LATENCY_PROFILES = {
+    "none": dict(embed=0, llm_first_token=0, llm_per_token=0, db=0, jitter=0),
+    "default": dict(),
+    "slow": dict(embed=0.25, embed_per_text=0.002, llm_first_token=0.8, llm_per_token=0.01, db=0.1),
+}
+
+# metric -> True if higher is better
+COMPARED_METRICS = {
+    "pages_per_sec": True,
+    "chunks_per_sec": True,
+    "ask_p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+# Runs in a fresh interpreter: cold-start cost of `import main` and of the first get_rag()
+_STARTUP_SCRIPT = r'''
+import contextlib, io, json, sys, time
+from benchmarks.stats import peak_rss_mb
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+import_seconds = time.perf_counter() - start
+import_rss_mb = peak_rss_mb()
+sdks = sorted(name for name in ("cohere", "groq", "supabase", "pypdf") if name in sys.modules)
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    main.get_rag()
+print(json.dumps({
+    "import_seconds": round(import_seconds, 3),
+    "import_rss_mb": import_rss_mb,
+    "construct_seconds": round(time.perf_counter() - start, 3),
+    "sdks_imported_at_startup": sdks,
+}))
+'''
+
+
+def _questions(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [f"What does the report say about {rng.choice(WORDS)} and {rng.choice(WORDS)}?" for _ in range(count)]
+
+
+def run_corpus(name: str, profile: str, questions: int, threshold: float, verbose: bool) -> Dict:
+    """Ingest one corpus into a fresh fake database and run the question set."""
+    from src import extraction_cache, spool
+    from src.rag_system import RAGSystem
+
+    fakes = install_fakes(LatencyProfile(**LATENCY_PROFILES[profile]))
+    pdf_path = build_corpus(name)
+    sink = sys.stdout if verbose else io.StringIO()
+    cache_dir = tempfile.TemporaryDirectory()  # Cold extraction cache: the first ingest parses
+
+    with contextlib.redirect_stdout(sink), cache_dir:
+        extraction_cache.configure(cache_dir.name)
+        spool.configure(os.path.join(cache_dir.name, "spool"))
+        rag = RAGSystem(collection_name="pdf_qa_collection")
+
+        start = time.perf_counter()
+        summary = rag.ingest_pdf(pdf_path)
+        ingest_seconds = time.perf_counter() - start
+
+        latencies = []
+        for question in _questions(questions):
+            start = time.perf_counter()
+            rag.ask(question, threshold=threshold)
+            latencies.append(time.perf_counter() - start)
+        api_calls = {
+            "cohere": fakes["cohere"].calls,
+            "groq": fakes["groq"].calls,
+            "supabase": fakes["supabase"].calls,
+        }
+
+        # Same file again (a re-upload or retry): page texts come from the extraction cache
+        start = time.perf_counter()
+        rag.ingest_pdf(pdf_path)
+        reingest_seconds = time.perf_counter() - start
+
+    asks = latency_summary(latencies)
+    return {
+        "pages": summary["pages"],
+        "chunks": summary["chunks"],
+        "ingest_seconds": round(ingest_seconds, 3),
+        "pages_per_sec": round(summary["pages"] / ingest_seconds, 2),
+        "chunks_per_sec": round(summary["chunks"] / ingest_seconds, 2),
+        "reingest_seconds": round(reingest_seconds, 3),
+        "ask_p50_ms": asks["p50_ms"],
+        "ask_p95_ms": asks["p95_ms"],
+        "ask_p99_ms": asks["p99_ms"],
+        "peak_rss_mb": peak_rss_mb(),
+        "api_calls": api_calls,
+    }
+
+
+def measure_startup() -> Dict:
+    """Time `import main` and RAG construction in a fresh process (no network needed)."""
+    env = dict(os.environ, GROQ_API_KEY="offline", SUPABASE_URL="http://localhost",
+               SUPABASE_ANON_KEY="offline", WARMUP_ON_START="false")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT], cwd=root, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> list:
+    """Return a list of human-readable regressions beyond `tolerance` (fraction)."""
+    regressions = []
+    for corpus, results in report["corpora"].items():
+        base = baseline.get("corpora", {}).get(corpus)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), results.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{corpus}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline RAG benchmark")
+    parser.add_argument("--corpus", default="small,medium", help="Comma-separated corpus names")
+    parser.add_argument("--latency", default="default", choices=sorted(LATENCY_PROFILES))
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.95,
+                        help="Distance threshold for ask() (high so fake embeddings use the PDF path)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression (fraction)")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args(argv)
+
+    report = {"latency_profile": args.latency, "questions": args.questions, "corpora": {}}
+    print("📊 Measuring cold start...")
+    report["startup"] = measure_startup()
+    for metric, value in report["startup"].items():
+        print(f"   {metric}: {value}")
+
+    for name in args.corpus.split(","):
+        print(f"📊 Benchmarking corpus '{name}' (latency: {args.latency})...")
+        report["corpora"][name] = run_corpus(name, args.latency, args.questions, args.threshold, args.verbose)
+        for metric, value in report["corpora"][name].items():
+            print(f"   {metric}: {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.latency}.json")
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved: {baseline_path}")
+
+    if args.compare:
+        if not os.path.exists(baseline_path):
+            print(f"⚠️  No baseline at {baseline_path}; run with --save-baseline first")
+            return 1
+        with open(baseline_path) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Regressions:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Small statistics helpers shared by the benchmark and load-test drivers."""
+import math
+import resource
+import sys
+from typing import Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of latencies.
+
+    Values are recorded in microseconds into buckets that keep
+    `precision_bits` of mantissa (7 bits -> under 1% relative error), so
+    memory stays constant no matter how many samples are recorded.
+    """
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max_us = 0
+
+    def _bucket(self, value_us: int) -> int:
+        shift = max(0, value_us.bit_length() - self.precision_bits)
+        # Pack (shift, mantissa) into one sortable int
+        return (shift << self.precision_bits) | (value_us >> shift)
+
+    def _bucket_value(self, bucket: int) -> int:
+        shift = bucket >> self.precision_bits
+        mantissa = bucket & ((1 << self.precision_bits) - 1)
+        # Report the bucket's upper edge
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value_us = max(0, int(seconds * 1_000_000))
+        bucket = self._bucket(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.max_us = max(self.max_us, value_us)
+
+    def percentile_ms(self, pct: float) -> float:
+        if not self.total:
+            return 0.0
+        target = max(1, math.ceil(pct / 100 * self.total))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return round(min(self._bucket_value(bucket), self.max_us) / 1000, 3)
+        return round(self.max_us / 1000, 3)
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.total,
+            "p50_ms": self.percentile_ms(50),
+            "p90_ms": self.percentile_ms(90),
+            "p99_ms": self.percentile_ms(99),
+            "p999_ms": self.percentile_ms(99.9),
+            "max_ms": round(self.max_us / 1000, 3),
+        }
+
+    def buckets(self) -> Dict[str, int]:
+        """Non-empty buckets as {upper_bound_ms: count} for plotting."""
+        return {
+            f"{self._bucket_value(bucket) / 1000:.3f}": self.counts[bucket]
+            for bucket in sorted(self.counts)
+        }
@@ -0,0 +1,27 @@
+-- ============================================================================
+-- MIGRATION: near-duplicate chunks stored as references
+-- ============================================================================
+-- Repeated boilerplate (footers, disclaimers, TOC lines) is detected at
+-- ingest (src/dedup.py) and stored with duplicate_of = the id of the chunk
+-- it repeats and no embedding of its own.
+--
+-- Run this in Supabase SQL Editor on databases created before this change
+-- (after document_routing.sql), then rerun setup_supabase.sql for the new
+-- delete_document_chunks and add_search_function.sql for the new
+-- match_documents.
+-- ============================================================================
+
+-- 1. Reference column (added to every partition) and its index
+ALTER TABLE pdf_qa_collection ADD COLUMN IF NOT EXISTS duplicate_of TEXT;
+
+CREATE INDEX IF NOT EXISTS pdf_qa_collection_duplicate_of_idx
+ON pdf_qa_collection (duplicate_of) WHERE duplicate_of IS NOT NULL;
+
+-- 2. Verify: chunks stored as references, per collection
+SELECT collection, count(*) FILTER (WHERE duplicate_of IS NOT NULL) AS duplicates, count(*) AS chunks
+FROM pdf_qa_collection
+GROUP BY collection;
+
+-- ============================================================================
+-- Existing rows are left as they are; deduplication applies to new ingests.
+-- ============================================================================
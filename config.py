@@ -17,6 +17,36 @@ PDF_CHUNK_SIZE = 300  # Characters per chunk
 PDF_CHUNK_OVERLAP = 50  # Character overlap between chunks
 # Keep at 50 for quality
 
+# Token-based chunk sizing
+CHUNK_SIZE_UNIT = "tokens"  # "tokens" or "chars"
+# Tokens match what Cohere embeds and what Groq's context actually holds
+
+PDF_CHUNK_TOKENS = 128  # Tokens per chunk (when CHUNK_SIZE_UNIT = "tokens")
+# Cohere embed-english-light-v3.0 truncates input at 512 tokens
+# Range: 64-400 (300 chars ≈ 75 tokens)
+
+PDF_CHUNK_OVERLAP_TOKENS = 16  # Token overlap between chunks
+
+TOKENIZER = "approx"  # Token counter used for sizing
+# "approx"              = fast offline estimate (no downloads)
+# "tiktoken:cl100k_base" = exact BPE counts (pip install tiktoken)
+# "hf:<model name>"      = HuggingFace tokenizer (pip install tokenizers)
+
+# Running headers/footers: lines repeated at the top or bottom of pages
+# (titles, confidentiality notes, "Page 3 of 40") are removed before chunking
+BOILERPLATE_STRIP = True
+BOILERPLATE_SAMPLE_PAGES = 8  # Pages held back while learning (then streamed as usual)
+BOILERPLATE_EDGE_LINES = 3  # Lines at each end of a page that may be header/footer
+BOILERPLATE_MIN_REPEATS = 3  # Pages a line must appear on (digits ignored) to be stripped
+
+# Near-duplicate chunks (repeated footers, disclaimers, TOC lines) are stored
+# as references to an earlier chunk instead of being embedded again
+DEDUP_ENABLED = True
+DEDUP_MAX_HAMMING = 3  # SimHash bits (of 64) two chunks may differ by and still count as duplicates
+# 0 = exact duplicates only; above ~6, distinct passages start to collide
+DEDUP_MIN_WORDS = 8  # Shorter chunks are always embedded (too few shingles to fingerprint)
+DEDUP_MAX_FINGERPRINTS = 100000  # Per collection, in memory; the oldest are forgotten first
+
 # Embedding Batch Size (VERY IMPORTANT FOR MEMORY)
 EMBEDDING_BATCH_SIZE = 2  # Texts to embed at once
 # MEMORY USAGE: batch_size * 2KB ≈ 4KB at batch_size=2, 32KB at batch_size=16
@@ -44,6 +74,18 @@ PDF_LOADER_MAX_WORKERS = 1  # Parallel workers for PDF extraction
 API_TIMEOUT = 30  # Seconds
 API_PORT = 10000
 API_WORKERS = 1  # Uvicorn workers (keep at 1 for 500MB)
+API_MAX_WORKERS = 1  # Cap on API_WORKERS and the presets' worker counts
+# Still per process: the memory governor (each worker would budget the whole
+# container), dedup fingerprints and /metrics; raise once those are shared
+
+# Shared HTTP pool (Cohere, Groq and Supabase all use one connection pool)
+HTTP2_ENABLED = True  # Multiplex requests over one connection per host (needs the h2 package)
+HTTP_MAX_CONNECTIONS = 20  # Across all hosts
+HTTP_MAX_KEEPALIVE = 10  # Idle connections kept open for reuse
+HTTP_KEEPALIVE_EXPIRY = 60  # Seconds an idle connection stays open
+# httpx default is 5s: too short between user questions, every /ask paid a new TLS handshake
+HTTP_CONNECT_TIMEOUT = 5  # Seconds
+HTTP_RETRIES = 1  # Retries of failed connection attempts (not of requests)
 
 # LLM Settings
 LLM_MODEL = "llama-3.1-8b-instant"  # Groq model
@@ -54,10 +96,37 @@ LLM_MAX_TOKENS = 800
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIMENSIONS = 384
 
+EMBEDDING_WIRE_FORMAT = "text"  # How embeddings are sent to Supabase
+# "text" = pgvector literal '[0.01233,...]' (~3.3 KB/row), works for vector and halfvec columns
+# "json" = JSON list of floats (~8 KB/row, the old format)
+EMBEDDING_WIRE_DIGITS = 4  # Significant digits in "text" format
+# halfvec stores ~3.3 digits, so 4 loses nothing there; cosine rankings are unaffected for vector
+
 # RAG Search
 RAG_TOP_K = 5  # Number of chunks to retrieve
 RAG_THRESHOLD = 0.7  # Relevance threshold (0-1)
 
+RAG_CONTEXT_TOKEN_BUDGET = 2000  # Max context tokens sent to the LLM
+# Uses token counts stored with each chunk, so no recounting at query time
+# Groq free tier allows ~6000 tokens/minute: keep prompt + answer well below
+
+# Reranking: over-fetch candidates, then keep a relevant and diverse top_k
+# with Maximal Marginal Relevance (see src/reranker.py)
+RERANK_ENABLED = True
+RERANK_CANDIDATES = 4  # Candidates fetched per chunk kept (top_k * this)
+RERANK_MMR_LAMBDA = 0.7  # 1 = relevance only, lower = more diversity
+RERANK_LEXICAL_WEIGHT = 0.2  # Share of relevance from question-term overlap (rest: vector similarity)
+RERANK_REDUNDANT_SIMILARITY = 0.95  # Candidates this similar to a kept chunk are dropped
+
+# Adaptive top_k: questions that don't set top_k get between MIN_K and MAX_K
+# chunks, cut at a similarity cliff or once the kept chunks hold MASS of the
+# relevance (see src/adaptive_k.py); an explicit top_k is used as given
+RAG_ADAPTIVE_K = True
+RAG_ADAPTIVE_MIN_K = 1
+RAG_ADAPTIVE_MAX_K = 8
+RAG_ADAPTIVE_MIN_GAP = 0.05  # Similarity drop between neighbours that counts as a cliff
+RAG_ADAPTIVE_MASS = 0.6  # Share of the relevance mass the kept chunks must cover
+
 # ============================================================================
 # GARBAGE COLLECTION (For Memory Management)
 # ============================================================================
@@ -66,8 +135,18 @@ GC_INTERVAL = 10  # Force garbage collection every N pages
 # Smaller = more GC overhead but freeer memory
 # Recommended: 10-20
 
-GC_AGGRESSIVE = True  # Force GC after every batch
-# Keep True for 500MB deployment
+GC_AGGRESSIVE = False  # Force GC after every batch
+# False = collect only under memory pressure (see GC_PRESSURE_RATIO)
+# Full collections stall concurrent /ask requests, so keep False unless debugging
+
+GC_THRESHOLDS = (10000, 20, 50)  # gc.set_threshold() generations 0/1/2
+# Python default is (700, 10, 10): too many young-generation passes during ingest
+
+GC_FREEZE_AFTER_STARTUP = True  # gc.freeze() once clients are built
+# Long-lived client objects are then never rescanned
+
+GC_PRESSURE_RATIO = 0.85  # Collect when RSS > ratio * MEMORY_WARNING_THRESHOLD
+GC_MIN_INTERVAL_SECONDS = 5  # Never run policy collections more often than this
 
 # ============================================================================
 # CLOUD DEPLOYMENT SETTINGS
@@ -76,6 +155,11 @@ GC_AGGRESSIVE = True  # Force GC after every batch
 # Memory Limits
 MAX_MEMORY_MB = 500  # Your cloud instance memory
 MEMORY_WARNING_THRESHOLD = 400  # Warn if memory usage exceeds this
+# Ingestion shrinks batches and pauses page extraction above this threshold,
+# and grows batches again below 75% of it
+
+MEMORY_PAUSE_POLL_SECONDS = 0.5  # Re-check interval while extraction is paused
+MEMORY_MAX_PAUSE_SECONDS = 30  # Resume at minimum batch size after this long
 
 # File Size Limits
 MAX_UPLOAD_SIZE_MB = 100  # Maximum file upload size
@@ -92,6 +176,15 @@ MAX_CONCURRENT_UPLOADS = 1  # Only process 1 PDF at a time
 PDF_PROCESSING_TIMEOUT = 300  # 5 minutes in seconds
 # Increase if processing large PDFs
 
+# Resumable ingestion: progress is checkpointed and the uploaded file kept until
+# its ingest completes, so a failure or restart resumes instead of starting over
+INGEST_CHECKPOINT_DIR = ".cache/checkpoints"
+INGEST_CHECKPOINT_PAGES = 25  # Pages between checkpoints (each one flushes pending rows)
+# Smaller = less work redone after a failure, more (small) writes
+INGEST_RESUME_ON_START = True  # Resume unfinished ingests in the background at startup
+INGEST_MAX_ATTEMPTS = 3  # After this many failed attempts a job is marked failed and not resumed
+# Re-uploading the PDF starts it again from its checkpoint with a fresh attempt count
+
 # ============================================================================
 # CACHE SETTINGS (Optional - Uncomment if using)
 # ============================================================================
@@ -101,16 +194,71 @@ PDF_PROCESSING_TIMEOUT = 300  # 5 minutes in seconds
 # CACHE_MAX_EMBEDDINGS = 1000
 # CACHE_MAX_ANSWERS = 500
 
+# PDF extraction cache: page texts on disk, keyed by file SHA-256 + loader version
+# Re-uploads and retried ingests skip PDF parsing entirely
+EXTRACTION_CACHE_ENABLED = True
+EXTRACTION_CACHE_DIR = ".cache/extraction"
+EXTRACTION_CACHE_MAX_MB = 200  # Least recently used entries are evicted above this
+# Entries are zlib-compressed (plain text compresses ~3-4x)
+
 # ============================================================================
 # DATABASE SETTINGS
 # ============================================================================
 
 DB_COLLECTION_NAME = "pdf_qa_collection"
 DB_BATCH_INSERT_SIZE = 100  # Insert this many at once
+# PostgREST: default upsert batch (AUTO_TUNE presets set their own)
+# Postgres writer: rows per COPY + merge transaction (1000-5000 is typical)
+
+DB_DELETE_BATCH_SIZE = 1000  # Rows per statement when deleting one document
+# Short statements avoid long locks, WAL bursts and PostgREST statement timeouts
+
+VECTOR_WRITER = "postgrest"  # How ingested chunks are written
+# "postgrest" = JSON upserts through the Supabase client (no extra setup)
+# "postgres"  = binary COPY over a direct connection; much faster for large PDFs
+#               needs env DATABASE_URL and pip install "psycopg[binary]"
+
+# Write-ahead spool: embedded rows are appended to a local file and written to the
+# database by a background flusher, so ingest runs at embedding speed and a slow
+# or failing write is retried instead of losing the batch (see src/spool.py)
+VECTOR_SPOOL_ENABLED = True
+VECTOR_SPOOL_DIR = ".cache/spool"
+VECTOR_SPOOL_SEGMENT_MB = 16  # Segment files are deleted once every row in them is written
+VECTOR_SPOOL_FLUSH_ROWS = 500  # Rows per flusher pass (sent in upsert-sized batches)
+VECTOR_SPOOL_DRAIN_TIMEOUT = 300  # Seconds an ingest waits at its end for the spool to drain
+# On timeout the ingest fails (its checkpoint is kept) and the flusher keeps retrying
+VECTOR_SPOOL_MAX_ATTEMPTS = 8  # Failed writes of one batch before it is moved to quarantine/
+# Backoff doubles from RETRY_DELAY up to 60s, so 8 attempts span about 4 minutes;
+# a quarantined batch no longer blocks the rows behind it
+
+# Collection snapshots (python manage.py snapshot export|import): restore without re-embedding
+SNAPSHOT_BATCH_ROWS = 500  # Rows per read page on export and per write on import
 
 # Vector Search Settings
 VECTOR_SEARCH_TIMEOUT = 30
-VECTOR_SIMILARITY_METRIC = "cosine"
+VECTOR_SIMILARITY_METRIC = "cosine"  # "cosine", "l2" or "inner_product" (index operator class)
+
+# Vector index lifecycle (python manage.py index status|rebuild, needs DATABASE_URL)
+VECTOR_INDEX_MIN_ROWS = 1000  # Below this, no index: an exact scan is fast and exact
+VECTOR_INDEX_HNSW_MAX_ROWS = 200000  # Up to this, HNSW; above, IVFFlat with lists ≈ sqrt(rows)
+# HNSW builds are slow and memory-hungry on large tables; IVFFlat needs trained data
+HNSW_M = 16  # Graph links per node (pgvector default)
+HNSW_EF_CONSTRUCTION = 64  # Build-time candidate list (pgvector default)
+INDEX_MAINTENANCE_WORK_MEM = "128MB"  # Session setting while building
+INDEX_AUTO_MAINTAIN = True  # Rebuild after an ingest if the table outgrew its index (needs DATABASE_URL)
+INDEX_META_TTL_SECONDS = 300  # How long search caches the recorded index type
+
+RAG_RECALL_TARGET = 0.95  # Sets ivfflat.probes / hnsw.ef_search per query
+# Higher = more accurate neighbours, slower search (0.8-0.99)
+
+# Two-level retrieval: route each query to the closest documents by centroid,
+# then rank chunks only within them (document_centroids table)
+ROUTING_ENABLED = True
+ROUTING_TOP_DOCUMENTS = 5  # Documents searched per query
+# Higher = better recall across documents, more chunks ranked; collections with
+# this many documents or fewer are searched whole
+ROUTING_SECTION_PAGES = 20  # Extra centroid per block of this many pages (0 = one per document)
+# Long PDFs cover many topics; section centroids keep them routable
 
 # ============================================================================
 # LOGGING & MONITORING
@@ -120,6 +268,10 @@ LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
 LOG_PERFORMANCE_METRICS = True
 LOG_MEMORY_USAGE = False  # Enable for debugging
 
+TRACE_SAMPLE_RATE = 1.0  # Fraction of pipeline stages timed for /metrics
+# 0 = tracing off (spans become no-ops), 1 = time every stage
+# Counters (API calls, tokens, cache hits) are always collected
+
 # ============================================================================
 # ADVANCED TUNING (Don't change unless you know what you're doing)
 # ============================================================================
@@ -136,13 +288,34 @@ RETRY_DELAY = 5  # Seconds
 HEALTH_CHECK_INTERVAL = 30  # Check every N seconds
 HEALTH_CHECK_TIMEOUT = 5
 
+WARMUP_ON_START = True  # Build API clients and open connections in the background at startup
+# /readyz reports not ready until this finishes; /livez answers immediately
+# False = clients are built on the first request instead (env WARMUP_ON_START overrides)
+
+# Auto-tuning
+AUTO_TUNE = True  # Pick a MemoryPreset from the container's memory limit at startup
+# Reads the cgroup memory limit and CPU quota (falls back to host RAM/CPUs)
+# Override with env RAG_PRESET=500mb|1gb|2gb|local_gpu or MEMORY_LIMIT_MB=<n>
+# False = use the static settings in this file
+
 
 # ============================================================================
 # PRESETS (Use these for quick switching)
 # ============================================================================
 
 class MemoryPreset:
-    """Quick configurations for different memory sizes"""
+    """
+    Quick configurations for different memory sizes.
+    
+    Keys:
+        chunk_size: Characters per chunk (token mode scales PDF_CHUNK_TOKENS by chunk_size / 300)
+        batch_size: Texts per call for local embedding models (Cohere uses embed_batch_size)
+        max_workers: Pages extracted ahead of the embedding stage
+        buffer_size: Chunks per database flush
+        embed_batch_size: Texts per Cohere embed call (API max: 96)
+        upsert_batch_size: Rows per database write
+        workers: Uvicorn worker processes
+    """
     
     @staticmethod
     def preset_500mb():
@@ -152,6 +325,9 @@ class MemoryPreset:
             'batch_size': 2,
             'max_workers': 1,
             'buffer_size': 20,
+            'embed_batch_size': 48,
+            'upsert_batch_size': 50,
+            'workers': 1,
         }
     
     @staticmethod
@@ -162,6 +338,9 @@ class MemoryPreset:
             'batch_size': 4,
             'max_workers': 2,
             'buffer_size': 30,
+            'embed_batch_size': 96,
+            'upsert_batch_size': 100,
+            'workers': 1,
         }
     
     @staticmethod
@@ -172,6 +351,9 @@ class MemoryPreset:
             'batch_size': 8,
             'max_workers': 4,
             'buffer_size': 50,
+            'embed_batch_size': 96,
+            'upsert_batch_size': 200,
+            'workers': 2,
         }
     
     @staticmethod
@@ -182,6 +364,9 @@ class MemoryPreset:
             'batch_size': 32,
             'max_workers': 8,
             'buffer_size': 100,
+            'embed_batch_size': 96,
+            'upsert_batch_size': 500,
+            'workers': 4,
         }
 
 
@@ -0,0 +1,59 @@
+-- ============================================================================
+-- MIGRATION: per-document deletion and fast collection reset
+-- ============================================================================
+-- Run this in Supabase SQL Editor on databases created before this change
+-- (after document_registry.sql). New databases get it from setup_supabase.sql.
+-- ============================================================================
+
+-- 1. Document id column (also stored in metadata), indexed for scoped deletes
+ALTER TABLE pdf_qa_collection ADD COLUMN IF NOT EXISTS doc_id TEXT;
+UPDATE pdf_qa_collection SET doc_id = metadata->>'doc_id'
+WHERE doc_id IS NULL AND metadata ? 'doc_id';
+CREATE INDEX IF NOT EXISTS pdf_qa_collection_doc_id_idx ON pdf_qa_collection (doc_id);
+
+-- 2. Delete one batch of a document's chunks; the API calls it until it returns
+-- fewer than batch_size rows. Short statements keep locks, WAL bursts and
+-- PostgREST's statement timeout in check, unlike one big DELETE.
+CREATE OR REPLACE FUNCTION delete_document_chunks (
+    target_doc_id TEXT,
+    batch_size INT DEFAULT 1000
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INT;
+BEGIN
+    DELETE FROM pdf_qa_collection
+    WHERE pdf_qa_collection.id IN (
+        SELECT c.id FROM pdf_qa_collection c
+        WHERE c.doc_id = target_doc_id
+        LIMIT batch_size
+    );
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$;
+
+-- 3. Reset the whole collection: TRUNCATE frees the table and its indexes at
+-- once (no per-row WAL, no dead tuples to vacuum). The vector index is
+-- dropped because IVFFlat centroids would stay trained on the deleted rows;
+-- manage.py / the next ingest rebuilds the right index.
+-- service_role only: an app using the anon key falls back to batched deletes.
+CREATE OR REPLACE FUNCTION truncate_collection ()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+BEGIN
+    TRUNCATE pdf_qa_collection;
+    DROP INDEX IF EXISTS pdf_qa_collection_embedding_idx;
+    REINDEX TABLE pdf_qa_collection;
+    DELETE FROM document_registry WHERE collection = 'pdf_qa_collection';
+    DELETE FROM vector_index_meta WHERE table_name = 'pdf_qa_collection';
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION truncate_collection() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION truncate_collection() TO service_role;
@@ -0,0 +1,37 @@
+-- ============================================================================
+-- MIGRATION: document registry (cheap /stats without count(*) on the vectors)
+-- ============================================================================
+-- Run this in Supabase SQL Editor on databases created before this change.
+-- New databases get the same objects from setup_supabase.sql.
+-- ============================================================================
+
+-- 1. One row per ingested PDF, written at the end of each ingest
+CREATE TABLE IF NOT EXISTS document_registry (
+    collection TEXT NOT NULL,          -- vector table the chunks live in
+    doc_id TEXT NOT NULL,              -- first 16 hex digits of the file's SHA-256
+    source TEXT,                       -- uploaded file name
+    pages INT,
+    chunks INT,
+    characters BIGINT,
+    bytes BIGINT,
+    embedding_model TEXT,
+    ingest_seconds FLOAT,
+    ingested_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (collection, doc_id)
+);
+
+-- 2. Per-collection aggregates read by /stats
+CREATE OR REPLACE VIEW document_registry_stats AS
+SELECT
+    collection,
+    count(*) AS documents,
+    sum(chunks) AS chunks,
+    sum(pages) AS pages,
+    sum(bytes) AS bytes,
+    max(ingested_at) AS last_ingested_at
+FROM document_registry
+GROUP BY collection;
+
+-- 3. Backfill: documents ingested before the registry are not listed.
+-- Re-upload them (chunk ids are content-based, so nothing is duplicated)
+-- or clear the collection with DELETE /clear.
@@ -0,0 +1,50 @@
+-- ============================================================================
+-- MIGRATION: two-level retrieval with document centroid routing
+-- ============================================================================
+-- Run this in Supabase SQL Editor on databases created before this change
+-- (after multi_tenant.sql), then rerun setup_supabase.sql for the new
+-- truncate_collection and add_search_function.sql for the new
+-- match_documents.
+-- New databases get the table from setup_supabase.sql.
+-- ============================================================================
+
+-- 1. One centroid per document (section 0) and per block of pages
+CREATE TABLE IF NOT EXISTS document_centroids (
+    collection TEXT NOT NULL,          -- collection key, e.g. 'public__default'
+    doc_id TEXT NOT NULL,
+    section INT NOT NULL,              -- 0 = whole document, n = n-th block of pages
+    chunks INT,
+    embedding VECTOR(384) NOT NULL,
+    PRIMARY KEY (collection, doc_id, section)
+);
+
+-- 2. Backfill documents ingested before this change. New ingests compute
+-- centroids client-side from the embeddings they already hold. Cosine
+-- distance ignores length, so the plain mean works as a centroid.
+-- Blocks of 20 pages match ROUTING_SECTION_PAGES in config.py.
+INSERT INTO document_centroids (collection, doc_id, section, chunks, embedding)
+SELECT collection, doc_id, 0, count(*), avg(embedding)::vector(384)
+FROM pdf_qa_collection
+WHERE doc_id IS NOT NULL AND embedding IS NOT NULL
+GROUP BY collection, doc_id
+ON CONFLICT (collection, doc_id, section) DO NOTHING;
+
+INSERT INTO document_centroids (collection, doc_id, section, chunks, embedding)
+SELECT collection, doc_id, ((metadata->>'page')::int - 1) / 20 + 1, count(*), avg(embedding)::vector(384)
+FROM pdf_qa_collection
+WHERE doc_id IS NOT NULL AND embedding IS NOT NULL AND metadata ? 'page'
+GROUP BY collection, doc_id, ((metadata->>'page')::int - 1) / 20 + 1
+ON CONFLICT (collection, doc_id, section) DO NOTHING;
+
+-- 3. Verify: centroids per collection
+SELECT collection, count(DISTINCT doc_id) AS documents, count(*) AS centroids
+FROM document_centroids
+GROUP BY collection;
+
+-- ============================================================================
+-- Documents without centroids (e.g. ingested between this migration and the
+-- new match_documents) are still searched on every routed query, just not
+-- narrowed. Chunks without a doc_id (ingested before document_deletion.sql)
+-- are only found when routing is off (ROUTING_ENABLED = False) or the
+-- collection has no more than ROUTING_TOP_DOCUMENTS documents.
+-- ============================================================================
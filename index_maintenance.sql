@@ -0,0 +1,30 @@
+-- ============================================================================
+-- MIGRATION: vector index lifecycle (HNSW / size-aware IVFFlat)
+-- ============================================================================
+-- Run this in Supabase SQL Editor on databases created before this change.
+-- Afterwards, build the right index for your data with:
+--     DATABASE_URL=postgresql://... python manage.py index rebuild
+-- ============================================================================
+
+-- 1. Drop the IVFFlat index built on an empty table (its centroids are untrained)
+DROP INDEX IF EXISTS pdf_qa_collection_embedding_idx;
+
+-- 2. What manage.py built, read by the API to tune each search
+CREATE TABLE IF NOT EXISTS vector_index_meta (
+    table_name TEXT PRIMARY KEY,
+    index_type TEXT NOT NULL,          -- 'none', 'hnsw' or 'ivfflat'
+    lists INT,                         -- IVFFlat only
+    m INT,                             -- HNSW only
+    ef_construction INT,               -- HNSW only
+    rows_at_build BIGINT,
+    build_seconds FLOAT,
+    size_bytes BIGINT,
+    built_at TIMESTAMP DEFAULT NOW()
+);
+
+-- 3. Search function with per-query probes / ef_search: rerun
+-- add_search_function.sql
+
+-- ============================================================================
+-- With halfvec columns (migrate_halfvec.sql), run that migration after this one.
+-- ============================================================================
@@ -1,14 +1,24 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse
+from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse, PlainTextResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from src.rag_system import RAGSystem
+from src import metrics
+from src import gc_policy
+from src import autotune
+from src import transport
+from src import tenancy
+from src.checkpoint import CheckpointStore, IngestBusy
+from src.document_registry import content_id
+from config import INGEST_RESUME_ON_START, WARMUP_ON_START
 import os
 import shutil
 import traceback
 import asyncio
 import json 
+import threading
+import time
+from typing import Optional
 
 app = FastAPI(title="PDF Q&A API")
 
@@ -24,19 +34,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG system with error handling
-try:
-    rag = RAGSystem(collection_name="pdf_qa_collection")
-    print("✅ RAG System initialized successfully")
-except Exception as e:
-    print(f" Failed to initialize RAG System: {str(e)}")
-    print(traceback.format_exc())
-    rag = None
+gc_policy.install()
+
+# The RAG system (and the SDKs behind it) is built on first use, not at import,
+# so uvicorn starts accepting connections immediately after a cold start
+_rag = None
+_rag_error = None
+_rag_lock = threading.Lock()
+_warmup = {
+    "enabled": os.getenv("WARMUP_ON_START", str(WARMUP_ON_START)).lower() in ("1", "true", "yes"),
+    "done": False,
+    "seconds": None,
+    "timings": None,
+}
+
+
+def get_rag():
+    """Return the RAG system, constructing it on first call (None if construction failed)."""
+    global _rag, _rag_error
+    if _rag is None and _rag_error is None:
+        with _rag_lock:
+            if _rag is None and _rag_error is None:
+                try:
+                    from src.rag_system import RAGSystem
+                    _rag = RAGSystem(collection_name="pdf_qa_collection")
+                    print("✅ RAG System initialized successfully")
+                    if not _warmup["enabled"]:
+                        # Keep the startup object graph out of future collections
+                        gc_policy.freeze()
+                except Exception as e:
+                    print(f" Failed to initialize RAG System: {str(e)}")
+                    print(traceback.format_exc())
+                    _rag_error = str(e)
+    return _rag
+
+
+def _warm_up():
+    """Construct the RAG system and pre-open API connections in the background."""
+    start = time.time()
+    try:
+        rag = get_rag()
+        if rag is not None:
+            _warmup["timings"] = rag.warm_up()
+    finally:
+        _warmup["seconds"] = round(time.time() - start, 3)
+        _warmup["done"] = True
+        # Clients are built: keep their object graphs out of future collections
+        gc_policy.freeze()
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    if _warmup["enabled"]:
+        threading.Thread(target=_warm_up, name="rag-warmup", daemon=True).start()
+    if INGEST_RESUME_ON_START:
+        threading.Thread(target=_resume_ingests, name="ingest-resume", daemon=True).start()
 
 class QuestionRequest(BaseModel):
     question: str
-    top_k: int = 5
+    top_k: Optional[int] = None  # None: chosen per question (RAG_ADAPTIVE_K)
     threshold: float = 0.7
+    namespace: str = tenancy.DEFAULT_NAMESPACE
+    collection: str = tenancy.DEFAULT_COLLECTION
+
+def _collection_key(namespace: str, collection: str) -> str:
+    """Collection key for a request, or 400 for an invalid name."""
+    try:
+        return tenancy.collection_key(namespace, collection)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -50,9 +116,24 @@ async def api_root():
     """API root endpoint."""
     return {"message": "PDF Q&A API", "status": "running"}
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up and serving (no dependencies touched)."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: the RAG system is constructed and the warm-up (if enabled) has finished."""
+    loop = asyncio.get_event_loop()
+    rag = await loop.run_in_executor(None, get_rag)
+    ready = rag is not None and (not _warmup["enabled"] or _warmup["done"])
+    body = {"status": "ready" if ready else "not_ready", "error": _rag_error, "warmup": _warmup}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
 @app.get("/health")
 async def health_check():
     """Detailed health check endpoint."""
+    rag = get_rag()
     health = {
         "status": "ok",
         "rag_initialized": rag is not None,
@@ -64,46 +145,57 @@ async def health_check():
         }
     }
     
-    if rag:
-        try:
-            health["document_count"] = rag.vector_store.count_documents()
-        except Exception as e:
-            health["document_count_error"] = str(e)
+    health["settings"] = autotune.effective_settings()
+    health["gc"] = gc_policy.get_stats()
+    health["warmup"] = _warmup
+    health["http_pool"] = transport.get_stats()
+    if rag is not None and rag.vector_store.spool is not None:
+        health["vector_spool"] = rag.vector_store.spool.get_stats()
     
     return health
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus metrics: stage latencies, API calls, tokens, cache hits, RSS."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/upload")
-async def upload_pdf(file: UploadFile = File(...), background_tasks: BackgroundTasks = BackgroundTasks()):
+async def upload_pdf(file: UploadFile = File(...), background_tasks: BackgroundTasks = BackgroundTasks(),
+                     namespace: str = tenancy.DEFAULT_NAMESPACE, collection: str = tenancy.DEFAULT_COLLECTION):
     """Upload PDF and process in background for faster response."""
+    key = _collection_key(namespace, collection)
     
     # Check if RAG is initialized
-    if rag is None:
+    if get_rag() is None:
         raise HTTPException(500, "RAG system not initialized. Check environment variables.")
     
     # Validate file type
     if not file.filename.endswith('.pdf'):
         raise HTTPException(400, "Only PDF files allowed")
     
-    # Save uploaded file
-    os.makedirs("uploads", exist_ok=True)
-    file_path = f"uploads/{file.filename}"
-    
     try:
         # Save file asynchronously
         print(f"📥 Saving file: {file.filename}")
         contents = await file.read()
         
+        # One directory per content hash: a different PDF with the same name never
+        # replaces the source of a pending checkpoint
+        upload_dir = os.path.join("uploads", content_id(contents))
+        os.makedirs(upload_dir, exist_ok=True)
+        file_path = os.path.join(upload_dir, os.path.basename(file.filename))
+        
         # Write file in background
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(None, lambda: open(file_path, "wb").write(contents))
         print(f"✅ File saved: {file_path}")
         
         # Add PDF processing as background task (non-blocking)
-        background_tasks.add_task(_process_pdf_background, file_path, file.filename)
+        background_tasks.add_task(_process_pdf_background, file_path, file.filename, key)
         
         return {
             "status": "processing",
             "filename": file.filename,
+            "collection": key,
             "message": "PDF is being processed. Query the /stats endpoint to check progress."
         }
     
@@ -114,34 +206,78 @@ async def upload_pdf(file: UploadFile = File(...), background_tasks: BackgroundT
         raise HTTPException(500, f"Error saving PDF: {str(e)}")
 
 
-def _process_pdf_background(file_path: str, filename: str):
-    """Process PDF in background with memory cleanup."""
+def _process_pdf_background(file_path: str, filename: str, collection: str = None):
+    """Process PDF in background with memory cleanup; the file is kept until the ingest completes."""
+    completed = False
     try:
         print(f"📄 Processing PDF in background: {filename}")
-        rag.ingest_pdf(file_path)
+        get_rag().ingest_pdf(file_path, collection=collection)
+        completed = True
         print(f"✅ PDF processed successfully: {filename}")
+    except IngestBusy as e:
+        # Claimed by another worker (or an earlier request in this one): it finishes the job
+        print(f"⏭️  {e}")
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"❌ Error processing PDF in background:")
         print(error_trace)
+        print(f"↩️  Progress is checkpointed: POST /ingest/resume (or re-upload) continues {filename}")
     finally:
-        # Aggressive cleanup
-        import gc
-        gc.collect()
+        # Collect only if the ingest left memory under pressure
+        gc_policy.maybe_collect("upload_done")
         
-        # Clean up file
-        if os.path.exists(file_path):
+        # Clean up file (a failed ingest's checkpoint still needs it)
+        if completed and os.path.exists(file_path):
             try:
                 os.remove(file_path)
+                os.rmdir(os.path.dirname(file_path))  # Fails (kept) if the same PDF is uploaded under another name
                 print(f"🗑️ Temporary file removed")
             except:
                 pass
 
+
+def _resume_ingests() -> list:
+    """
+    Restart every unfinished ingest whose uploaded file is still on disk, one after another.
+    
+    Every worker runs this at startup; each job's checkpoint lock lets only one of them resume it.
+    """
+    jobs = CheckpointStore().resumable()
+    if not jobs or get_rag() is None:  # Nothing to resume: leave construction to warm-up or first use
+        return []
+    for job in jobs:
+        _process_pdf_background(job['source'], job['filename'], job['collection'])
+    return jobs
+
+@app.get("/ingest/jobs")
+async def list_ingest_jobs():
+    """Unfinished ingests (running, interrupted or failed) and the page each one resumes after."""
+    rag = get_rag()
+    if rag is None:
+        raise HTTPException(500, "RAG system not initialized")
+    return {"jobs": rag.checkpoints.pending()}
+
+@app.post("/ingest/resume")
+async def resume_ingest_jobs(background_tasks: BackgroundTasks):
+    """Resume every unfinished ingest from its checkpoint, in the background."""
+    rag = get_rag()
+    if rag is None:
+        raise HTTPException(500, "RAG system not initialized")
+    jobs = rag.checkpoints.resumable()
+    background_tasks.add_task(_resume_ingests)
+    return {
+        "status": "resuming" if jobs else "idle",
+        "jobs": [{"doc_id": job['doc_id'], "collection": job['collection'], "filename": job['filename'],
+                  "pages_committed": job['pages_committed']} for job in jobs],
+    }
+
 @app.post("/ask")
 async def ask_question(request: QuestionRequest):
     """Ask a question about uploaded PDFs."""
+    rag = get_rag()
     if rag is None:
         raise HTTPException(500, "RAG system not initialized")
+    key = _collection_key(request.namespace, request.collection)
     
     try:
         print(f"❓ Question received: {request.question}")
@@ -153,7 +289,8 @@ async def ask_question(request: QuestionRequest):
             rag.ask,
             request.question,
             request.top_k,
-            request.threshold
+            request.threshold,
+            key
         )
         print(f"✅ Answer generated")
         return response
@@ -167,34 +304,37 @@ async def ask_question(request: QuestionRequest):
 @app.post("/ask-stream")
 async def ask_question_streaming(request: QuestionRequest):
     """Ask a question with streaming answer for real-time response."""
+    rag = get_rag()
     if rag is None:
         raise HTTPException(500, "RAG system not initialized")
+    key = _collection_key(request.namespace, request.collection)
     
     async def generate():
         try:
-            # Run blocking operations in executor
+            # Run blocking operations in executor (retrieval happens here)
             loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
+            response, pieces = await loop.run_in_executor(
                 None,
-                rag.ask,
+                rag.ask_stream,
                 request.question,
                 request.top_k,
-                request.threshold
+                request.threshold,
+                key
             )
             
-            # Stream the response in chunks
             yield json.dumps({"status": "answer_start", "answer_part": ""}).encode() + b"\n"
             
-            answer = response.get('answer', '')
-            # Stream answer in chunks for better UX
-            chunk_size = 50
-            for i in range(0, len(answer), chunk_size):
-                chunk = answer[i:i+chunk_size]
-                yield json.dumps({"status": "answer_chunk", "answer_part": chunk}).encode() + b"\n"
-                await asyncio.sleep(0.01)  # Small delay for streaming effect
+            # Forward Groq's tokens as they arrive (each next() blocks, so it runs in the executor)
+            answer = []
+            while True:
+                piece = await loop.run_in_executor(None, next, pieces, None)
+                if piece is None:
+                    break
+                answer.append(piece)
+                yield json.dumps({"status": "answer_chunk", "answer_part": piece}).encode() + b"\n"
             
             # Send metadata
-            response['answer'] = answer  # Include full answer in metadata
+            response['answer'] = "".join(answer)  # Include full answer in metadata
             yield json.dumps({"status": "complete", "metadata": response}).encode() + b"\n"
         except Exception as e:
             yield json.dumps({"status": "error", "error": str(e)}).encode() + b"\n"
@@ -202,29 +342,76 @@ async def ask_question_streaming(request: QuestionRequest):
     return StreamingResponse(generate(), media_type="text/event-stream")
 
 @app.get("/stats")
-async def get_stats():
-    """Get system statistics."""
+async def get_stats(namespace: str = tenancy.DEFAULT_NAMESPACE, collection: str = tenancy.DEFAULT_COLLECTION):
+    """Get system statistics for one collection."""
+    rag = get_rag()
     if rag is None:
         raise HTTPException(500, "RAG system not initialized")
+    key = _collection_key(namespace, collection)
     
     try:
-        stats = rag.get_stats()
+        stats = rag.get_stats(key)
         return stats
     except Exception as e:
         raise HTTPException(500, f"Error fetching stats: {str(e)}")
 
+@app.get("/documents")
+async def list_documents(namespace: str = tenancy.DEFAULT_NAMESPACE, collection: str = tenancy.DEFAULT_COLLECTION):
+    """List a collection's ingested documents (from the document registry)."""
+    rag = get_rag()
+    if rag is None:
+        raise HTTPException(500, "RAG system not initialized")
+    key = _collection_key(namespace, collection)
+    
+    try:
+        loop = asyncio.get_event_loop()
+        return {"collection": key,
+                "documents": await loop.run_in_executor(None, rag.store(key).registry.list_documents)}
+    except Exception as e:
+        raise HTTPException(500, f"Error listing documents: {str(e)}")
+
+@app.delete("/documents/{doc_id}")
+async def delete_document(doc_id: str, namespace: str = tenancy.DEFAULT_NAMESPACE,
+                          collection: str = tenancy.DEFAULT_COLLECTION):
+    """Delete one document's chunks (in bounded batches) and its registry entry."""
+    rag = get_rag()
+    if rag is None:
+        raise HTTPException(500, "RAG system not initialized")
+    key = _collection_key(namespace, collection)
+    
+    try:
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(None, rag.delete_document, doc_id, key)
+    except Exception as e:
+        raise HTTPException(500, f"Error deleting document: {str(e)}")
+    if result['chunks_deleted'] == 0:
+        raise HTTPException(404, f"No chunks found for document {doc_id}")
+    return {"status": "success", **result}
+
 @app.delete("/clear")
-async def clear_database():
-    """Clear all documents from database."""
+async def clear_database(namespace: str = tenancy.DEFAULT_NAMESPACE, collection: str = tenancy.DEFAULT_COLLECTION):
+    """Clear one collection (TRUNCATE its partition, falling back to row deletes)."""
+    rag = get_rag()
     if rag is None:
         raise HTTPException(500, "RAG system not initialized")
+    key = _collection_key(namespace, collection)
     
     try:
-        rag.vector_store.clear()
-        return {"status": "success", "message": "Database cleared"}
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(None, rag.clear, key)
+        return {"status": "success", "message": f"Collection {key} cleared", "collection": key, **result}
     except Exception as e:
         raise HTTPException(500, f"Error clearing database: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=10000)
\ No newline at end of file
+    from config import API_PORT
+    
+    workers = autotune.effective_settings()['workers']
+    port = int(os.getenv("PORT", API_PORT))
+    print(f"🌐 Starting uvicorn on port {port} with {workers} worker(s)")
+    if workers > 1:
+        # Multiple workers need an import string so each process builds its own app
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, timeout_keep_alive=120)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port, timeout_keep_alive=120)
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Maintenance commands for the PDF Q&A database.
+
+Index commands need a direct Postgres connection: set DATABASE_URL
+(Supabase: Project Settings > Database > Connection string) and
+pip install "psycopg[binary]". Snapshot commands use SUPABASE_URL and
+SUPABASE_ANON_KEY (and DATABASE_URL for COPY with VECTOR_WRITER = "postgres").
+
+Usage:
+    python manage.py index status                 # rows, current index, size, planned index
+    python manage.py index rebuild                # build the index the row count calls for
+    python manage.py index rebuild --type hnsw    # force an index type
+    python manage.py index params --recall 0.99   # per-query probes / ef_search for a recall target
+    python manage.py index status --namespace acme --collection contracts
+    python manage.py snapshot export snapshots/default   # ids, texts, metadata, embeddings
+    python manage.py snapshot import snapshots/default --collection restored   # no re-embedding
+
+Each collection is its own partition with its own index; commands act on
+the default collection (public / default) unless one is given.
+"""
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from config import DB_COLLECTION_NAME, RAG_RECALL_TARGET, RAG_TOP_K
+
+load_dotenv()
+
+
+def _index_command(args) -> int:
+    from src import tenancy
+    from src.index_manager import IndexManager, plan_index, search_params
+
+    partition = tenancy.partition_name(tenancy.collection_key(args.namespace, args.collection), args.table)
+    manager = IndexManager(partition)
+
+    if args.action == "status":
+        print(json.dumps(manager.status(), indent=2, default=str))
+        return 0
+
+    if args.action == "params":
+        status = manager.status()
+        params = search_params(status['meta'], args.top_k, args.recall)
+        print(json.dumps({'index': status['meta'], 'recall_target': args.recall, 'params': params},
+                         indent=2, default=str))
+        return 0
+
+    status = manager.status()
+    plan = plan_index(status['rows'], status['column_type'], args.type)
+    print(f"🧭 Rebuilding {partition} ({status['rows']} rows): {plan}")
+    report = manager.rebuild(plan)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def _snapshot_command(args) -> int:
+    from src import snapshot, tenancy
+    from src.vector_store import VectorStore
+
+    store = VectorStore(args.table, collection=tenancy.collection_key(args.namespace, args.collection))
+    if args.action == "export":
+        print(json.dumps(snapshot.export_collection(store, args.path), indent=2))
+        return 0
+
+    report = snapshot.import_collection(store, args.path)
+    if os.getenv("DATABASE_URL"):
+        # The partition grew without an ingest: fit its index to the new row count
+        from src.index_manager import IndexManager
+        report['index'] = IndexManager(store.partition).maybe_rebuild()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PDF Q&A maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="Vector index lifecycle")
+    index.add_argument("action", choices=["status", "rebuild", "params"])
+    index.add_argument("--table", default=DB_COLLECTION_NAME, help="Partitioned vector table")
+    index.add_argument("--namespace", default=None, help="Collection namespace (default: public)")
+    index.add_argument("--collection", default=None, help="Collection name (default: default)")
+    index.add_argument("--type", choices=["none", "hnsw", "ivfflat"], help="Force an index type (rebuild)")
+    index.add_argument("--recall", type=float, default=RAG_RECALL_TARGET, help="Recall target (params)")
+    index.add_argument("--top-k", type=int, default=RAG_TOP_K, help="Results per query (params)")
+
+    snapshot = commands.add_parser("snapshot", help="Export or restore a collection without re-embedding")
+    snapshot.add_argument("action", choices=["export", "import"])
+    snapshot.add_argument("path", help="Snapshot directory")
+    snapshot.add_argument("--table", default=DB_COLLECTION_NAME, help="Partitioned vector table")
+    snapshot.add_argument("--namespace", default=None, help="Collection namespace (default: public)")
+    snapshot.add_argument("--collection", default=None, help="Collection name (default: default)")
+
+    args = parser.parse_args(argv)
+    if args.command == "index":
+        return _index_command(args)
+    if args.command == "snapshot":
+        return _snapshot_command(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+-- ============================================================================
+-- OPTIONAL MIGRATION: store embeddings as half-precision halfvec
+-- ============================================================================
+-- Halves table and index size (2 bytes per dimension instead of 4) and
+-- matches the compact text wire format (EMBEDDING_WIRE_FORMAT = "text" in
+-- config.py), which sends the same '[0.01233,...]' literal for either type.
+-- Requires pgvector 0.7.0+ (SELECT extversion FROM pg_extension WHERE extname = 'vector').
+-- Run this in Supabase SQL Editor after setup_supabase.sql.
+-- ============================================================================
+
+-- 1. Drop every collection's float32 index (they cannot be converted in place)
+DO $$
+DECLARE
+    part RECORD;
+BEGIN
+    FOR part IN SELECT inhrelid::regclass::text AS name FROM pg_inherits
+                WHERE inhparent = 'pdf_qa_collection'::regclass LOOP
+        EXECUTE format('DROP INDEX IF EXISTS %I', part.name || '_embedding_idx');
+        DELETE FROM vector_index_meta WHERE table_name = part.name;
+    END LOOP;
+END;
+$$;
+
+-- 2. Convert the column on every partition; existing rows are rounded to half precision
+ALTER TABLE pdf_qa_collection
+    ALTER COLUMN embedding TYPE HALFVEC(384) USING embedding::halfvec(384);
+
+-- 3. Rebuild each collection's index afterwards with `python manage.py index rebuild`
+-- (it detects the halfvec column and uses halfvec_cosine_ops)
+
+-- 4. Search function: match_documents (add_search_function.sql) reads the
+-- column type on each call, so it needs no halfvec copy. Rerun that file only
+-- if your match_documents predates it.
+
+-- 5. Verify the column type
+SELECT column_name, udt_name
+FROM information_schema.columns
+WHERE table_name = 'pdf_qa_collection' AND column_name = 'embedding';
+
+-- ============================================================================
+-- To revert: ALTER COLUMN embedding TYPE VECTOR(384) USING embedding::vector(384),
+-- then `python manage.py index rebuild` (match_documents follows the column type).
+-- ============================================================================
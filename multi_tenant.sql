@@ -0,0 +1,67 @@
+-- ============================================================================
+-- MIGRATION: namespaces and collections (one partition per collection)
+-- ============================================================================
+-- Turns pdf_qa_collection into a table LIST-partitioned on a new `collection`
+-- column ("<namespace>__<collection>", see src/tenancy.py). Existing rows
+-- become the 'public__default' collection, the one the API uses when no
+-- namespace/collection is given, so nothing changes for existing clients.
+-- Each collection gets its own partition and vector index; searches prune to
+-- one partition.
+--
+-- Run this in Supabase SQL Editor on databases created before this change
+-- (after document_deletion.sql), then rerun setup_supabase.sql and
+-- add_search_function.sql for the new functions (every statement in them is
+-- idempotent). It runs in one
+-- transaction; expect a short exclusive lock on pdf_qa_collection.
+-- ============================================================================
+
+BEGIN;
+
+-- 1. The existing table becomes the default collection's partition
+ALTER TABLE pdf_qa_collection RENAME TO pdf_qa_collection__public__default;
+ALTER INDEX IF EXISTS pdf_qa_collection_embedding_idx RENAME TO pdf_qa_collection__public__default_embedding_idx;
+ALTER INDEX IF EXISTS pdf_qa_collection_created_at_idx RENAME TO pdf_qa_collection__public__default_created_at_idx;
+ALTER INDEX IF EXISTS pdf_qa_collection_doc_id_idx RENAME TO pdf_qa_collection__public__default_doc_id_idx;
+
+ALTER TABLE pdf_qa_collection__public__default
+    ADD COLUMN IF NOT EXISTS collection TEXT NOT NULL DEFAULT 'public__default';
+ALTER TABLE pdf_qa_collection__public__default DROP CONSTRAINT pdf_qa_collection_pkey;
+ALTER TABLE pdf_qa_collection__public__default
+    ADD CONSTRAINT pdf_qa_collection__public__default_pkey PRIMARY KEY (collection, id);
+-- Lets ATTACH PARTITION skip its validation scan
+ALTER TABLE pdf_qa_collection__public__default
+    ADD CONSTRAINT pdf_qa_collection__public__default_check CHECK (collection = 'public__default');
+
+-- 2. Partitioned parent with the same columns (and embedding type: vector or halfvec)
+CREATE TABLE pdf_qa_collection (
+    LIKE pdf_qa_collection__public__default INCLUDING DEFAULTS
+) PARTITION BY LIST (collection);
+
+ALTER TABLE pdf_qa_collection
+    ATTACH PARTITION pdf_qa_collection__public__default FOR VALUES IN ('public__default');
+ALTER TABLE pdf_qa_collection__public__default DROP CONSTRAINT pdf_qa_collection__public__default_check;
+
+-- 3. Parent constraints and indexes (the partition's matching indexes are attached, not rebuilt)
+ALTER TABLE pdf_qa_collection ADD PRIMARY KEY (collection, id);
+CREATE INDEX IF NOT EXISTS pdf_qa_collection_created_at_idx ON pdf_qa_collection (created_at DESC);
+CREATE INDEX IF NOT EXISTS pdf_qa_collection_doc_id_idx ON pdf_qa_collection (doc_id);
+
+-- 4. Registry and index metadata are now keyed by collection / partition
+UPDATE document_registry SET collection = 'public__default' WHERE collection = 'pdf_qa_collection';
+UPDATE vector_index_meta SET table_name = 'pdf_qa_collection__public__default'
+WHERE table_name = 'pdf_qa_collection';
+
+COMMIT;
+
+-- 5. Verify: one partition holding every existing row
+SELECT inhrelid::regclass AS partition,
+       (SELECT count(*) FROM pdf_qa_collection__public__default) AS rows
+FROM pg_inherits
+WHERE inhparent = 'pdf_qa_collection'::regclass;
+
+-- ============================================================================
+-- Next: rerun setup_supabase.sql and add_search_function.sql
+-- (create_collection, match_documents, delete_document_chunks and
+-- truncate_collection gain a target_collection argument). Existing indexes keep working; `python manage.py index status`
+-- now reports the default collection's partition.
+-- ============================================================================
@@ -8,52 +8,215 @@
 -- 1. Enable the pgvector extension (required for vector similarity search)
 CREATE EXTENSION IF NOT EXISTS vector;
 
--- 2. Create the pdf_qa_collection table
+-- 2. Create the pdf_qa_collection table, partitioned by collection
+-- Each collection ("<namespace>__<collection>", see src/tenancy.py) is its own
+-- partition pdf_qa_collection__<key> with its own vector index, so a search
+-- only touches one collection's rows. The API creates partitions on first
+-- upload through create_collection() below.
 CREATE TABLE IF NOT EXISTS pdf_qa_collection (
-    id TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
     text TEXT NOT NULL,
     embedding VECTOR(384),
     metadata JSONB DEFAULT '{}'::jsonb,
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    doc_id TEXT,                       -- document the chunk belongs to (see document_registry)
+    collection TEXT NOT NULL DEFAULT 'public__default',
+    duplicate_of TEXT,                 -- near-duplicate of this chunk id (stored without embedding)
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (collection, id)
+) PARTITION BY LIST (collection);
+
+CREATE TABLE IF NOT EXISTS pdf_qa_collection__public__default
+PARTITION OF pdf_qa_collection FOR VALUES IN ('public__default');
+-- Optional: migrate_halfvec.sql converts embedding to HALFVEC(384) (half the storage)
 
--- 3. Create an index for fast vector similarity search
--- Using ivfflat index with cosine distance for efficient similarity search
-CREATE INDEX IF NOT EXISTS pdf_qa_collection_embedding_idx 
-ON pdf_qa_collection 
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 100);
+-- 3. Vector index: built per partition later, once there is data to build it for
+-- An IVFFlat index trained on an empty table clusters nothing. After loading
+-- PDFs run `python manage.py index rebuild [--namespace .. --collection ..]`
+-- (needs DATABASE_URL): it picks none / HNSW / IVFFlat (lists ≈ sqrt(rows))
+-- from the partition's row count and records the choice here (keyed by
+-- partition name), so searches can set probes / ef_search.
+CREATE TABLE IF NOT EXISTS vector_index_meta (
+    table_name TEXT PRIMARY KEY,
+    index_type TEXT NOT NULL,          -- 'none', 'hnsw' or 'ivfflat'
+    lists INT,                         -- IVFFlat only
+    m INT,                             -- HNSW only
+    ef_construction INT,               -- HNSW only
+    rows_at_build BIGINT,
+    build_seconds FLOAT,
+    size_bytes BIGINT,
+    built_at TIMESTAMP DEFAULT NOW()
+);
 
--- 4. Create an index on created_at for faster sorting
+-- 4. Create an index on created_at for faster sorting (inherited by every partition)
 CREATE INDEX IF NOT EXISTS pdf_qa_collection_created_at_idx 
 ON pdf_qa_collection (created_at DESC);
 
--- 5. Create the match_documents function for vector similarity search
-CREATE OR REPLACE FUNCTION match_documents (
-    query_embedding VECTOR(384),
-    match_count INT DEFAULT 5
+-- 4a. Indexes for per-document deletes (doc_id, and near-duplicate references to follow)
+CREATE INDEX IF NOT EXISTS pdf_qa_collection_doc_id_idx 
+ON pdf_qa_collection (doc_id);
+
+CREATE INDEX IF NOT EXISTS pdf_qa_collection_duplicate_of_idx
+ON pdf_qa_collection (duplicate_of) WHERE duplicate_of IS NOT NULL;
+
+-- 4b. Document registry: one row per ingested PDF, aggregated by /stats
+-- (cheap statistics without count(*) over the vector table)
+CREATE TABLE IF NOT EXISTS document_registry (
+    collection TEXT NOT NULL,          -- collection key, e.g. 'public__default'
+    doc_id TEXT NOT NULL,              -- first 16 hex digits of the file's SHA-256
+    source TEXT,                       -- uploaded file name
+    pages INT,
+    chunks INT,
+    characters BIGINT,
+    bytes BIGINT,
+    embedding_model TEXT,
+    ingest_seconds FLOAT,
+    ingested_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (collection, doc_id)
+);
+
+CREATE OR REPLACE VIEW document_registry_stats AS
+SELECT
+    collection,
+    count(*) AS documents,
+    sum(chunks) AS chunks,
+    sum(pages) AS pages,
+    sum(bytes) AS bytes,
+    max(ingested_at) AS last_ingested_at
+FROM document_registry
+GROUP BY collection;
+
+-- 4c. Routing centroids: normalized mean of each document's chunk embeddings,
+-- plus one per block of ROUTING_SECTION_PAGES pages (config.py). Queries are
+-- routed to the closest documents before chunks are ranked.
+CREATE TABLE IF NOT EXISTS document_centroids (
+    collection TEXT NOT NULL,          -- collection key, e.g. 'public__default'
+    doc_id TEXT NOT NULL,
+    section INT NOT NULL,              -- 0 = whole document, n = n-th block of pages
+    chunks INT,
+    embedding VECTOR(384) NOT NULL,
+    PRIMARY KEY (collection, doc_id, section)
+);
+
+-- 5. The match_documents search function is defined in add_search_function.sql
+-- (one copy for vector and halfvec columns): run it after this file.
+
+-- 5b. Create a collection's partition (idempotent; called before its first write)
+CREATE OR REPLACE FUNCTION create_collection (
+    target_collection TEXT
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp  -- runs as the owner: never resolve names through the caller's path
+AS $$
+BEGIN
+    IF target_collection !~ '^[a-z0-9]+(_[a-z0-9]+)*__[a-z0-9]+(_[a-z0-9]+)*$' THEN
+        RAISE EXCEPTION 'invalid collection key: %', target_collection;
+    END IF;
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF pdf_qa_collection FOR VALUES IN (%L)',
+                   'pdf_qa_collection__' || target_collection, target_collection);
+END;
+$$;
+
+-- 5c. Per-document delete (called in batches) and fast collection reset.
+-- truncate_collection is for the service_role key only: an app using the anon
+-- key falls back to batched deletes (RAGSystem.clear), then calls
+-- reset_collection_index to drop the emptied partition's index and metadata
+DROP FUNCTION IF EXISTS delete_document_chunks(TEXT, INT);
+DROP FUNCTION IF EXISTS truncate_collection();
+
+CREATE OR REPLACE FUNCTION delete_document_chunks (
+    target_doc_id TEXT,
+    batch_size INT DEFAULT 1000,
+    target_collection TEXT DEFAULT 'public__default'
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INT;
+BEGIN
+    -- Near-duplicates in other documents that reference these chunks take over their embedding
+    UPDATE pdf_qa_collection d
+    SET embedding = c.embedding, duplicate_of = NULL
+    FROM pdf_qa_collection c
+    WHERE d.collection = target_collection AND c.collection = target_collection
+    AND c.doc_id = target_doc_id AND d.duplicate_of = c.id
+    AND d.doc_id IS DISTINCT FROM target_doc_id;
+
+    DELETE FROM pdf_qa_collection
+    WHERE pdf_qa_collection.collection = target_collection
+    AND pdf_qa_collection.id IN (
+        SELECT c.id FROM pdf_qa_collection c
+        WHERE c.collection = target_collection AND c.doc_id = target_doc_id
+        LIMIT batch_size
+    );
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION truncate_collection (
+    target_collection TEXT DEFAULT 'public__default'
 )
-RETURNS TABLE (
-    id TEXT,
-    text TEXT,
-    metadata JSONB,
-    similarity FLOAT
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+DECLARE
+    part_name TEXT := 'pdf_qa_collection__' || target_collection;
+BEGIN
+    IF target_collection !~ '^[a-z0-9]+(_[a-z0-9]+)*__[a-z0-9]+(_[a-z0-9]+)*$' THEN
+        RAISE EXCEPTION 'invalid collection key: %', target_collection;
+    END IF;
+    IF to_regclass(quote_ident(part_name)) IS NULL THEN
+        RETURN;  -- nothing ingested into this collection yet
+    END IF;
+    EXECUTE format('TRUNCATE %I', part_name);
+    EXECUTE format('DROP INDEX IF EXISTS %I', part_name || '_embedding_idx');  -- untrained after a reset
+    EXECUTE format('REINDEX TABLE %I', part_name);
+    DELETE FROM document_registry WHERE collection = target_collection;
+    DELETE FROM document_centroids WHERE collection = target_collection;
+    DELETE FROM vector_index_meta WHERE table_name = part_name;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION truncate_collection(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION truncate_collection(TEXT) TO service_role;
+
+-- The index half of truncate_collection, for callers that deleted the rows
+-- themselves. Only an empty partition is touched, so it is safe to grant to
+-- anon: it can never drop the index of a collection that still has data.
+CREATE OR REPLACE FUNCTION reset_collection_index (
+    target_collection TEXT DEFAULT 'public__default'
 )
+RETURNS VOID
 LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp
 AS $$
+DECLARE
+    part_name TEXT := 'pdf_qa_collection__' || target_collection;
+    has_rows BOOLEAN;
 BEGIN
-    RETURN QUERY
-    SELECT
-        pdf_qa_collection.id,
-        pdf_qa_collection.text,
-        pdf_qa_collection.metadata,
-        1 - (pdf_qa_collection.embedding <=> query_embedding) AS similarity
-    FROM pdf_qa_collection
-    ORDER BY pdf_qa_collection.embedding <=> query_embedding
-    LIMIT match_count;
+    IF target_collection !~ '^[a-z0-9]+(_[a-z0-9]+)*__[a-z0-9]+(_[a-z0-9]+)*$' THEN
+        RAISE EXCEPTION 'invalid collection key: %', target_collection;
+    END IF;
+    IF to_regclass(quote_ident(part_name)) IS NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I)', part_name) INTO has_rows;
+    IF has_rows THEN
+        RAISE EXCEPTION 'collection % is not empty', target_collection;
+    END IF;
+    EXECUTE format('DROP INDEX IF EXISTS %I', part_name || '_embedding_idx');
+    DELETE FROM vector_index_meta WHERE table_name = part_name;
 END;
 $$;
 
+GRANT EXECUTE ON FUNCTION reset_collection_index(TEXT) TO anon, authenticated, service_role;
+
 -- 6. Verify the table was created successfully
 SELECT 
     table_name, 
@@ -63,19 +226,17 @@ FROM information_schema.columns
 WHERE table_name = 'pdf_qa_collection'
 ORDER BY ordinal_position;
 
--- 7. Verify the function was created
-SELECT routine_name 
-FROM information_schema.routines 
-WHERE routine_name = 'match_documents';
-
 -- ============================================================================
 -- Setup Complete!
 -- ============================================================================
 -- Your database is now ready with:
 -- ✅ pgvector extension enabled
--- ✅ pdf_qa_collection table created
--- ✅ Vector similarity indexes created
--- ✅ match_documents function for searching
+-- ✅ pdf_qa_collection table created (partitioned by collection)
+-- ✅ Index metadata table (build the vector index with manage.py)
+-- ✅ document_registry table and stats view
+-- ✅ document_centroids table (two-level retrieval)
+-- ✅ create_collection / delete_document_chunks / truncate_collection functions
 --
--- You can now upload PDFs and ask questions through the API!
+-- Next: run add_search_function.sql (match_documents), then upload PDFs and
+-- ask questions through the API!
 -- ============================================================================
@@ -1,4 +1,3 @@
-import pypdf
 from typing import List, Dict
 
 class PDFLoader:
@@ -11,6 +10,7 @@ class PDFLoader:
     
     def load(self) -> str:
         """Extract text from all pages."""
+        import pypdf  # Imported lazily so importing any src module stays cheap
         try:
             with open(self.pdf_path, 'rb') as file:
                 pdf_reader = pypdf.PdfReader(file)
@@ -42,6 +42,7 @@ class PDFLoader:
     
     def get_metadata(self) -> dict:
         """Get PDF metadata."""
+        import pypdf
         try:
             with open(self.pdf_path, 'rb') as file:
                 pdf_reader = pypdf.PdfReader(file)
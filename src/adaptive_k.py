@@ -0,0 +1,47 @@
+"""
+Adaptive top_k: decide per question how many chunks the LLM reads.
+
+A fixed top_k gives a simple factual question five chunks when the first
+one holds the answer, and a broad question five when it needs more; every
+extra chunk is prompt tokens (Groq latency and cost). When a question does
+not ask for a top_k, ask() fetches up to RAG_ADAPTIVE_MAX_K candidates and
+this cuts their similarity curve at the first of:
+  - the largest drop between neighbours, if it is at least
+    RAG_ADAPTIVE_MIN_GAP (a cliff: what follows is about something else)
+  - the point where the kept chunks hold RAG_ADAPTIVE_MASS of the relevance
+    mass, each chunk weighing its similarity above the baseline (the
+    weakest candidate fetched, i.e. what an unrelated chunk scores)
+A flat curve keeps many chunks, a steep or broken one few.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from config import RAG_ADAPTIVE_MASS, RAG_ADAPTIVE_MAX_K, RAG_ADAPTIVE_MIN_GAP, RAG_ADAPTIVE_MIN_K
+
+
+def cutoff(similarities: Sequence[float], baseline: float, min_k: int = RAG_ADAPTIVE_MIN_K,
+           max_k: int = RAG_ADAPTIVE_MAX_K, min_gap: float = RAG_ADAPTIVE_MIN_GAP,
+           mass: float = RAG_ADAPTIVE_MASS) -> Tuple[int, str]:
+    """
+    Number of chunks to keep and why ('gap', 'mass' or 'max').
+
+    similarities: relevant candidates' similarities, highest first
+    baseline: similarity of the weakest candidate fetched
+    """
+    curve = np.asarray(similarities, dtype=np.float32)[:max_k]
+    if len(curve) <= min_k:
+        return len(curve), 'max'
+    k, reason = len(curve), 'max'
+
+    drops = curve[:-1] - curve[1:]
+    gap = int(np.argmax(drops))
+    if drops[gap] >= min_gap:
+        k, reason = gap + 1, 'gap'
+
+    weights = np.maximum(curve - baseline, 0.0)
+    if weights.sum() > 0:
+        covered = int(np.searchsorted(np.cumsum(weights) / weights.sum(), mass - 1e-6)) + 1
+        if covered < k:
+            k, reason = covered, 'mass'
+    return max(k, min_k), reason
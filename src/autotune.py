@@ -0,0 +1,189 @@
+"""
+Startup auto-tuning from the container's resource limits.
+
+Reads the cgroup (v2 or v1) memory limit and CPU quota, picks the matching
+MemoryPreset / CloudPresets entry from config.py and turns it into the
+effective settings used by the loader, chunker, embedder, vector store and
+uvicorn. The result is reported on /health.
+"""
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from config import (
+    AUTO_TUNE,
+    CHUNK_SIZE_UNIT,
+    DB_BATCH_INSERT_SIZE,
+    MAX_MEMORY_MB,
+    MEMORY_WARNING_THRESHOLD,
+    PDF_CHUNK_SIZE,
+    PDF_CHUNK_TOKENS,
+    PDF_LOADER_MAX_WORKERS,
+    STREAM_BUFFER_SIZE,
+    API_MAX_WORKERS,
+    API_WORKERS,
+    CloudPresets,
+    MemoryPreset,
+)
+
+# Anything above this is "no limit" (cgroup v1 reports ~2^63 when unlimited)
+_UNLIMITED_BYTES = 1 << 60
+
+# Warning threshold as a fraction of the limit (config default: 400 of 500MB)
+_WARNING_RATIO = MEMORY_WARNING_THRESHOLD / MAX_MEMORY_MB
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def detect_memory_limit_mb() -> Optional[float]:
+    """Container memory limit in MB (cgroup v2, then v1, then physical RAM)."""
+    override = os.getenv("MEMORY_LIMIT_MB")
+    if override:
+        return float(override)
+
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value = _read(path)
+        if value and value != "max":
+            try:
+                limit = int(value)
+            except ValueError:
+                continue
+            if limit < _UNLIMITED_BYTES:
+                return limit / 1024 / 1024
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 / 1024
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def detect_cpu_quota() -> float:
+    """Usable CPUs (cgroup quota if set, otherwise the CPUs this process may run on)."""
+    value = _read("/sys/fs/cgroup/cpu.max")
+    if value:
+        quota, _, period = value.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+    else:
+        quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if quota and period and int(quota) > 0:
+            return int(quota) / int(period)
+
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return float(os.cpu_count() or 1)
+
+
+def detect_cloud() -> Optional[str]:
+    """Recognise the hosting provider from its environment variables."""
+    if os.getenv("RENDER"):
+        return "render_free"
+    if os.getenv("RAILWAY_ENVIRONMENT"):
+        return "railway"
+    if os.getenv("FLY_APP_NAME"):
+        return "flyio"
+    return None
+
+
+def preset_names() -> List[str]:
+    return sorted(name[len("preset_"):] for name in dir(MemoryPreset) if name.startswith("preset_"))
+
+
+def select_preset(memory_mb: Optional[float]) -> str:
+    """Largest MemoryPreset that fits the memory limit (ValueError for an unknown RAG_PRESET)."""
+    forced = os.getenv("RAG_PRESET")
+    if forced:
+        if forced not in preset_names():
+            raise ValueError(f"Unknown RAG_PRESET '{forced}'; valid presets: {', '.join(preset_names())}")
+        return forced
+    if memory_mb is None or memory_mb < 900:
+        return "500mb"
+    if memory_mb < 1800:
+        return "1gb"
+    return "2gb"
+
+
+def static_settings() -> Dict:
+    """Settings straight from config.py (AUTO_TUNE = False)."""
+    return {
+        'source': 'config',
+        'preset': None,
+        'memory_limit_mb': MAX_MEMORY_MB,
+        'memory_warning_mb': MEMORY_WARNING_THRESHOLD,
+        'cpu_quota': None,
+        'chunk_size': PDF_CHUNK_TOKENS if CHUNK_SIZE_UNIT == "tokens" else PDF_CHUNK_SIZE,
+        'chunk_unit': CHUNK_SIZE_UNIT,
+        'max_workers': PDF_LOADER_MAX_WORKERS,
+        'buffer_size': STREAM_BUFFER_SIZE,
+        'embed_batch_size': 96,
+        'upsert_batch_size': DB_BATCH_INSERT_SIZE,
+        'workers': _cap_workers(API_WORKERS),
+    }
+
+
+def chunk_size_in(size: int, from_unit: str, to_unit: str) -> int:
+    """A chunk size converted between units, at PDF_CHUNK_TOKENS tokens per 300 characters."""
+    if from_unit == to_unit:
+        return size
+    if to_unit == "tokens":
+        return round(PDF_CHUNK_TOKENS * size / 300)
+    return round(300 * size / PDF_CHUNK_TOKENS)
+
+
+def _cap_workers(workers: int) -> int:
+    """Workers limited to API_MAX_WORKERS (state that is still per process, see config.py)."""
+    if workers > API_MAX_WORKERS:
+        print(f"⚠️  {workers} workers requested; running {API_MAX_WORKERS} (API_MAX_WORKERS)")
+    return max(1, min(workers, API_MAX_WORKERS))
+
+
+@lru_cache(maxsize=1)
+def effective_settings() -> Dict:
+    """Settings for this process, computed once at startup."""
+    if not AUTO_TUNE:
+        return static_settings()
+
+    memory_mb = detect_memory_limit_mb()
+    cpus = detect_cpu_quota()
+
+    cloud = detect_cloud()
+    cloud_preset = getattr(CloudPresets, cloud)() if cloud else None
+    # The provider's plan limit wins if the cgroup limit is missing or larger (before
+    # choosing the preset: a host without a cgroup limit reports all of its RAM)
+    if cloud_preset and (memory_mb is None or cloud_preset['max_memory'] < memory_mb):
+        memory_mb = cloud_preset['max_memory']
+
+    preset_name = select_preset(memory_mb)
+    preset = getattr(MemoryPreset, f"preset_{preset_name}")()
+    if cloud_preset:
+        preset['workers'] = min(preset['workers'], cloud_preset['workers'])
+
+    memory_mb = memory_mb or MAX_MEMORY_MB
+    # Keep each preset's relative chunk size (presets are written in characters)
+    chunk_size = chunk_size_in(preset['chunk_size'], "chars", CHUNK_SIZE_UNIT)
+
+    return {
+        'source': 'auto',
+        'preset': preset_name,
+        'cloud': cloud,
+        'memory_limit_mb': round(memory_mb),
+        'memory_warning_mb': round(memory_mb * _WARNING_RATIO),
+        'cpu_quota': round(cpus, 2),
+        'chunk_size': chunk_size,
+        'chunk_unit': CHUNK_SIZE_UNIT,
+        'max_workers': preset['max_workers'],
+        'buffer_size': preset['buffer_size'],
+        'embed_batch_size': preset['embed_batch_size'],
+        'upsert_batch_size': preset['upsert_batch_size'],
+        # Each worker is a full copy of the app: never more than the CPUs allow
+        'workers': _cap_workers(max(1, min(preset['workers'], math.floor(cpus)))),
+    }
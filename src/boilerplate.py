@@ -0,0 +1,121 @@
+"""
+Running header and footer removal before chunking.
+
+Page headers, footers and page numbers repeat on nearly every page, so they
+end up in nearly every chunk: more chunks, more embedding calls and more
+prompt tokens. While pages stream in, the first and last
+BOILERPLATE_EDGE_LINES lines of each page are counted under a normalized
+form (lowercase, whitespace collapsed, digit runs as '#', so "Page 3 of 40"
+and "Page 4 of 40" are the same line), separately for the top and the
+bottom of the page. An edge line is stripped once it has appeared on at
+least BOILERPLATE_MIN_REPEATS pages and on most pages since it first
+appeared. The second condition keeps body lines that only happen to land
+at a page edge now and then.
+
+Only the first BOILERPLATE_SAMPLE_PAGES pages are held back, until the
+counts can tell boilerplate from content. Later pages are stripped as they
+arrive, and rare lines are pruned periodically, so memory stays bounded for
+any page count.
+"""
+import re
+from typing import Dict, Generator, Iterable, List, Tuple
+
+from config import BOILERPLATE_EDGE_LINES, BOILERPLATE_MIN_REPEATS, BOILERPLATE_SAMPLE_PAGES
+
+_DIGITS = re.compile(r"\d+")
+_MAX_LINE_LENGTH = 200  # Longer lines are paragraphs, never headers
+_PRUNE_EVERY = 64  # Pages between pruning passes over the line counts
+_MIN_SHARE = 0.5  # Fraction of pages since a line first appeared that must repeat it
+
+
+def normalize(line: str) -> str:
+    return _DIGITS.sub("#", " ".join(line.lower().split()))
+
+
+class BoilerplateStripper:
+    """Learns and removes one document's running headers and footers."""
+
+    def __init__(self, sample_pages: int = BOILERPLATE_SAMPLE_PAGES, edge_lines: int = BOILERPLATE_EDGE_LINES,
+                 min_repeats: int = BOILERPLATE_MIN_REPEATS):
+        self.sample_pages = sample_pages
+        self.edge_lines = edge_lines
+        self.min_repeats = min_repeats
+        self.pages_seen = 0
+        self.lines_removed = 0
+        self.chars_removed = 0
+        # (side, normalized line) -> [pages it appeared on, first page, last page]
+        self._lines: Dict[Tuple[str, str], List[int]] = {}
+
+    def strip(self, pages: Iterable[str]) -> Generator[str, None, None]:
+        """Yield every page (same order and count), with header and footer lines removed."""
+        held: List[str] = []
+        for page_text in pages:
+            self._observe(page_text)
+            if held is not None:
+                held.append(page_text)
+                if len(held) < self.sample_pages:
+                    continue
+                for text in held:
+                    yield self._strip_page(text)
+                held = None
+                continue
+            yield self._strip_page(page_text)
+        for text in held or ():
+            yield self._strip_page(text)
+
+    def _observe(self, page_text: str):
+        if not page_text:
+            return
+        self.pages_seen += 1
+        content = [line for line in page_text.split("\n") if line.strip()]
+        edges = {('top', normalize(line)) for line in content[:self.edge_lines] if len(line) <= _MAX_LINE_LENGTH}
+        edges |= {('bottom', normalize(line)) for line in content[-self.edge_lines:] if len(line) <= _MAX_LINE_LENGTH}
+        for key in edges:
+            entry = self._lines.get(key)
+            if entry is None:
+                self._lines[key] = [1, self.pages_seen, self.pages_seen]
+            else:
+                entry[0] += 1
+                entry[2] = self.pages_seen
+        if self.pages_seen % _PRUNE_EVERY == 0:
+            # Forget lines that have not repeated lately (lossy counting)
+            cutoff = self.pages_seen - _PRUNE_EVERY
+            for key in [k for k, (_, _, last) in self._lines.items() if last <= cutoff and not self._repeats(k)]:
+                del self._lines[key]
+
+    def _repeats(self, key: Tuple[str, str]) -> bool:
+        entry = self._lines.get(key)
+        if entry is None:
+            return False
+        count, first, _ = entry
+        return count >= self.min_repeats and count >= _MIN_SHARE * (self.pages_seen - first + 1)
+
+    def _is_boilerplate(self, line: str, side: str) -> bool:
+        return len(line) <= _MAX_LINE_LENGTH and self._repeats((side, normalize(line)))
+
+    def _strip_page(self, page_text: str) -> str:
+        if not page_text:
+            return page_text
+        lines = page_text.split("\n")
+        start, end = 0, len(lines)
+        # Remove from each end while edge lines are boilerplate (blank lines don't count as edges)
+        for step, side in ((1, 'top'), (-1, 'bottom')):
+            seen = 0
+            index = start if step == 1 else end - 1
+            while start < end and seen < self.edge_lines:
+                line = lines[index]
+                if line.strip():
+                    if not self._is_boilerplate(line, side):
+                        break
+                    seen += 1
+                    self.lines_removed += 1
+                    self.chars_removed += len(line) + 1
+                if step == 1:
+                    start += 1
+                else:
+                    end -= 1
+                index += step
+        return "\n".join(lines[start:end])
+
+    def get_stats(self) -> Dict:
+        return {'lines_removed': self.lines_removed, 'chars_removed': self.chars_removed}
@@ -0,0 +1,169 @@
+"""
+Ingestion checkpoints: resume a failed or interrupted ingest where it stopped.
+
+A long PDF is embedded batch by batch; without a record of progress, a
+Cohere failure or a restart at page 900 of 1,000 means parsing and paying
+for every embedding again. Every INGEST_CHECKPOINT_PAGES pages, once the
+pending rows are in the database (VectorStore.when_written: with the spool,
+when its flusher has written them), the ingest records how far it got (the
+last page whose chunks are all stored, running totals and the document's
+partial centroid sums) in one small JSON file per document and collection.
+
+Checkpoints live on local disk, next to the uploaded file they refer to:
+the source is kept until its ingest completes, and a checkpoint is useless
+without it. A resumed ingest re-reads the pages already done (from the
+extraction cache) but skips chunking and embedding them; chunk ids are
+deterministic, so rows re-written around the checkpoint are upserts.
+
+An ingest holds a lock on its checkpoint (see src/filelock.py) from open()
+until it completes or fails, so two uvicorn workers (or a resume and an
+upload) never run the same job at once. After INGEST_MAX_ATTEMPTS failed
+attempts a job is marked failed and no longer resumed automatically.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import INGEST_CHECKPOINT_DIR, INGEST_MAX_ATTEMPTS
+from src import filelock
+
+_SUFFIX = ".json"
+_LOCK_SUFFIX = ".lock"
+
+
+class IngestBusy(RuntimeError):
+    """Another worker (or thread) is already ingesting this document into this collection."""
+
+
+class Checkpoint:
+    """Progress of one document's ingest into one collection."""
+
+    def __init__(self, directory: str, doc_id: str, collection: str, source: str, state: Dict = None):
+        self.path = os.path.join(directory, f"{collection}__{doc_id}{_SUFFIX}")
+        self.lock_path = self.path[:-len(_SUFFIX)] + _LOCK_SUFFIX
+        self._lock_fd = None
+        self._save_lock = threading.Lock()  # Progress may be saved from the vector spool's flusher
+        self.state = state or {
+            'doc_id': doc_id,
+            'collection': collection,
+            'source': source,
+            'filename': os.path.basename(source),
+            'pages_committed': 0,
+            'chunks': 0,
+            'characters': 0,
+            'duplicates': 0,
+            'tokens_saved': 0,
+            'centroids': {},
+            'attempts': 0,
+            'status': 'in_progress',
+            'last_error': None,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'updated_at': None,
+        }
+        self.state['source'] = source  # A re-upload may have saved the file elsewhere
+
+    @property
+    def pages_committed(self) -> int:
+        return self.state['pages_committed']
+
+    def save(self, **progress):
+        """Record progress (pages_committed, totals, centroids); atomic, so a crash keeps the previous one."""
+        with self._save_lock:
+            self.state.update(progress)
+            self.state['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.path)
+
+    def fail(self, error: Exception):
+        """Record a failed attempt; the job is marked failed once it used INGEST_MAX_ATTEMPTS."""
+        status = 'failed' if self.state['attempts'] >= INGEST_MAX_ATTEMPTS else 'in_progress'
+        self.save(status=status, last_error=str(error))
+        if status == 'failed':
+            print(f"❌ Ingest of {self.state['filename']} failed {self.state['attempts']} times; "
+                  f"not resuming it again (re-upload to retry)")
+
+    def complete(self):
+        """The ingest finished: forget its progress."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.release()
+
+    def release(self):
+        """Let other workers claim this job (no-op if not held)."""
+        if self._lock_fd is not None:
+            filelock.unlock(self._lock_fd, self.lock_path)
+            self._lock_fd = None
+
+
+class CheckpointStore:
+    """Directory of checkpoint files, one per (collection, doc_id)."""
+
+    def __init__(self, directory: str = INGEST_CHECKPOINT_DIR):
+        self.directory = directory
+
+    def open(self, doc_id: str, collection: str, source: str) -> Checkpoint:
+        """
+        Claim the job: the checkpoint to resume from, or a fresh one (counts this attempt either way).
+
+        Raises IngestBusy if another worker holds it; call complete() or
+        release() on the result when done. Opening a failed job (a re-upload:
+        resumes skip them) starts a new round of attempts.
+        """
+        checkpoint = Checkpoint(self.directory, doc_id, collection, source)
+        fd = filelock.try_lock(checkpoint.lock_path)
+        if fd is None:
+            raise IngestBusy(f"{os.path.basename(source)} is already being ingested into {collection}")
+        state = self._read(checkpoint.path)
+        if state is not None and state.get('doc_id') == doc_id:
+            checkpoint = Checkpoint(self.directory, doc_id, collection, source, state)
+            if checkpoint.state.get('status') == 'failed':
+                checkpoint.state.update(status='in_progress', attempts=0)
+        checkpoint._lock_fd = fd
+        checkpoint.state['attempts'] += 1
+        return checkpoint
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _running(self, state: Dict) -> bool:
+        """Whether some worker holds the job's lock right now."""
+        checkpoint = Checkpoint(self.directory, state['doc_id'], state['collection'], state.get('source') or '')
+        fd = filelock.try_lock(checkpoint.lock_path)
+        if fd is None:
+            return True
+        filelock.unlock(fd)
+        return False
+
+    def resumable(self) -> List[Dict]:
+        """Pending jobs worth resuming: not running, not failed, source still on disk."""
+        return [job for job in self.pending()
+                if job['source_available'] and not job['running'] and job.get('status') != 'failed']
+
+    def pending(self) -> List[Dict]:
+        """Unfinished ingests, oldest first, with whether they are running (centroid sums left out)."""
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            state = self._read(os.path.join(self.directory, name))
+            if state is None:
+                continue
+            state.pop('centroids', None)
+            state['source_available'] = os.path.exists(state.get('source') or '')
+            state['running'] = self._running(state)
+            jobs.append(state)
+        return sorted(jobs, key=lambda job: job.get('started_at') or '')
@@ -0,0 +1,51 @@
+"""
+Compact chunk records.
+
+A large PDF produces tens of thousands of chunks. Plain dicts (plus a
+metadata dict each) cost several hundred bytes per chunk and keep the GC
+busy, so chunks are slotted objects that share one metadata dict per
+document. JSON-ready dicts are only built at the database boundary.
+"""
+import sys
+from typing import Dict, Optional
+
+
+def document_metadata(source: str, **extra) -> Dict:
+    """Create the metadata dict shared by every chunk of one document."""
+    metadata = {'source': sys.intern(source)}
+    metadata.update(extra)
+    return metadata
+
+
+class Chunk:
+    """One chunk of text. `metadata` is shared per document, never copied."""
+
+    __slots__ = ('id', 'text', 'start_char', 'end_char', 'page', 'token_count', 'metadata')
+
+    def __init__(self, id: int, text: str, start_char: int, end_char: int,
+                 token_count: int, metadata: Optional[Dict] = None, page: Optional[int] = None):
+        self.id = id
+        self.text = text
+        self.start_char = start_char
+        self.end_char = end_char
+        self.token_count = token_count
+        self.metadata = metadata if metadata is not None else {}
+        self.page = page
+
+    def record_id(self) -> str:
+        """Database id: stable across re-ingests of the same file (`doc_id` in metadata)."""
+        doc_id = self.metadata.get('doc_id')
+        if doc_id is None:
+            return f"chunk_{self.id}_{hash(self.text) % 10000}"
+        return f"{doc_id}-p{self.page}-c{self.id}"
+    
+    def record_metadata(self) -> Dict:
+        """Metadata as stored in the database (shared fields + per-chunk fields)."""
+        metadata = dict(self.metadata)
+        if self.page is not None:
+            metadata['page'] = self.page
+        metadata['token_count'] = self.token_count
+        return metadata
+
+    def __repr__(self) -> str:
+        return f"Chunk(id={self.id}, page={self.page}, tokens={self.token_count}, text={self.text[:40]!r})"
@@ -0,0 +1,132 @@
+"""
+Near-duplicate chunk detection with SimHash.
+
+Manuals and reports repeat boilerplate (legal footers, disclaimers, table of
+contents lines); every copy would otherwise be a paid embedding and crowd
+the top-k results. Each chunk gets a 64-bit SimHash over its word 3-grams.
+Chunks within DEDUP_MAX_HAMMING bits of one already stored in the same
+collection are written as references (duplicate_of, no embedding) instead.
+
+Lookup is LSH by banding: the fingerprint is cut into DEDUP_MAX_HAMMING + 1
+bands, and two fingerprints that differ in at most that many bits must agree
+on at least one band, so only chunks sharing a band are compared.
+Fingerprints live in memory per collection (bounded by
+DEDUP_MAX_FINGERPRINTS), so duplicates are found within a document and
+across documents ingested by the same process.
+"""
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import DEDUP_MAX_FINGERPRINTS, DEDUP_MAX_HAMMING, DEDUP_MIN_WORDS
+from src.chunk import Chunk
+
+_WORD = re.compile(r"\w+")
+_SHINGLE = 3
+_BITS = 64
+
+
+def fingerprint(text: str, min_words: int = DEDUP_MIN_WORDS) -> Optional[int]:
+    """64-bit SimHash of the text's word 3-grams (None if it has fewer than `min_words` words)."""
+    words = _WORD.findall(text.lower())
+    if len(words) < min_words:
+        return None
+    shingles = [" ".join(words[i:i + _SHINGLE]).encode() for i in range(len(words) - _SHINGLE + 1)]
+    # Two CRC32s with different seeds make one 64-bit feature hash (stable across processes)
+    hashes = np.fromiter(
+        ((zlib.crc32(s) << 32) | zlib.crc32(s, 0x9E3779B9) for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def _bands(max_hamming: int) -> List[Tuple[int, int]]:
+    """(shift, mask) per band: max_hamming + 1 bands covering all 64 bits."""
+    count = max_hamming + 1
+    width, extra = divmod(_BITS, count)
+    bands, shift = [], 0
+    for i in range(count):
+        size = width + (1 if i < extra else 0)
+        bands.append((shift, (1 << size) - 1))
+        shift += size
+    return bands
+
+
+class Deduplicator:
+    """SimHash index of one collection's stored chunks."""
+
+    def __init__(self, max_hamming: int = DEDUP_MAX_HAMMING, max_fingerprints: int = DEDUP_MAX_FINGERPRINTS):
+        self.max_hamming = max_hamming
+        self.max_fingerprints = max_fingerprints
+        self._bands = _bands(max_hamming)
+        self._buckets: List[Dict[int, List[str]]] = [{} for _ in self._bands]
+        # record id -> (fingerprint, doc_id), oldest first
+        self._entries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def split(self, chunks: List[Chunk]) -> Tuple[List[Chunk], List[Tuple[Chunk, str]]]:
+        """
+        Separate chunks to embed from near-duplicates.
+
+        Returns (unique chunks, [(duplicate chunk, record id of the chunk it repeats)]).
+        Unique chunks are added to the index, so later chunks (in this batch
+        or a later document) can reference them.
+        """
+        unique, duplicates = [], []
+        with self._lock:
+            for chunk in chunks:
+                record_id = chunk.record_id()
+                value = fingerprint(chunk.text)
+                if value is None:
+                    unique.append(chunk)
+                    continue
+                original = self._find(value, record_id)
+                if original is not None:
+                    duplicates.append((chunk, original))
+                    continue
+                self._add(record_id, value, chunk.metadata.get('doc_id'))
+                unique.append(chunk)
+        return unique, duplicates
+
+    def _find(self, value: int, record_id: str) -> Optional[str]:
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for candidate in buckets.get((value >> shift) & mask, ()):
+                # A re-ingested chunk is not a duplicate of its own earlier row
+                if candidate != record_id and (self._entries[candidate][0] ^ value).bit_count() <= self.max_hamming:
+                    return candidate
+        return None
+
+    def _add(self, record_id: str, value: int, doc_id: str):
+        if record_id in self._entries:
+            self._remove(record_id)
+        self._entries[record_id] = (value, doc_id)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((value >> shift) & mask, []).append(record_id)
+        while len(self._entries) > self.max_fingerprints:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, record_id: str):
+        value, _ = self._entries.pop(record_id)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            key = (value >> shift) & mask
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.remove(record_id)
+                if not bucket:
+                    del buckets[key]
+
+    def forget(self, doc_id: str = None):
+        """Drop one document's fingerprints (or all) after its rows were deleted."""
+        with self._lock:
+            if doc_id is None:
+                self._buckets = [{} for _ in self._bands]
+                self._entries.clear()
+                return
+            for record_id in [r for r, (_, d) in self._entries.items() if d == doc_id]:
+                self._remove(record_id)
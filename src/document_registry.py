@@ -0,0 +1,97 @@
+"""
+Per-document bookkeeping kept next to the vector table.
+
+Counting chunks with select(count='exact') scans the whole vector table.
+Instead, each ingest writes one row to document_registry (chunks, pages,
+bytes, ingest time, embedding model) and /stats reads the
+document_registry_stats view, which aggregates a handful of rows.
+"""
+import hashlib
+import time
+from typing import Dict, List
+
+from src import metrics
+
+REGISTRY_TABLE = "document_registry"
+STATS_VIEW = "document_registry_stats"
+
+
+def document_id(path: str, block_size: int = 1 << 20) -> str:
+    """Stable id for a file's contents: the first 16 hex digits of its SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def content_id(data: bytes) -> str:
+    """document_id() of a file with these contents (for bytes already in memory)."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class DocumentRegistry:
+    """Reads and writes document_registry rows for one collection."""
+
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self.collection = vector_store.collection
+
+    def register(self, doc_id: str, source: str, summary: Dict, size_bytes: int, embedding_model: str):
+        """Record (or replace) one ingested document."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_upsert")
+        self.vector_store.client.table(REGISTRY_TABLE).upsert({
+            'doc_id': doc_id,
+            'collection': self.collection,
+            'source': source,
+            'pages': summary['pages'],
+            'chunks': summary['chunks'],
+            'characters': summary['characters'],
+            'bytes': size_bytes,
+            'embedding_model': embedding_model,
+            'ingest_seconds': round(summary['processing_time'], 3),
+            'ingested_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }, on_conflict='collection,doc_id').execute()
+
+    def restore(self, rows: List[Dict]):
+        """Upsert registry rows exported from a collection (see src/snapshot.py) into this one."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_upsert")
+        self.vector_store.client.table(REGISTRY_TABLE).upsert(
+            [{**row, 'collection': self.collection} for row in rows], on_conflict='collection,doc_id').execute()
+
+    def stats(self) -> Dict:
+        """Aggregates for this collection (one small row from the stats view)."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_stats")
+        response = self.vector_store.client.table(STATS_VIEW).select('*').eq('collection', self.collection).execute()
+        row = response.data[0] if response.data else {}
+        return {
+            'documents': row.get('documents') or 0,
+            'total_chunks': row.get('chunks') or 0,
+            'pages': row.get('pages') or 0,
+            'bytes': row.get('bytes') or 0,
+            'last_ingested_at': row.get('last_ingested_at'),
+        }
+
+    def list_documents(self) -> List[Dict]:
+        """Every registered document in this collection, newest first."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_list")
+        response = (self.vector_store.client.table(REGISTRY_TABLE).select('*')
+                    .eq('collection', self.collection).order('ingested_at', desc=True).execute())
+        return response.data
+
+    def get(self, doc_id: str) -> Dict:
+        """One document's registry row, or None."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_get")
+        response = (self.vector_store.client.table(REGISTRY_TABLE).select('*')
+                    .eq('collection', self.collection).eq('doc_id', doc_id).execute())
+        return response.data[0] if response.data else None
+
+    def delete(self, doc_id: str):
+        """Forget one document."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_delete")
+        self.vector_store.client.table(REGISTRY_TABLE).delete().eq('collection', self.collection).eq('doc_id', doc_id).execute()
+
+    def clear(self):
+        """Forget every document in this collection."""
+        metrics.API_CALLS.inc(service="supabase", operation="registry_delete")
+        self.vector_store.client.table(REGISTRY_TABLE).delete().eq('collection', self.collection).execute()
@@ -1,6 +1,8 @@
 import os
+import threading
 from typing import List
-import cohere
+from src import metrics
+from src import transport
 
 class EmbeddingManager:
     """Handles text embeddings using Cohere's FREE API (generous free tier)."""
@@ -12,22 +14,34 @@ class EmbeddingManager:
         Free tier: 100 API calls/minute, plenty for our use case.
         """
         self.model_name = model_name
-        api_key = os.getenv("COHERE_API_KEY", "TRIAL_KEY")  # Trial key works for testing
-        
-        # Initialize Cohere client
-        self.client = cohere.Client(api_key)
+        self._api_key = os.getenv("COHERE_API_KEY", "TRIAL_KEY")  # Trial key works for testing
+        self._client = None
+        self._client_lock = threading.Lock()
         print(f"☁️ Using Cohere FREE API: {model_name}")
     
+    @property
+    def client(self):
+        """Cohere client, imported and constructed on first use (keeps cold starts fast)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import cohere
+                    self._client = cohere.Client(self._api_key, httpx_client=transport.client(timeout=60.0))
+        return self._client
+    
     def embed_text(self, text: str, max_retries: int = 3) -> List[float]:
         """Convert single text to embedding using Cohere API."""
+        metrics.API_CALLS.inc(service="cohere", operation="embed")
         try:
-            response = self.client.embed(
-                texts=[text],
-                model=self.model_name,
-                input_type="search_document"
-            )
+            with metrics.span("query_embed"):
+                response = self.client.embed(
+                    texts=[text],
+                    model=self.model_name,
+                    input_type="search_document"
+                )
             return response.embeddings[0]
         except Exception as e:
+            metrics.API_ERRORS.inc(service="cohere", operation="embed")
             raise Exception(f"Failed to generate embedding: {e}")
 
     def embed_batch(self, texts: List[str], batch_size: int = 96) -> List[List[float]]:
@@ -44,6 +58,7 @@ class EmbeddingManager:
             for i in range(0, len(texts), batch_size):
                 batch = texts[i:i+batch_size]
                 
+                metrics.API_CALLS.inc(service="cohere", operation="embed_batch")
                 response = self.client.embed(
                     texts=batch,
                     model=self.model_name,
@@ -56,5 +71,6 @@ class EmbeddingManager:
             return all_embeddings
             
         except Exception as e:
+            metrics.API_ERRORS.inc(service="cohere", operation="embed_batch")
             print(f"❌ Failed to embed batch: {str(e)}")
             raise
\ No newline at end of file
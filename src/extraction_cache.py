@@ -0,0 +1,177 @@
+"""
+On-disk cache of extracted PDF page texts.
+
+Parsing is the most CPU-heavy ingest step, and a re-uploaded PDF or a retry
+after an embedding failure would parse the same file again. Each completed
+extraction is stored as one zlib stream of length-prefixed UTF-8 pages, named
+after the file's content hash and the loader version, so a pypdf upgrade
+(or a change to this format) never serves stale text. Pages are written and
+read back incrementally: neither side holds the whole document in memory.
+An extraction that stops early (the ingest failed, or the consumer stopped)
+keeps the pages it got as a partial entry: the next load serves them and
+parses only the pages after them. The directory is bounded by
+EXTRACTION_CACHE_MAX_MB; reads refresh an entry's mtime and the least
+recently used entries are evicted first.
+"""
+import os
+import struct
+import threading
+import zlib
+from typing import Generator, Optional
+
+from config import EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_ENABLED, EXTRACTION_CACHE_MAX_MB
+from src import metrics
+
+FORMAT_VERSION = 1
+_LENGTH = struct.Struct("!I")
+_READ_SIZE = 64 * 1024
+_SUFFIX = ".pages.z"
+_PARTIAL = ".partial"
+
+
+def loader_version() -> str:
+    """Changes whenever cached text could differ: the pypdf version and this format."""
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        pypdf_version = version("pypdf")
+    except PackageNotFoundError:
+        pypdf_version = "unknown"
+    return f"pypdf{pypdf_version}-f{FORMAT_VERSION}"
+
+
+class CacheWriter:
+    """Compresses pages into a temporary file; commit() publishes it, discard() drops it."""
+
+    def __init__(self, cache: "ExtractionCache", path: str):
+        self.cache = cache
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._compressor = zlib.compressobj(6)
+
+    def write(self, page_text: str):
+        data = (page_text or "").encode("utf-8")
+        self._file.write(self._compressor.compress(_LENGTH.pack(len(data)) + data))
+
+    def commit(self, partial: bool = False):
+        """Publish the pages written: the complete extraction, or (partial) a prefix of it."""
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        # Atomic: readers never see a half-written entry
+        os.replace(self._tmp_path, self.cache.partial_path(self.path) if partial else self.path)
+        if not partial:
+            self.cache.drop(self.cache.partial_path(self.path))
+        self.cache.evict()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+class ExtractionCache:
+    """Size-bounded LRU directory of extracted page texts."""
+
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, max_mb: float = EXTRACTION_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.version = loader_version()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self.directory, f"{file_hash}-{self.version}{_SUFFIX}")
+
+    @staticmethod
+    def partial_path(path: str) -> str:
+        return path[:-len(_SUFFIX)] + _PARTIAL + _SUFFIX
+
+    def read(self, file_hash: str, partial: bool = False) -> Optional[Generator[str, None, None]]:
+        """Page texts for a cached file (or, partial, the first pages of one), or None on a miss."""
+        path = self._path(file_hash)
+        cache = "extraction"
+        if partial:
+            path, cache = self.partial_path(path), "extraction_partial"
+        try:
+            os.utime(path)  # Most recently used
+        except OSError:
+            if not partial:
+                metrics.CACHE_MISSES.inc(cache=cache)
+            return None
+        metrics.CACHE_HITS.inc(cache=cache)
+        return self._pages(path)
+
+    @staticmethod
+    def drop(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _pages(path: str) -> Generator[str, None, None]:
+        decompressor = zlib.decompressobj()
+        buffer = b""
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_READ_SIZE), b""):
+                buffer += decompressor.decompress(block)
+                offset = 0
+                while len(buffer) - offset >= _LENGTH.size:
+                    (length,) = _LENGTH.unpack_from(buffer, offset)
+                    end = offset + _LENGTH.size + length
+                    if end > len(buffer):
+                        break
+                    yield buffer[offset + _LENGTH.size:end].decode("utf-8")
+                    offset = end
+                buffer = buffer[offset:]
+
+    def writer(self, file_hash: str) -> CacheWriter:
+        return CacheWriter(self, self._path(file_hash))
+
+    def evict(self):
+        """Remove least recently used entries until the directory fits in max_bytes."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure(directory: str = EXTRACTION_CACHE_DIR, max_mb: float = EXTRACTION_CACHE_MAX_MB) -> ExtractionCache:
+    """Replace the process-wide cache (e.g. a temporary directory for benchmarks)."""
+    global _cache
+    with _cache_lock:
+        _cache = ExtractionCache(directory, max_mb)
+        return _cache
+
+
+def get_cache() -> Optional[ExtractionCache]:
+    """The process-wide cache, or None when EXTRACTION_CACHE_ENABLED is off."""
+    global _cache
+    if not EXTRACTION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
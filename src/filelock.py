@@ -0,0 +1,58 @@
+"""
+Non-blocking exclusive file locks, held across processes.
+
+uvicorn workers are separate processes, so threading locks do not keep two
+of them from replaying the same spool segment or resuming the same
+checkpoint. These locks are advisory (flock on Unix, msvcrt on Windows),
+belong to the open file, and are released by the OS if the holder dies, so
+a crashed worker never leaves a stale lock behind. A holder may delete the
+lock file when it is done: try_lock() only returns a lock on the file that
+is still at `path`.
+"""
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def try_lock(path: str) -> Optional[int]:
+    """Lock `path` (created if missing); the file descriptor holding it, or None if another holder has it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return None
+        try:
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        # The previous holder deleted the file between our open and lock: lock the new one
+        os.close(fd)
+
+
+def unlock(fd: int, path: str = None):
+    """Release a lock taken with try_lock(), deleting the lock file at `path` first if given."""
+    try:
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
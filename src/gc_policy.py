@@ -0,0 +1,107 @@
+"""
+Garbage collection policy for the API process.
+
+Full collections walk every tracked object, including the long-lived Groq,
+Cohere and Supabase client graphs, and stall concurrent /ask requests. This
+module replaces blanket gc.collect() calls with:
+  - higher generation thresholds (fewer young-generation passes),
+  - gc.freeze() after startup so long-lived objects are never rescanned,
+  - full collections only under measured memory pressure,
+  - pause times exported as metrics.
+"""
+import gc
+import threading
+import time
+
+from config import (
+    GC_AGGRESSIVE,
+    GC_FREEZE_AFTER_STARTUP,
+    GC_MIN_INTERVAL_SECONDS,
+    GC_PRESSURE_RATIO,
+    GC_THRESHOLDS,
+)
+from src import metrics
+
+GC_PAUSE_SECONDS = metrics.Histogram(
+    "rag_gc_pause_seconds", "Garbage collection pause time", ("generation",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+GC_COLLECTIONS = metrics.Counter("rag_gc_collections_total", "Policy-triggered collections", ("reason",))
+
+_lock = threading.Lock()
+_installed = False
+_frozen = False
+_last_collect = 0.0
+_pause_start = 0.0
+
+
+def _on_gc(phase: str, info: dict):
+    global _pause_start
+    if phase == "start":
+        _pause_start = time.perf_counter()
+    elif _pause_start:
+        GC_PAUSE_SECONDS.observe(time.perf_counter() - _pause_start, generation=info.get("generation", ""))
+        _pause_start = 0.0
+
+
+def install():
+    """Apply generation thresholds and start timing GC pauses (idempotent)."""
+    global _installed
+    with _lock:
+        if _installed:
+            return
+        gc.set_threshold(*GC_THRESHOLDS)
+        gc.callbacks.append(_on_gc)
+        _installed = True
+
+
+def freeze():
+    """
+    Move every object alive now into the permanent generation.
+
+    Call once startup initialization (clients, models, config) is done;
+    later collections then skip those objects entirely.
+    """
+    global _frozen
+    if not GC_FREEZE_AFTER_STARTUP:
+        return
+    with _lock:
+        if _frozen:
+            return
+        gc.collect()
+        gc.freeze()
+        _frozen = True
+    print(f"🧊 GC: froze {gc.get_freeze_count()} startup objects")
+
+
+def maybe_collect(reason: str = "batch") -> bool:
+    """
+    Run a full collection only if memory is under pressure.
+
+    Returns True if a collection ran. With GC_AGGRESSIVE = True this
+    collects every time (the old behaviour), still rate-limited.
+    """
+    global _last_collect
+    now = time.monotonic()
+    if now - _last_collect < GC_MIN_INTERVAL_SECONDS:
+        return False
+
+    if not GC_AGGRESSIVE:
+        from src.memory_monitor import MemoryMonitor
+        monitor = MemoryMonitor()
+        if monitor.get_memory_mb() < monitor.warning_threshold_mb * GC_PRESSURE_RATIO:
+            return False
+
+    _last_collect = now
+    gc.collect()
+    GC_COLLECTIONS.inc(reason=reason)
+    return True
+
+
+def get_stats() -> dict:
+    """Current GC settings and counters (for /health)."""
+    return {
+        "thresholds": gc.get_threshold(),
+        "frozen_objects": gc.get_freeze_count(),
+        "generation_counts": gc.get_count(),
+    }
@@ -0,0 +1,213 @@
+"""
+pgvector index lifecycle: choose, build and tune the embedding index.
+
+An IVFFlat index trains its centroids on the rows present when it is built,
+so the `lists = 100` index from setup_supabase.sql, built on an empty table,
+clusters nothing useful. This module picks the index from the row count:
+  - under VECTOR_INDEX_MIN_ROWS: no index (an exact scan is fast and exact),
+  - up to VECTOR_INDEX_HNSW_MAX_ROWS: HNSW (no training, best recall/latency),
+  - above: IVFFlat with lists ≈ sqrt(rows) (far cheaper to build than HNSW).
+It rebuilds when the table has outgrown the index, records what was built
+in vector_index_meta and turns a recall target into per-query
+ivfflat.probes / hnsw.ef_search values passed to match_documents.
+
+DDL needs a direct connection: DATABASE_URL plus psycopg 3.
+Run maintenance by hand with `python manage.py index status|rebuild`.
+"""
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from config import (
+    HNSW_EF_CONSTRUCTION,
+    HNSW_M,
+    INDEX_MAINTENANCE_WORK_MEM,
+    RAG_RECALL_TARGET,
+    VECTOR_INDEX_HNSW_MAX_ROWS,
+    VECTOR_INDEX_MIN_ROWS,
+    VECTOR_SIMILARITY_METRIC,
+)
+
+_OPERATOR_SUFFIX = {"cosine": "cosine_ops", "l2": "l2_ops", "inner_product": "ip_ops"}
+
+# recall target -> (IVFFlat probes per sqrt(lists), HNSW ef_search)
+# From pgvector's guidance (probes ≈ sqrt(lists) for ~0.9 recall, ef_search 40 default)
+_RECALL_TABLE = (
+    (0.80, 0.5, 20),
+    (0.90, 1.0, 40),
+    (0.95, 2.0, 80),
+    (0.98, 4.0, 160),
+    (0.99, 8.0, 320),
+)
+
+# Rebuild IVFFlat once the ideal lists value drifts this far from the built one
+_LISTS_DRIFT = 2.0
+
+
+def plan_index(rows: int, column_type: str = "vector", index_type: str = None) -> Dict:
+    """The index this many rows should have (or the parameters for a forced `index_type`)."""
+    opclass = f"{column_type}_{_OPERATOR_SUFFIX[VECTOR_SIMILARITY_METRIC]}"
+    if index_type is None:
+        if rows < VECTOR_INDEX_MIN_ROWS:
+            index_type = 'none'
+        elif rows <= VECTOR_INDEX_HNSW_MAX_ROWS:
+            index_type = 'hnsw'
+        else:
+            index_type = 'ivfflat'
+    if index_type == 'none':
+        return {'type': 'none', 'opclass': opclass}
+    if index_type == 'hnsw':
+        return {'type': 'hnsw', 'opclass': opclass, 'm': HNSW_M, 'ef_construction': HNSW_EF_CONSTRUCTION}
+    return {'type': 'ivfflat', 'opclass': opclass, 'lists': max(1, round(math.sqrt(rows)))}
+
+
+def search_params(meta: Optional[Dict], match_count: int, recall_target: float = RAG_RECALL_TARGET) -> Dict:
+    """
+    match_documents arguments that reach `recall_target` on the built index.
+
+    `meta` is the vector_index_meta row for the table (None or type 'none':
+    no index, so no parameters).
+    """
+    if not meta or meta.get('index_type') not in ('hnsw', 'ivfflat'):
+        return {}
+    row = next((r for r in _RECALL_TABLE if r[0] >= recall_target), _RECALL_TABLE[-1])
+    _, probes_per_sqrt_list, ef_search = row
+    if meta['index_type'] == 'ivfflat':
+        lists = meta.get('lists') or 1
+        return {'ivfflat_probes': min(lists, max(1, math.ceil(math.sqrt(lists) * probes_per_sqrt_list)))}
+    # HNSW returns at most ef_search candidates
+    return {'hnsw_ef_search': max(ef_search, match_count)}
+
+
+def needs_rebuild(meta: Optional[Dict], plan: Dict) -> bool:
+    """True if the built index (from vector_index_meta) no longer fits the plan."""
+    built = (meta or {}).get('index_type', 'none')
+    if built != plan['type']:
+        return True
+    if plan['type'] == 'ivfflat':
+        ratio = plan['lists'] / max(1, meta.get('lists') or 1)
+        return ratio > _LISTS_DRIFT or ratio < 1 / _LISTS_DRIFT
+    return False
+
+
+class IndexManager:
+    """Inspects and rebuilds the embedding index over a direct Postgres connection."""
+
+    def __init__(self, table_name: str, dsn: str = None):
+        self.table_name = table_name
+        self.index_name = f"{table_name}_embedding_idx"
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        if not self.dsn:
+            raise ValueError("DATABASE_URL must be set in .env for index maintenance")
+
+    def _connect(self):
+        import psycopg  # Optional dependency, only needed for maintenance
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+        return psycopg.connect(self.dsn, autocommit=True)
+
+    def status(self) -> Dict:
+        """Row count, column type, current index definition and size, and the recorded meta."""
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {self.table_name}")
+            rows = cur.fetchone()[0]
+            cur.execute(
+                "SELECT t.typname FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid "
+                "WHERE a.attrelid = %s::regclass AND a.attname = 'embedding'",
+                (self.table_name,),
+            )
+            column_type = cur.fetchone()[0]
+            cur.execute(
+                "SELECT indexdef, pg_relation_size(format('%%I', indexname)::regclass) "
+                "FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+                (self.table_name, self.index_name),
+            )
+            index = cur.fetchone()
+            meta = self._read_meta(cur)
+        return {
+            'table': self.table_name,
+            'rows': rows,
+            'column_type': column_type,
+            'index_definition': index[0] if index else None,
+            'index_size_mb': round(index[1] / 1024 / 1024, 2) if index else 0.0,
+            'meta': meta,
+            'plan': plan_index(rows, column_type),
+        }
+
+    def _read_meta(self, cur) -> Optional[Dict]:
+        cur.execute(
+            "SELECT index_type, lists, m, ef_construction, rows_at_build, build_seconds, size_bytes, built_at "
+            "FROM vector_index_meta WHERE table_name = %s",
+            (self.table_name,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        keys = ('index_type', 'lists', 'm', 'ef_construction', 'rows_at_build', 'build_seconds', 'size_bytes', 'built_at')
+        return dict(zip(keys, row))
+
+    def rebuild(self, plan: Dict = None) -> Dict:
+        """
+        Build the planned index concurrently, swap it in and record it.
+
+        Reads and writes continue during the build. Returns the build report
+        (type, parameters, seconds, size).
+        """
+        current = self.status()
+        plan = plan or current['plan']
+        new_name = f"{self.index_name}_new"
+        start = time.time()
+
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}")
+            if plan['type'] == 'hnsw':
+                cur.execute(
+                    f"CREATE INDEX CONCURRENTLY {new_name} ON {self.table_name} "
+                    f"USING hnsw (embedding {plan['opclass']}) "
+                    f"WITH (m = {int(plan['m'])}, ef_construction = {int(plan['ef_construction'])})"
+                )
+            elif plan['type'] == 'ivfflat':
+                cur.execute(
+                    f"CREATE INDEX CONCURRENTLY {new_name} ON {self.table_name} "
+                    f"USING ivfflat (embedding {plan['opclass']}) WITH (lists = {int(plan['lists'])})"
+                )
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self.index_name}")
+            size_bytes = 0
+            if plan['type'] != 'none':
+                cur.execute(f"ALTER INDEX {new_name} RENAME TO {self.index_name}")
+                cur.execute("SELECT pg_relation_size(%s::regclass)", (self.index_name,))
+                size_bytes = cur.fetchone()[0]
+            build_seconds = round(time.time() - start, 2)
+
+            cur.execute(
+                "INSERT INTO vector_index_meta "
+                "(table_name, index_type, lists, m, ef_construction, rows_at_build, build_seconds, size_bytes, built_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW()) "
+                "ON CONFLICT (table_name) DO UPDATE SET index_type = EXCLUDED.index_type, "
+                "lists = EXCLUDED.lists, m = EXCLUDED.m, ef_construction = EXCLUDED.ef_construction, "
+                "rows_at_build = EXCLUDED.rows_at_build, build_seconds = EXCLUDED.build_seconds, "
+                "size_bytes = EXCLUDED.size_bytes, built_at = EXCLUDED.built_at",
+                (self.table_name, plan['type'], plan.get('lists'), plan.get('m'), plan.get('ef_construction'),
+                 current['rows'], build_seconds, size_bytes),
+            )
+
+        report = {
+            'table': self.table_name,
+            'index_type': plan['type'],
+            'rows': current['rows'],
+            'lists': plan.get('lists'),
+            'm': plan.get('m'),
+            'ef_construction': plan.get('ef_construction'),
+            'build_seconds': build_seconds,
+            'index_size_mb': round(size_bytes / 1024 / 1024, 2),
+        }
+        print(f"🧭 Index rebuilt: {report}")
+        return report
+
+    def maybe_rebuild(self) -> Optional[Dict]:
+        """Rebuild only if the row count has outgrown the current index."""
+        current = self.status()
+        if not needs_rebuild(current['meta'], current['plan']):
+            return None
+        return self.rebuild(current['plan'])
@@ -1,7 +1,10 @@
-from groq import Groq
 import os
+import threading
 from typing import List, Dict, Generator
 from dotenv import load_dotenv
+from src import metrics
+from src import transport
+import time
 
 load_dotenv()
 
@@ -10,19 +13,68 @@ class LLMManager:
     
     def __init__(self, model_name: str = "llama-3.1-8b-instant"):
         self.model_name = model_name
-        api_key = os.getenv("GROQ_API_KEY")
+        self._api_key = os.getenv("GROQ_API_KEY")
         
-        if not api_key:
+        if not self._api_key:
             raise ValueError("GROQ_API_KEY not found in .env file!")
         
-        # Initialize Groq client with explicit parameter names
-        self.client = Groq(
-            api_key=api_key,
-            timeout=30.0,  # Add reasonable timeout
-            max_retries=3  # Add retry logic
-        )
+        self._client = None
+        self._client_lock = threading.Lock()
         print(f"🚀 Using Groq model: {model_name}")
     
+    @property
+    def client(self):
+        """Groq client, imported and constructed on first use (keeps cold starts fast)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from groq import Groq
+                    # Initialize Groq client with explicit parameter names
+                    self._client = Groq(
+                        api_key=self._api_key,
+                        timeout=30.0,  # Add reasonable timeout
+                        max_retries=3,  # Add retry logic
+                        http_client=transport.client(timeout=30.0)  # Shared connection pool
+                    )
+        return self._client
+    
+    def _complete(self, **kwargs):
+        """Non-streaming chat completion with call, latency and token accounting."""
+        metrics.API_CALLS.inc(service="groq", operation="chat")
+        try:
+            with metrics.span("llm_completion"):
+                response = self.client.chat.completions.create(model=self.model_name, **kwargs)
+        except Exception:
+            metrics.API_ERRORS.inc(service="groq", operation="chat")
+            raise
+        
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            metrics.TOKENS.inc(usage.prompt_tokens, kind="prompt")
+            metrics.TOKENS.inc(usage.completion_tokens, kind="completion")
+        return response
+    
+    def _stream(self, **kwargs) -> Generator[str, None, None]:
+        """Streaming chat completion; records time to first token and total time."""
+        metrics.API_CALLS.inc(service="groq", operation="chat_stream")
+        start = time.perf_counter()
+        pieces = 0
+        try:
+            with self.client.chat.completions.create(model=self.model_name, stream=True, **kwargs) as stream:
+                for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        if pieces == 0:
+                            metrics.record_stage("llm_first_token", time.perf_counter() - start)
+                        pieces += 1
+                        yield chunk.choices[0].delta.content
+        except Exception:
+            metrics.API_ERRORS.inc(service="groq", operation="chat_stream")
+            raise
+        
+        metrics.record_stage("llm_completion", time.perf_counter() - start)
+        # Groq streams roughly one token per chunk
+        metrics.TOKENS.inc(pieces, kind="completion")
+    
     def generate_answer(self, question: str, context_chunks: List[str], 
                        mode: str = "pdf") -> Dict[str, any]:
         """
@@ -118,8 +170,7 @@ Question: {question}
 
 Please provide a detailed, well-structured answer based on the context above."""
 
-        response = self.client.chat.completions.create(
-            model=self.model_name,
+        response = self._complete(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -153,20 +204,15 @@ Question: {question}
 Please provide a detailed, well-structured answer based on the context above."""
 
         try:
-            with self.client.chat.completions.create(
-                model=self.model_name,
+            yield from self._stream(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.3,
                 max_tokens=800,
-                top_p=0.9,
-                stream=True
-            ) as stream:
-                for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        yield chunk.choices[0].delta.content
+                top_p=0.9
+            )
             print("✓ Streaming answer generated from PDF")
         except Exception as e:
             print(f"✗ Error in streaming answer: {str(e)}")
@@ -190,8 +236,7 @@ INSTRUCTIONS:
 
 Please provide a helpful answer based on general knowledge."""
 
-        response = self.client.chat.completions.create(
-            model=self.model_name,
+        response = self._complete(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -221,20 +266,15 @@ Please provide a helpful answer based on general knowledge."""
 Please provide a helpful answer based on general knowledge."""
 
         try:
-            with self.client.chat.completions.create(
-                model=self.model_name,
+            yield from self._stream(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.7,
                 max_tokens=800,
-                top_p=1,
-                stream=True
-            ) as stream:
-                for chunk in stream:
-                    if chunk.choices[0].delta.content:
-                        yield chunk.choices[0].delta.content
+                top_p=1
+            )
             print("✓ Streaming general answer generated")
         except Exception as e:
             print(f"✗ Error in streaming answer: {str(e)}")
@@ -256,8 +296,7 @@ Text to summarize:
 Summary:"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
+            response = self._complete(
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5,
                 max_tokens=500
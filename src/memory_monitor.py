@@ -1,16 +1,26 @@
 """
 Memory monitoring utilities for 500MB cloud deployment.
-Add this to your monitoring dashboard.
+MemoryGovernor uses them to size ingestion batches from live RSS.
 """
 
 import os
 import time
-from typing import Dict
+from typing import Dict, Iterable, Iterator
+from config import (
+    MEMORY_PAUSE_POLL_SECONDS,
+    MEMORY_MAX_PAUSE_SECONDS,
+)
+from src import autotune
+from src import gc_policy
 
 class MemoryMonitor:
     """Monitor memory usage during PDF processing."""
     
-    def __init__(self):
+    def __init__(self, max_memory_mb: float = None, warning_threshold_mb: float = None):
+        """Limits default to the auto-tuned settings (config values when AUTO_TUNE is off)."""
+        settings = autotune.effective_settings()
+        self.max_memory_mb = max_memory_mb or settings['memory_limit_mb']
+        self.warning_threshold_mb = warning_threshold_mb or settings['memory_warning_mb']
         self.start_memory = 0
         self.peak_memory = 0
         self.current_memory = 0
@@ -22,8 +32,12 @@ class MemoryMonitor:
             process = psutil.Process(os.getpid())
             return process.memory_info().rss / 1024 / 1024
         except ImportError:
-            # Fallback if psutil not available
-            return 0
+            # Fallback if psutil not available: read RSS from /proc on Linux
+            try:
+                with open('/proc/self/statm') as f:
+                    return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+            except (OSError, ValueError, IndexError):
+                return 0
     
     def start_tracking(self) -> float:
         """Start memory tracking."""
@@ -43,8 +57,8 @@ class MemoryMonitor:
             'current_mb': round(self.current_memory, 2),
             'peak_mb': round(self.peak_memory, 2),
             'delta_mb': round(self.current_memory - self.start_memory, 2),
-            'available_mb': 500 - self.peak_memory,
-            'utilization': round((self.peak_memory / 500) * 100, 1)
+            'available_mb': round(self.max_memory_mb - self.peak_memory, 2),
+            'utilization': round((self.peak_memory / self.max_memory_mb) * 100, 1)
         }
     
     def get_stats(self) -> Dict:
@@ -59,13 +73,128 @@ class MemoryMonitor:
         monitor = MemoryMonitor()
         current = monitor.get_memory_mb()
         
-        if current > 400:  # 400MB out of 500MB
-            print(f"⚠️  HIGH MEMORY WARNING: {current:.1f}MB / 500MB")
+        if current > monitor.warning_threshold_mb:
+            print(f"⚠️  HIGH MEMORY WARNING: {current:.1f}MB / {monitor.max_memory_mb}MB")
             return True
         
         return False
 
 
+class MemoryGovernor:
+    """
+    Adapts ingestion batch sizes to live memory usage.
+    
+    One scale factor drives every batch size: it halves when RSS crosses the
+    warning threshold and grows again while there is headroom. Above the
+    threshold, page extraction pauses until memory drops.
+    """
+    
+    MIN_SCALE = 0.125
+    MAX_SCALE = 4.0
+    HEADROOM_RATIO = 0.75  # Grow batches below 75% of the warning threshold
+    
+    def __init__(self, monitor: MemoryMonitor = None,
+                 buffer_size: int = 20,
+                 embed_batch_size: int = 96,
+                 upsert_batch_size: int = 100,
+                 max_embed_batch_size: int = 96,
+                 poll_seconds: float = MEMORY_PAUSE_POLL_SECONDS,
+                 max_pause_seconds: float = MEMORY_MAX_PAUSE_SECONDS):
+        """
+        Args:
+            monitor: Memory source (its thresholds are used)
+            buffer_size: Chunks per flush at scale 1.0
+            embed_batch_size: Texts per embedding call at scale 1.0
+            upsert_batch_size: Rows per database write at scale 1.0
+            max_embed_batch_size: Provider limit (Cohere accepts 96 texts per call)
+            poll_seconds: Sleep between samples while paused
+            max_pause_seconds: Give up waiting and continue at minimum batch size
+        """
+        self.monitor = monitor or MemoryMonitor()
+        self.base_buffer_size = buffer_size
+        self.base_embed_batch_size = embed_batch_size
+        self.base_upsert_batch_size = upsert_batch_size
+        self.max_embed_batch_size = max_embed_batch_size
+        self.poll_seconds = poll_seconds
+        self.max_pause_seconds = max_pause_seconds
+        
+        self.scale = 1.0
+        self.pauses = 0
+        self.paused_seconds = 0.0
+        self._gave_up = False
+        self.monitor.start_tracking()
+    
+    @property
+    def buffer_size(self) -> int:
+        return max(1, round(self.base_buffer_size * self.scale))
+    
+    @property
+    def embed_batch_size(self) -> int:
+        return max(1, min(self.max_embed_batch_size, round(self.base_embed_batch_size * self.scale)))
+    
+    @property
+    def upsert_batch_size(self) -> int:
+        return max(1, round(self.base_upsert_batch_size * self.scale))
+    
+    def sample(self) -> float:
+        """Read RSS and adjust the scale factor. Returns current MB."""
+        current = self.monitor.check_memory()['current_mb']
+        threshold = self.monitor.warning_threshold_mb
+        
+        if current >= threshold:
+            self.scale = max(self.MIN_SCALE, self.scale / 2)
+        elif current < threshold * self.HEADROOM_RATIO:
+            self.scale = min(self.MAX_SCALE, self.scale * 1.5)
+        return current
+    
+    def wait_for_headroom(self):
+        """Block while RSS is above the warning threshold (bounded by max_pause_seconds)."""
+        current = self.sample()
+        if current < self.monitor.warning_threshold_mb:
+            self._gave_up = False
+            return
+        if self._gave_up:
+            # Memory never dropped last time; don't stall every page waiting for it
+            return
+        
+        self.pauses += 1
+        print(f"⏸️  Memory at {current:.0f}MB (threshold {self.monitor.warning_threshold_mb}MB), pausing extraction...")
+        started = time.time()
+        gc_policy.maybe_collect("memory_pause")
+        current = self.sample()
+        while current >= self.monitor.warning_threshold_mb:
+            if time.time() - started >= self.max_pause_seconds:
+                print(f"⚠️  Memory still high after {self.max_pause_seconds}s, continuing at minimum batch size")
+                self._gave_up = True
+                break
+            time.sleep(self.poll_seconds)
+            current = self.sample()
+        self.paused_seconds += time.time() - started
+    
+    def paced(self, iterable: Iterable) -> Iterator:
+        """Yield from iterable, waiting for memory headroom before producing each item."""
+        iterator = iter(iterable)
+        while True:
+            self.wait_for_headroom()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            yield item
+    
+    def get_stats(self) -> Dict:
+        stats = self.monitor.get_stats()
+        stats.update({
+            'scale': self.scale,
+            'buffer_size': self.buffer_size,
+            'embed_batch_size': self.embed_batch_size,
+            'upsert_batch_size': self.upsert_batch_size,
+            'pauses': self.pauses,
+            'paused_seconds': round(self.paused_seconds, 2),
+        })
+        return stats
+
+
 # Example usage:
 if __name__ == "__main__":
     try:
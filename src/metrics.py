@@ -0,0 +1,236 @@
+"""
+Lightweight metrics and per-stage tracing, exposed in Prometheus text format.
+
+No external dependency: counters, gauges and histograms are a few dicts
+guarded by a lock. Stage spans are sampled; with TRACE_SAMPLE_RATE = 0 a
+span is a shared no-op object, so instrumented code pays one comparison.
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+from config import TRACE_SAMPLE_RATE
+
+# Seconds; covers cache hits (ms) up to slow LLM completions and large ingests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        return []
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Point-in-time value; either set explicitly or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 callback: Callable[[], float] = None):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self._callback is not None:
+            return [f"{self.name} {self._callback()}"]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (Prometheus semantics)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self):
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds every metric for the /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ============================================================================
+# Project metrics
+# ============================================================================
+
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Time spent per pipeline stage", ("stage",))
+API_CALLS = Counter("rag_api_calls_total", "Calls to external APIs", ("service", "operation"))
+API_ERRORS = Counter("rag_api_errors_total", "Failed calls to external APIs", ("service", "operation"))
+TOKENS = Counter("rag_tokens_total", "Tokens sent to or generated by models", ("kind",))
+CACHE_HITS = Counter("rag_cache_hits_total", "Cache hits", ("cache",))
+CACHE_MISSES = Counter("rag_cache_misses_total", "Cache misses", ("cache",))
+INGESTED = Counter("rag_ingested_total", "Ingested units", ("unit",))
+DEDUP_SAVED = Counter("rag_dedup_saved_total", "Near-duplicate chunks stored as references, not embedded", ("unit",))
+
+
+def _rss_bytes() -> float:
+    from src.memory_monitor import MemoryMonitor
+    return MemoryMonitor().get_memory_mb() * 1024 * 1024
+
+
+RSS_BYTES = Gauge("rag_process_rss_bytes", "Resident set size of the API process", callback=_rss_bytes)
+
+
+# ============================================================================
+# Spans
+# ============================================================================
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.stage)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_sample_rate = TRACE_SAMPLE_RATE
+
+
+def set_sample_rate(rate: float):
+    """Fraction of spans recorded (0 disables tracing, 1 records every span)."""
+    global _sample_rate
+    _sample_rate = rate
+
+
+def span(stage: str):
+    """Time a block as one pipeline stage: `with span("vector_search"): ...`"""
+    if _sample_rate <= 0:
+        return _NULL_SPAN
+    if _sample_rate < 1 and random.random() >= _sample_rate:
+        return _NULL_SPAN
+    return _Span(stage)
+
+
+def record_stage(stage: str, seconds: float):
+    """Record a duration measured by the caller (e.g. time to first token)."""
+    if _sample_rate <= 0:
+        return
+    if _sample_rate < 1 and random.random() >= _sample_rate:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def timed_iter(iterable: Iterable, stage: str) -> Iterator:
+    """Yield from iterable, recording the time each item took to produce as `stage`."""
+    iterator = iter(iterable)
+    while True:
+        with span(stage):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def render() -> str:
+    """Prometheus text exposition of all metrics."""
+    return REGISTRY.render()
@@ -1,17 +1,123 @@
-import pypdf
+import queue
+import threading
 from typing import Dict, Generator
-import gc
+
+from src import extraction_cache
 
 class PDFLoader:
     """Extracts text from PDF files with memory-efficient streaming."""
     
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, file_hash: str = None):
+        """
+        Args:
+            file_hash: Content hash of the file (document_id()); computed on first use if omitted
+        """
         self.pdf_path = pdf_path
+        self.file_hash = file_hash
         self.text = ""
         self.pages = []
+        self._extracted_all = False
+    
+    def load_streaming(self, prefetch: int = 0) -> Generator[str, None, None]:
+        """
+        Stream text from PDF pages one at a time (memory efficient).
+        
+        Args:
+            prefetch: Pages to extract ahead in a background thread while the
+                      caller embeds/stores earlier pages (0 = extract inline)
+        """
+        if prefetch > 0:
+            yield from self._prefetched(prefetch)
+            return
+        yield from self._cached_pages()
+    
+    def _prefetched(self, depth: int) -> Generator[str, None, None]:
+        """Run extraction in a thread, holding at most `depth` pages in memory."""
+        pages = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+        done = object()
+        
+        def produce():
+            try:
+                for page_text in self._cached_pages():
+                    while not stop.is_set():
+                        try:
+                            pages.put(page_text, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+            finally:
+                pages.put(done)
+        
+        worker = threading.Thread(target=produce, daemon=True)
+        worker.start()
+        try:
+            while True:
+                page_text = pages.get()
+                if page_text is done:
+                    break
+                yield page_text
+        finally:
+            # Consumer stopped early: let the producer exit
+            stop.set()
+            while worker.is_alive():
+                try:
+                    pages.get_nowait()
+                except queue.Empty:
+                    worker.join(timeout=0.1)
+    
+    def _cached_pages(self) -> Generator[str, None, None]:
+        """
+        Page texts from the extraction cache, or extracted and cached.
+        
+        An extraction that stops early is cached as a prefix: the next call
+        serves those pages and parses only the rest.
+        """
+        cache = extraction_cache.get_cache()
+        if cache is None:
+            yield from self._extract_pages()
+            return
+        if self.file_hash is None:
+            from src.document_registry import document_id
+            self.file_hash = document_id(self.pdf_path)
+        
+        cached = cache.read(self.file_hash)
+        if cached is not None:
+            print(f"📄 Using cached extraction ({self.file_hash})")
+            yield from cached
+            return
+        
+        writer = cache.writer(self.file_hash)
+        pages_written = pages_resumed = 0
+        self._extracted_all = False
+        try:
+            prefix = cache.read(self.file_hash, partial=True)
+            if prefix is not None:
+                for page_text in prefix:
+                    writer.write(page_text)
+                    pages_written += 1
+                    yield page_text
+                pages_resumed = pages_written
+                print(f"📄 Used {pages_resumed} cached pages ({self.file_hash}); extracting the rest")
+            for page_text in self._extract_pages(start=pages_resumed):
+                writer.write(page_text)
+                pages_written += 1
+                yield page_text
+        finally:
+            if self._extracted_all:
+                writer.commit()
+            elif pages_written > pages_resumed:
+                # Failed or stopped early: keep the longer prefix for the retry
+                writer.commit(partial=True)
+            else:
+                writer.discard()
     
-    def load_streaming(self) -> Generator[str, None, None]:
-        """Stream text from PDF pages one at a time (memory efficient)."""
+    def _extract_pages(self, start: int = 0) -> Generator[str, None, None]:
+        """Extract page texts sequentially, from page index `start`."""
+        self._extracted_all = False
+        import pypdf  # Imported on first use: it is slow to import and unused until an upload
         try:
             with open(self.pdf_path, 'rb') as file:
                 pdf_reader = pypdf.PdfReader(file)
@@ -19,19 +125,18 @@ class PDFLoader:
                 
                 print(f"📄 Found {num_pages} pages (streaming mode - low memory)")
                 
-                for page_num in range(num_pages):
+                for page_num in range(start, num_pages):
                     page = pdf_reader.pages[page_num]
                     page_text = page.extract_text()
                     
                     # Yield one page at a time instead of accumulating
                     yield page_text
                     
-                    # Force garbage collection every 10 pages
                     if (page_num + 1) % 10 == 0:
-                        gc.collect()
                         print(f"   Processed {page_num + 1}/{num_pages} pages")
                 
                 print(f"✓ Streamed all {num_pages} pages successfully")
+                self._extracted_all = True
                 
         except FileNotFoundError:
             print(f"✗ Error: File not found at {self.pdf_path}")
@@ -54,6 +159,7 @@ class PDFLoader:
     
     def get_metadata(self) -> dict:
         """Get PDF metadata."""
+        import pypdf
         try:
             with open(self.pdf_path, 'rb') as file:
                 pdf_reader = pypdf.PdfReader(file)
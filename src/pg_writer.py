@@ -0,0 +1,158 @@
+"""
+Direct Postgres bulk loader for large ingests (VECTOR_WRITER = "postgres").
+
+PostgREST upserts send JSON and pay one HTTP round trip per batch. This
+writer connects straight to the database (DATABASE_URL, e.g. Supabase's
+"Connection string" under Project Settings > Database) and streams rows
+with binary COPY into a temporary staging table, then merges them with a
+single INSERT ... ON CONFLICT, so re-ingesting a PDF stays idempotent.
+Inserting through the partitioned parent routes each row to its
+collection's partition (see src/tenancy.py).
+
+Rows are encoded in PGCOPY binary format on the client: embeddings go over
+the wire as raw float4 (vector) or float2 (halfvec), 1.5 KB / 0.75 KB per
+384-dim row, with no text parsing on the server.
+
+Requires psycopg 3 (pip install "psycopg[binary]"); test against a local
+Postgres with the pgvector extension and setup_supabase.sql applied.
+"""
+import json
+import os
+import struct
+import threading
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config import DB_BATCH_INSERT_SIZE
+from src import metrics
+
+_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_TRAILER = struct.pack("!h", -1)
+_NULL = struct.pack("!i", -1)
+_FIELDS = struct.pack("!h", 7)  # id, text, embedding, metadata, doc_id, collection, duplicate_of
+
+# Big-endian element type per pgvector column type (binary send/recv format)
+_VECTOR_DTYPES = {"vector": ">f4", "halfvec": ">f2"}
+
+
+def _field(data: bytes) -> bytes:
+    return struct.pack("!i", len(data)) + data
+
+
+def encode_rows(records: Sequence[Dict], embeddings: np.ndarray, vector_type: str = "vector") -> bytes:
+    """
+    One PGCOPY binary stream (header, tuples, trailer) for the staging table.
+
+    records: dicts with 'id', 'text', 'metadata', 'doc_id', 'collection' and
+             'duplicate_of' (see VectorStore._to_record)
+    embeddings: float matrix, one row per record without 'duplicate_of', in order
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32).astype(_VECTOR_DTYPES[vector_type])
+    vectors = iter(matrix)
+    # pgvector binary: int16 dimensions, int16 unused, then the elements
+    vector_header = struct.pack("!hh", matrix.shape[-1], 0)
+    parts = [_HEADER]
+    for record in records:
+        parts.append(_FIELDS)
+        parts.append(_field(record['id'].encode()))
+        parts.append(_field(record['text'].encode()))
+        # Near-duplicates reference another row and have no embedding of their own
+        parts.append(_NULL if record.get('duplicate_of') else _field(vector_header + next(vectors).tobytes()))
+        # jsonb binary: version byte 1 + JSON text
+        parts.append(_field(b"\x01" + json.dumps(record['metadata']).encode()))
+        parts.append(_field(record['doc_id'].encode()) if record.get('doc_id') else _NULL)
+        parts.append(_field(record['collection'].encode()))
+        parts.append(_field(record['duplicate_of'].encode()) if record.get('duplicate_of') else _NULL)
+    parts.append(_TRAILER)
+    return b"".join(parts)
+
+
+class PostgresWriter:
+    """Buffers encoded rows and loads them with COPY + merge every `batch_size` rows."""
+
+    def __init__(self, table_name: str, dsn: str = None, batch_size: int = DB_BATCH_INSERT_SIZE):
+        self.table_name = table_name
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        if not self.dsn:
+            raise ValueError("DATABASE_URL must be set in .env when VECTOR_WRITER = 'postgres'")
+        self.batch_size = batch_size
+        self.staging_table = f"{table_name}_staging"
+        self._conn = None
+        self._vector_type = None
+        self._pending_records: List[Dict] = []
+        self._pending_embeddings: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the connection and create the session's staging table (first use only)."""
+        if self._conn is not None and not self._conn.closed:
+            return self._conn
+        import psycopg  # Optional dependency, only needed for this writer
+
+        self._conn = psycopg.connect(self.dsn)
+        with self._conn.cursor() as cur:
+            cur.execute(
+                "SELECT t.typname FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid "
+                "WHERE a.attrelid = %s::regclass AND a.attname = 'embedding'",
+                (self.table_name,),
+            )
+            row = cur.fetchone()
+            if row is None or row[0] not in _VECTOR_DTYPES:
+                raise ValueError(f"{self.table_name}.embedding must be a vector or halfvec column")
+            self._vector_type = row[0]
+            cur.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {self.staging_table} "
+                f"(LIKE {self.table_name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+            )
+        self._conn.commit()
+        print(f"✓ Connected to Postgres for bulk loading ({self._vector_type} column)")
+        return self._conn
+
+    def write(self, records: List[Dict], embeddings: Sequence[Sequence[float]]):
+        """Queue rows; load them once `batch_size` rows are pending."""
+        with self._lock:
+            self._pending_records.extend(records)
+            if len(embeddings):
+                self._pending_embeddings.append(np.asarray(embeddings, dtype=np.float32))
+            if len(self._pending_records) >= self.batch_size:
+                self._load()
+
+    def flush(self):
+        """Load whatever is still pending (call at the end of an ingest)."""
+        with self._lock:
+            if self._pending_records:
+                self._load()
+
+    def _load(self):
+        records, self._pending_records = self._pending_records, []
+        embeddings = np.vstack(self._pending_embeddings) if self._pending_embeddings else np.empty((0, 0))
+        self._pending_embeddings = []
+
+        conn = self._connect()
+        data = encode_rows(records, embeddings, self._vector_type)
+        metrics.API_CALLS.inc(service="postgres", operation="copy")
+        try:
+            with conn.transaction(), conn.cursor() as cur:
+                with cur.copy(f"COPY {self.staging_table} "
+                              f"(id, text, embedding, metadata, doc_id, collection, duplicate_of) "
+                              f"FROM STDIN (FORMAT BINARY)") as copy:
+                    copy.write(data)
+                # Staging rows vanish at commit (ON COMMIT DELETE ROWS)
+                cur.execute(
+                    f"INSERT INTO {self.table_name} (id, text, embedding, metadata, doc_id, collection, duplicate_of) "
+                    f"SELECT DISTINCT ON (collection, id) id, text, embedding, metadata, doc_id, collection, "
+                    f"duplicate_of FROM {self.staging_table} "
+                    f"ON CONFLICT (collection, id) DO UPDATE SET text = EXCLUDED.text, "
+                    f"embedding = EXCLUDED.embedding, metadata = EXCLUDED.metadata, doc_id = EXCLUDED.doc_id, "
+                    f"duplicate_of = EXCLUDED.duplicate_of"
+                )
+        except Exception:
+            metrics.API_ERRORS.inc(service="postgres", operation="copy")
+            raise
+        print(f"   ⚡ COPY loaded {len(records)} rows ({len(data) / 1024:.0f} KB)")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
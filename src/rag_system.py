@@ -1,10 +1,38 @@
 from src.pdf_loader import PDFLoader
 from src.text_chunker import TextChunker
 from src.vector_store import VectorStore
+from src.embeddings import EmbeddingManager
 from src.llm_manager import LLMManager
-from typing import Dict, List
+from src.memory_monitor import MemoryGovernor
+from src.tokenizer import get_tokenizer
+from src.chunk import Chunk, document_metadata
+from src.document_registry import document_id
+from src.boilerplate import BoilerplateStripper
+from src.checkpoint import Checkpoint, CheckpointStore
+from src.reranker import Reranker, strip_embeddings
+from src import metrics
+from src import gc_policy
+from src import autotune
+from src import tenancy
+from src import adaptive_k
+from config import (
+    BOILERPLATE_STRIP,
+    INDEX_AUTO_MAINTAIN,
+    INGEST_CHECKPOINT_PAGES,
+    PDF_CHUNK_OVERLAP,
+    PDF_CHUNK_OVERLAP_TOKENS,
+    RAG_ADAPTIVE_K,
+    RAG_ADAPTIVE_MAX_K,
+    RAG_CONTEXT_TOKEN_BUDGET,
+    RAG_TOP_K,
+    RERANK_CANDIDATES,
+    RERANK_ENABLED,
+    TOKENIZER,
+)
+from typing import Dict, Iterator, List, Tuple
+import os
+import threading
 import time
-import gc
 
 class RAGSystem:
     """Complete RAG system optimized for 500MB memory constraint."""
@@ -12,31 +40,148 @@ class RAGSystem:
     def __init__(self, 
                  collection_name: str = "pdf_qa",
                  llm_model: str = "llama-3.1-8b-instant",
-                 chunk_size: int = 300):  # Smaller chunks for low memory
-        print("🚀 Initializing RAG System (LOW MEMORY MODE - 500MB)...")
+                 chunk_size: int = None,
+                 chunk_unit: str = None,
+                 context_token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+                 settings: Dict = None):
+        """
+        Args:
+            chunk_size / chunk_unit: Override the tuned chunk size
+            settings: Effective resource settings (defaults to autotune.effective_settings())
+        """
+        self.settings = settings or autotune.effective_settings()
+        print(f"🚀 Initializing RAG System (preset: {self.settings['preset'] or 'config'}, "
+              f"{self.settings['memory_limit_mb']}MB)...")
         
-        self.vector_store = VectorStore(collection_name)
+        # One embedder (one Cohere client) shared by every component
+        self.embedder = EmbeddingManager()
+        # The default collection's store; other collections get siblings via store()
+        self.vector_store = VectorStore(collection_name, embedder=self.embedder)
+        self.registry = self.vector_store.registry
+        self._stores = {self.vector_store.collection: self.vector_store}
+        self._stores_lock = threading.Lock()
         self.llm = LLMManager(llm_model)
-        self.chunker = TextChunker(chunk_size=chunk_size)
+        self.tokenizer = get_tokenizer(TOKENIZER)
+        self.context_token_budget = context_token_budget
+        self.reranker = Reranker() if RERANK_ENABLED else None
+        self.checkpoints = CheckpointStore()
+        
+        # Chunk size and overlap are measured in the chosen unit
+        chunk_unit = chunk_unit or self.settings['chunk_unit']
+        if chunk_size is None:
+            # Only the unit overridden: the tuned size, in that unit
+            chunk_size = autotune.chunk_size_in(self.settings['chunk_size'],
+                                                self.settings['chunk_unit'], chunk_unit)
+        
+        if chunk_unit == "tokens":
+            self.chunker = TextChunker(chunk_size=chunk_size,
+                                       chunk_overlap=PDF_CHUNK_OVERLAP_TOKENS,
+                                       unit="tokens", tokenizer=self.tokenizer)
+        else:
+            self.chunker = TextChunker(chunk_size=chunk_size,
+                                       chunk_overlap=PDF_CHUNK_OVERLAP,
+                                       unit="chars", tokenizer=self.tokenizer)
         
         print("✓ RAG System ready (memory optimized)!\n")
     
-    def ingest_pdf(self, pdf_path: str):
-        """Process and store PDF with memory-efficient streaming."""
-        print(f"\n📚 Processing PDF: {pdf_path}")
-        print(f"⚙️  Memory mode: LOW (500MB) - using streaming\n")
+    def store(self, collection: str = None) -> VectorStore:
+        """The vector store for a collection key (see tenancy.collection_key), created on first use."""
+        collection = collection or tenancy.DEFAULT_KEY
+        with self._stores_lock:
+            if collection not in self._stores:
+                self._stores[collection] = self.vector_store.for_collection(collection)
+            return self._stores[collection]
+    
+    def warm_up(self) -> Dict:
+        """
+        Build the API clients and open their connections ahead of the first request.
+        
+        Clients are otherwise created lazily on first use. Returns seconds per
+        service; a failed ping is reported but not raised.
+        """
+        pings = {
+            'supabase': lambda: self.vector_store.client.table(self.vector_store.table_name).select('id').limit(1).execute(),
+            'cohere': lambda: self.embedder.client.check_api_key(),
+            'groq': lambda: self.llm.client.models.list(),
+        }
+        timings = {}
+        for service, ping in pings.items():
+            start = time.time()
+            try:
+                ping()
+                timings[service] = round(time.time() - start, 3)
+            except Exception as e:
+                timings[service] = f"error: {e}"
+        print(f"🔥 Warm-up complete: {timings}")
+        return timings
+    
+    def ingest_pdf(self, pdf_path: str, collection: str = None) -> Dict:
+        """
+        Process and store PDF with memory-efficient streaming. Returns a processing summary.
+        
+        Progress is checkpointed every INGEST_CHECKPOINT_PAGES pages; ingesting
+        the same file into the same collection after a failure resumes there.
+        Raises checkpoint.IngestBusy if another worker is ingesting it.
+        """
+        store = self.store(collection)
+        print(f"\n📚 Processing PDF: {pdf_path} → {store.collection}")
+        print(f"⚙️  Memory limit: {self.settings['memory_limit_mb']}MB - using streaming\n")
         
         start_time = time.time()
-        loader = PDFLoader(pdf_path)
+        doc_id = document_id(pdf_path)  # Content hash: re-ingesting a file overwrites its chunks
+        # Claims the job until it completes or fails
+        checkpoint = self.checkpoints.open(doc_id, store.collection, pdf_path)
+        try:
+            return self._ingest(store, pdf_path, doc_id, checkpoint, start_time)
+        except Exception as e:
+            # Progress still being written must not be recorded over the failure
+            store.discard_pending(doc_id)
+            checkpoint.fail(e)
+            raise
+        finally:
+            checkpoint.release()
+    
+    def _ingest(self, store: VectorStore, pdf_path: str, doc_id: str, checkpoint: Checkpoint,
+                start_time: float) -> Dict:
+        """Stream, chunk, embed and store a PDF from its checkpoint (see ingest_pdf)."""
+        loader = PDFLoader(pdf_path, file_hash=doc_id)  # Re-ingests reuse the cached extraction
+        resume_after = checkpoint.pages_committed
+        checkpoint.save()  # Listed as unfinished (GET /ingest/jobs) until it completes
+        if resume_after:
+            print(f"↩️  Resuming after page {resume_after} (attempt {checkpoint.state['attempts']})")
+        # Sums from a failed attempt would count its uncommitted chunks twice
+        store.centroids.restore(doc_id, checkpoint.state['centroids'] if resume_after else None)
+        
+        # Batch sizes follow live memory usage; extraction pauses near the threshold
+        governor = MemoryGovernor(buffer_size=self.settings['buffer_size'],
+                                  embed_batch_size=self.settings['embed_batch_size'],
+                                  upsert_batch_size=self.settings['upsert_batch_size'])
         
         # Process pages in streaming fashion
-        total_chars = 0
-        total_chunks = 0
+        total_chars = checkpoint.state['characters'] if resume_after else 0
+        total_chunks = checkpoint.state['chunks'] if resume_after else 0
+        page_num = 0
+        checkpointed_page = resume_after
         chunks_buffer = []
-        buffer_size = 20  # Process chunks in small batches
+        # Near-duplicates stored as references
+        savings = ({'duplicates': checkpoint.state['duplicates'], 'tokens': checkpoint.state['tokens_saved']}
+                   if resume_after else {'duplicates': 0, 'tokens': 0})
+        if store.dedup is not None and not resume_after:
+            # A re-ingest must not match its own previous chunks; a resume keeps the committed pages'
+            store.dedup.forget(doc_id)
+        doc_metadata = document_metadata(pdf_path, doc_id=doc_id)  # Shared by every chunk of this PDF
+        # With spare workers, extraction runs ahead of embedding in a background thread
+        prefetch = max(0, self.settings['max_workers'] - 1)
+        pages = loader.load_streaming(prefetch=prefetch)
+        # Running headers/footers are learned from the first pages and stripped before chunking
+        stripper = BoilerplateStripper() if BOILERPLATE_STRIP else None
+        if stripper is not None:
+            pages = stripper.strip(pages)
+        pages = governor.paced(metrics.timed_iter(pages, "ingest_extract"))
         
-        for page_num, page_text in enumerate(loader.load_streaming(), 1):
-            if not page_text:
+        for page_num, page_text in enumerate(pages, 1):
+            # Pages before the checkpoint are stored; they were still read so the stripper learns from them
+            if not page_text or page_num <= resume_after:
                 continue
             
             # Add page marker
@@ -44,58 +189,160 @@ class RAGSystem:
             total_chars += len(text_with_marker)
             
             # Chunk this page
-            metadata = {'page': page_num, 'source': pdf_path}
-            page_chunks = self.chunker.split_text(text_with_marker, metadata=metadata)
+            with metrics.span("ingest_chunk"):
+                page_chunks = self.chunker.split_text(text_with_marker, metadata=doc_metadata, page=page_num)
             
             # Add to buffer
             chunks_buffer.extend(page_chunks)
             total_chunks += len(page_chunks)
             
             # Process buffer when it reaches a threshold
-            if len(chunks_buffer) >= buffer_size:
-                self._add_chunks_batch(chunks_buffer)
+            if len(chunks_buffer) >= governor.buffer_size:
+                self._add_chunks_batch(store, chunks_buffer, governor, savings)
                 chunks_buffer = []
-                gc.collect()  # Free memory
+                gc_policy.maybe_collect("ingest_batch")  # Only under memory pressure
+                # The buffer is written at a page boundary: every chunk up to page_num is submitted,
+                # and recorded as committed once it is in the database (spooled rows are not yet)
+                if page_num - checkpointed_page >= INGEST_CHECKPOINT_PAGES:
+                    progress = dict(pages_committed=page_num, chunks=total_chunks, characters=total_chars,
+                                    duplicates=savings['duplicates'], tokens_saved=savings['tokens'],
+                                    centroids=store.centroids.state(doc_id))
+                    store.when_written(doc_id, lambda progress=progress: checkpoint.save(**progress))
+                    checkpointed_page = page_num
         
         # Process remaining chunks
         if chunks_buffer:
-            self._add_chunks_batch(chunks_buffer)
+            self._add_chunks_batch(store, chunks_buffer, governor, savings)
+        store.flush(doc_id)
+        store.save_centroids(doc_id)
+        self._maintain_index(store)
         
         processing_time = time.time() - start_time
+        metrics.INGESTED.inc(page_num, unit="pages")
+        metrics.INGESTED.inc(total_chunks, unit="chunks")
+        metrics.record_stage("ingest_total", processing_time)
         
         # Summary
         print(f"\n⏱️  Processing Summary:")
-        print(f"   📄 Total Pages: {page_num if page_num > 0 else 0}")
+        print(f"   📄 Total Pages: {page_num}")
         print(f"   📊 Total Characters: {total_chars}")
         print(f"   ✂️  Total Chunks: {total_chunks}")
+        boilerplate = stripper.get_stats() if stripper is not None else None
+        if boilerplate and boilerplate['lines_removed']:
+            print(f"   🧹 Headers/footers: {boilerplate['lines_removed']} lines ({boilerplate['chars_removed']} chars) stripped")
+        if savings['duplicates']:
+            print(f"   ♻️  Near-duplicates: {savings['duplicates']} chunks not embedded (~{savings['tokens']} tokens saved)")
         print(f"   ⏳ Time: {processing_time:.2f}s")
-        print(f"   💾 Memory mode: Streaming (low usage)")
+        memory = governor.get_stats()
+        print(f"   💾 Memory: peak {memory['peak_mb']}MB, {memory['pauses']} pauses, final batch scale {memory['scale']:.2f}")
+        
+        summary = {
+            'doc_id': doc_id,
+            'collection': store.collection,
+            'resumed_after_page': resume_after,
+            'pages': page_num,
+            'characters': total_chars,
+            'chunks': total_chunks,
+            'duplicates': savings['duplicates'],
+            'embedding_tokens_saved': savings['tokens'],
+            'boilerplate': boilerplate,
+            'processing_time': processing_time,
+            'memory': memory
+        }
+        store.registry.register(doc_id, os.path.basename(pdf_path), summary,
+                               size_bytes=os.path.getsize(pdf_path),
+                               embedding_model=self.embedder.model_name)
+        checkpoint.complete()
         print(f"✓ PDF processing complete")
+        
+        return summary
     
-    def _add_chunks_batch(self, chunks: List[Dict]):
-        """Add a batch of chunks to vector store."""
+    def _maintain_index(self, store: VectorStore):
+        """Rebuild a collection's vector index if its partition outgrew it (direct connection only)."""
+        if not INDEX_AUTO_MAINTAIN or not os.getenv("DATABASE_URL"):
+            return
+        from src.index_manager import IndexManager
+        try:
+            with metrics.span("index_maintenance"):
+                report = IndexManager(store.partition).maybe_rebuild()
+            if report:
+                store.index_meta(refresh=True)  # Search uses the new index's parameters
+        except Exception as e:
+            print(f"⚠️  Index maintenance skipped: {e}")
+    
+    def _add_chunks_batch(self, store: VectorStore, chunks: List[Chunk], governor: MemoryGovernor,
+                          savings: Dict):
+        """Add a batch of chunks to vector store, sized by the memory governor."""
         if not chunks:
             return
         
-        print(f"   💾 Adding {len(chunks)} chunks to database...")
-        self.vector_store.add_chunks(chunks)
+        duplicates = []
+        if store.dedup is not None:
+            with metrics.span("ingest_dedup"):
+                chunks, duplicates = store.dedup.split(chunks)
+            tokens = sum(chunk.token_count for chunk, _ in duplicates)
+            savings['duplicates'] += len(duplicates)
+            savings['tokens'] += tokens
+            metrics.DEDUP_SAVED.inc(len(duplicates), unit="chunks")
+            metrics.DEDUP_SAVED.inc(tokens, unit="tokens")
+        
+        print(f"   💾 Adding {len(chunks) + len(duplicates)} chunks to database...")
+        store.add_chunks(chunks,
+                         embed_batch_size=governor.embed_batch_size,
+                         upsert_batch_size=governor.upsert_batch_size,
+                         duplicates=duplicates)
     
-    def ask(self, question: str, top_k: int = 5, threshold: float = 0.7) -> Dict:
+    def ask(self, question: str, top_k: int = None, threshold: float = 0.7, collection: str = None) -> Dict:
         """
         Ask a question with enhanced response formatting.
         
         Args:
             question: User's question
-            top_k: Number of chunks to retrieve
+            top_k: Number of chunks to retrieve (None: decided per question when RAG_ADAPTIVE_K)
             threshold: Relevance threshold (0-1, lower distance = more relevant)
+            collection: Collection key to search (default collection if None)
             
         Returns:
             Enhanced response dictionary
         """
         print(f"\n❓ Question: {question}")
+        mode, context_chunks, sources = self._retrieve(question, top_k, threshold, collection)
+        response_data = self.llm.generate_answer(question, context_chunks, mode=mode)
+        response_data['sources'] = sources
+        response_data['mode'] = mode
+        return response_data
+    
+    def ask_stream(self, question: str, top_k: int = None, threshold: float = 0.7,
+                   collection: str = None) -> Tuple[Dict, Iterator[str]]:
+        """
+        Like ask(), but the answer streams from Groq as it is generated.
         
-        # Retrieve relevant chunks
-        results = self.vector_store.search(question, top_k=top_k)
+        Returns the response without 'answer' (sources, mode, ...) and an
+        iterator of answer pieces: retrieval is done when this returns,
+        generation happens while iterating.
+        """
+        print(f"\n❓ Question (streaming): {question}")
+        mode, context_chunks, sources = self._retrieve(question, top_k, threshold, collection)
+        response_data = {
+            'source_type': mode,
+            'confidence': 'high' if mode == 'pdf' else 'medium',
+            'context_used': len(context_chunks),
+            'sources': sources,
+            'mode': mode,
+        }
+        return response_data, self.llm.generate_answer_stream(question, context_chunks, mode=mode)
+    
+    def _retrieve(self, question: str, top_k: int, threshold: float,
+                  collection: str) -> Tuple[str, List[str], List[Dict]]:
+        """Answer mode ('pdf' or 'general'), the context chunks for the LLM and the sources to return."""
+        adaptive = top_k is None and RAG_ADAPTIVE_K
+        if top_k is None:
+            top_k = RAG_ADAPTIVE_MAX_K if adaptive else RAG_TOP_K
+        
+        # Retrieve relevant chunks (over-fetched when a reranker picks the final top_k,
+        # or when the weaker candidates are the adaptive cutoff's baseline)
+        fetch_k = top_k * RERANK_CANDIDATES if self.reranker is not None or adaptive else top_k
+        results = self.store(collection).search(question, top_k=fetch_k, with_embeddings=self.reranker is not None)
         
         # Determine if we have relevant context
         has_relevant_context = False
@@ -108,22 +355,49 @@ class RAGSystem:
                 if result['distance'] < threshold:
                     has_relevant_context = True
                     filtered_results.append(result)
+        if adaptive and filtered_results:
+            # As many chunks as this question's similarity curve calls for
+            top_k, reason = adaptive_k.cutoff([1.0 - r['distance'] for r in filtered_results],
+                                              baseline=1.0 - max(r['distance'] for r in results))
+            print(f"   📏 Adaptive top_k: {top_k} ({reason})")
+            # The reranker may reorder or drop chunks above the cutoff, never reach past it
+            filtered_results = filtered_results[:top_k]
+        if self.reranker is None:
+            filtered_results = filtered_results[:top_k]
+        else:
+            # Relevant and diverse: near-identical chunks no longer take several slots
+            filtered_results = self.reranker.rerank(question, filtered_results, top_k)
+            results = strip_embeddings(results)
         
-        # Generate response based on context availability
+        # Answer mode depends on context availability
         if has_relevant_context:
-            # Use PDF context
-            context_chunks = [result['text'] for result in filtered_results]
-            response_data = self.llm.generate_answer(question, context_chunks, mode="pdf")
-            response_data['sources'] = filtered_results
-            response_data['mode'] = 'pdf'
-        else:
-            # Use general knowledge
-            print("⚠️  No highly relevant content found in PDF. Using general knowledge...")
-            response_data = self.llm.generate_answer(question, [], mode="general")
-            response_data['sources'] = results[:3] if results else []  # Show closest matches anyway
-            response_data['mode'] = 'general'
+            # Use PDF context, trimmed to the token budget
+            with metrics.span("context_assembly"):
+                kept = self._budget_context(filtered_results)
+            # Cite only what the LLM reads
+            return 'pdf', [result['text'] for result in kept], kept
+        # Use general knowledge
+        print("⚠️  No highly relevant content found in PDF. Using general knowledge...")
+        return 'general', [], results[:3] if results else []  # Show closest matches anyway
+    
+    def _budget_context(self, results: List[Dict]) -> List[Dict]:
+        """The most relevant results whose chunks fit in the context token budget."""
+        kept = []
+        used_tokens = 0
         
-        return response_data
+        for result in results:
+            # Token count is stored at ingest time; recount only for older rows
+            tokens = (result.get('metadata') or {}).get('token_count')
+            if tokens is None:
+                tokens = self.tokenizer.count_tokens(result['text'])
+            
+            if kept and used_tokens + tokens > self.context_token_budget:
+                break
+            kept.append(result)
+            used_tokens += tokens
+        
+        print(f"   🧮 Context: {len(kept)} chunks, ~{used_tokens} tokens (budget {self.context_token_budget})")
+        return kept
     
     def generate_summary(self, pdf_path: str = None) -> str:
         """Generate a summary of uploaded PDF(s)."""
@@ -131,9 +405,45 @@ class RAGSystem:
         # This is a simplified version
         return "Summary feature - to be implemented"
     
-    def get_stats(self) -> Dict:
-        """Get system statistics."""
+    def get_stats(self, collection: str = None) -> Dict:
+        """Get system statistics from the document registry (no scan of the vector table)."""
+        store = self.store(collection)
+        try:
+            stats = store.registry.stats()
+            stats['source'] = 'registry'
+        except Exception as e:
+            # Registry not created yet (run setup_supabase.sql): fall back to an exact count
+            print(f"⚠️  Document registry unavailable ({e}); counting chunks")
+            stats = {'total_chunks': store.count_documents(), 'source': 'count'}
+        stats['collection'] = store.collection
+        return stats
+    
+    def delete_document(self, doc_id: str, collection: str = None) -> Dict:
+        """Remove one document's chunks (in bounded batches) and its registry entry."""
+        store = self.store(collection)
+        start_time = time.time()
+        chunks_deleted = store.delete_document(doc_id)
+        store.registry.delete(doc_id)
+        # Fewer rows may call for a smaller (or no) vector index
+        self._maintain_index(store)
         return {
-            'total_chunks': self.vector_store.count_documents(),
-            'collection': self.vector_store.table_name
-        }
\ No newline at end of file
+            'doc_id': doc_id,
+            'chunks_deleted': chunks_deleted,
+            'processing_time': time.time() - start_time
+        }
+    
+    def clear(self, collection: str = None) -> Dict:
+        """Delete every chunk and registry entry in one collection."""
+        store = self.store(collection)
+        start_time = time.time()
+        try:
+            store.truncate()
+            method = 'truncate'
+        except Exception as e:
+            # truncate_collection() not installed yet, or not granted to the anon key (service_role
+            # only): store.clear() resets the centroids and the vector index as well
+            print(f"⚠️  Truncate unavailable ({e}); deleting row by row")
+            store.clear()
+            store.registry.clear()
+            method = 'delete'
+        return {'method': method, 'processing_time': time.time() - start_time}
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Local reranking of search candidates with Maximal Marginal Relevance.
+
+match_documents ranks chunks by similarity alone, so neighbouring chunks
+that say the same thing take several of the top_k slots and the LLM reads
+the same passage twice. ask() fetches top_k * RERANK_CANDIDATES candidates
+(with their embeddings) and this picks top_k of them greedily: each pick
+maximizes
+    lambda * relevance - (1 - lambda) * (max similarity to the chunks already picked)
+where relevance blends the vector similarity with the share of question
+terms the chunk contains. Candidates at least RERANK_REDUNDANT_SIMILARITY
+similar to a picked chunk are dropped, so the context can be smaller than
+top_k. Everything is a few small NumPy matrix products (no model, no API
+call); without embeddings (older match_documents), chunk-to-chunk
+similarity falls back to word-set Jaccard.
+"""
+import re
+from typing import Dict, List, Set
+
+import numpy as np
+
+from config import RERANK_LEXICAL_WEIGHT, RERANK_MMR_LAMBDA, RERANK_REDUNDANT_SIMILARITY
+from src import metrics
+from src import vector_codec
+
+_WORD = re.compile(r"\w{3,}")
+_STOPWORDS = frozenset(
+    "the and for are was were with that this from what which who whom how why when where does did "
+    "has have had can could should would will about into over than then them they their there these "
+    "those its not but all any our your you".split()
+)
+
+
+def terms(text: str) -> Set[str]:
+    """Content words of a text (lowercase, 3+ characters, common stopwords removed)."""
+    return set(_WORD.findall(text.lower())) - _STOPWORDS
+
+
+def strip_embeddings(results: List[Dict]) -> List[Dict]:
+    """Results without the 'embedding' field (API responses never carry vectors)."""
+    return [{key: value for key, value in result.items() if key != 'embedding'} for result in results]
+
+
+class Reranker:
+    """MMR selection over search results, scored with vector similarity plus term overlap."""
+
+    def __init__(self, mmr_lambda: float = RERANK_MMR_LAMBDA, lexical_weight: float = RERANK_LEXICAL_WEIGHT,
+                 redundant_similarity: float = RERANK_REDUNDANT_SIMILARITY):
+        self.mmr_lambda = mmr_lambda
+        self.lexical_weight = lexical_weight
+        self.redundant_similarity = redundant_similarity
+
+    def rerank(self, question: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Up to top_k candidates in MMR order, each with a 'rerank_score'.
+
+        candidates: VectorStore.search() results, ideally with 'embedding'
+        """
+        if not candidates:
+            return []
+        with metrics.span("rerank"):
+            matrix = self._term_matrix([terms(question)] + [terms(c['text']) for c in candidates])
+            question_terms, chunk_terms = matrix[0], matrix[1:]
+            overlap = chunk_terms @ question_terms / max(question_terms.sum(), 1.0)
+            similarity = 1.0 - np.array([c['distance'] for c in candidates], dtype=np.float32)
+            relevance = (1.0 - self.lexical_weight) * similarity + self.lexical_weight * overlap
+            pairwise = self._pairwise(candidates, chunk_terms)
+
+            picked = []
+            available = np.ones(len(candidates), dtype=bool)
+            redundancy = np.zeros(len(candidates), dtype=np.float32)
+            while len(picked) < top_k and available.any():
+                scores = self.mmr_lambda * relevance - (1.0 - self.mmr_lambda) * redundancy
+                scores[~available] = -np.inf
+                best = int(np.argmax(scores))
+                picked.append((best, float(scores[best])))
+                redundancy = np.maximum(redundancy, pairwise[best])
+                available &= pairwise[best] < self.redundant_similarity
+                available[best] = False
+
+        print(f"   🔀 Reranked {len(candidates)} candidates → {len(picked)} chunks")
+        return [dict(strip_embeddings([candidates[i]])[0], rerank_score=round(score, 4)) for i, score in picked]
+
+    @staticmethod
+    def _term_matrix(term_sets: List[Set[str]]) -> np.ndarray:
+        """0/1 matrix, one row per term set, one column per distinct term."""
+        vocabulary = {term: i for i, term in enumerate(set().union(*term_sets))}
+        matrix = np.zeros((len(term_sets), max(len(vocabulary), 1)), dtype=np.float32)
+        for row, term_set in enumerate(term_sets):
+            matrix[row, [vocabulary[term] for term in term_set]] = 1.0
+        return matrix
+
+    @staticmethod
+    def _pairwise(candidates: List[Dict], chunk_terms: np.ndarray) -> np.ndarray:
+        """Chunk-to-chunk similarity: cosine of the embeddings, or Jaccard of the terms without them."""
+        embeddings = [c.get('embedding') for c in candidates]
+        if all(e is not None for e in embeddings):
+            vectors = np.vstack([vector_codec.from_literal(e) if isinstance(e, str) else np.asarray(e, dtype=np.float32)
+                                 for e in embeddings])
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+            return vectors @ vectors.T
+        shared = chunk_terms @ chunk_terms.T
+        sizes = chunk_terms.sum(axis=1)
+        union = sizes[:, None] + sizes[None, :] - shared
+        return shared / np.maximum(union, 1.0)
@@ -0,0 +1,104 @@
+"""
+Document centroids for two-level retrieval.
+
+match_documents otherwise ranks every chunk of a collection. During ingest
+each document gets a centroid embedding (the normalized mean of its chunk
+embeddings), plus one per block of ROUTING_SECTION_PAGES pages, stored in
+document_centroids. A query is first routed to the ROUTING_TOP_DOCUMENTS
+documents whose closest centroid is nearest, and chunks are ranked only
+within them. Fewer documents routed means less work and lower recall.
+"""
+import threading
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config import ROUTING_SECTION_PAGES
+from src import vector_codec
+from src.chunk import Chunk
+
+CENTROIDS_TABLE = "document_centroids"
+
+
+def section_of(page: int, section_pages: int = ROUTING_SECTION_PAGES) -> int:
+    """Section number of a page (1-based); 0 is reserved for the whole document."""
+    if not section_pages or not page:
+        return 0
+    return (page - 1) // section_pages + 1
+
+
+class CentroidAccumulator:
+    """Running sums of normalized chunk embeddings per document and section, filled as batches are embedded."""
+
+    def __init__(self, section_pages: int = ROUTING_SECTION_PAGES):
+        self.section_pages = section_pages
+        self._sums: Dict[str, Dict[int, np.ndarray]] = {}
+        self._counts: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, chunks: Sequence[Chunk], embeddings: Sequence[Sequence[float]]):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            for chunk, vector in zip(chunks, matrix):
+                doc_id = chunk.metadata.get('doc_id')
+                if doc_id is None:
+                    continue
+                sums = self._sums.setdefault(doc_id, {})
+                counts = self._counts.setdefault(doc_id, {})
+                sections = {0, section_of(chunk.page, self.section_pages)}
+                for section in sections:
+                    if section in sums:
+                        sums[section] += vector
+                    else:
+                        sums[section] = vector.copy()
+                    counts[section] = counts.get(section, 0) + 1
+
+    def state(self, doc_id: str) -> Dict[str, Dict]:
+        """JSON-serializable partial sums of one document (for an ingest checkpoint)."""
+        with self._lock:
+            sums = self._sums.get(doc_id, {})
+            counts = self._counts.get(doc_id, {})
+            return {str(section): {'chunks': counts[section], 'sum': sums[section].tolist()} for section in sums}
+
+    def restore(self, doc_id: str, state: Dict[str, Dict] = None):
+        """Replace one document's sums with a checkpointed state (or drop them, starting over)."""
+        with self._lock:
+            self._sums[doc_id] = {int(s): np.asarray(v['sum'], dtype=np.float32) for s, v in (state or {}).items()}
+            self._counts[doc_id] = {int(s): v['chunks'] for s, v in (state or {}).items()}
+
+    def forget(self, doc_id: str = None):
+        """Drop one document's sums (or all) after its rows were deleted."""
+        with self._lock:
+            if doc_id is None:
+                self._sums.clear()
+                self._counts.clear()
+                return
+            self._sums.pop(doc_id, None)
+            self._counts.pop(doc_id, None)
+
+    def pop(self, doc_id: str, collection: str) -> List[Dict]:
+        """document_centroids rows for one document (and forget it)."""
+        with self._lock:
+            sums = self._sums.pop(doc_id, {})
+            counts = self._counts.pop(doc_id, {})
+        if not sums:
+            return []
+        sections = sorted(sums)
+        # A single section duplicates the document centroid
+        if len(sections) == 2:
+            sections = [0]
+        centroids = np.vstack([sums[section] for section in sections])
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids = centroids / np.where(norms == 0, 1.0, norms)
+        return [
+            {
+                'collection': collection,
+                'doc_id': doc_id,
+                'section': section,
+                'chunks': counts[section],
+                'embedding': embedding,
+            }
+            for section, embedding in zip(sections, vector_codec.encode_batch(centroids))
+        ]
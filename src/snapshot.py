@@ -0,0 +1,202 @@
+"""
+Collection snapshots: export and restore a collection without re-embedding.
+
+Moving a corpus between environments (or rebuilding after a clear) would
+otherwise send every PDF through Cohere again. A snapshot is a directory:
+  manifest.json    format version, collection, embedding model, dimensions,
+                   row count, registry rows and routing centroids
+  records.jsonl    one line per row: id, doc_id, duplicate_of, metadata
+  texts.bin        UTF-8 chunk texts, back to back
+  offsets.npy      int64 [rows + 1], row i's text is texts.bin[offsets[i]:offsets[i+1]]
+  embeddings.npy   float32 [vectors, dimensions], one per row without
+                   duplicate_of, in row order (as in src/pg_writer.py)
+
+Export pages through the collection by id, SNAPSHOT_BATCH_ROWS rows at a
+time, and appends to every file, so memory stays bounded by one page. The
+.npy headers are fixed-size and rewritten with the final shapes at the end.
+Import memory-maps the arrays and writes batches through the store's writer
+(PostgREST upserts, or binary COPY with VECTOR_WRITER = "postgres"): no
+embedding API calls.
+"""
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from config import SNAPSHOT_BATCH_ROWS
+from src import metrics
+from src import routing
+from src import vector_codec
+from src.document_registry import REGISTRY_TABLE
+
+FORMAT_VERSION = 1
+_NPY_HEADER_SIZE = 128
+_COLUMNS = 'id,text,embedding,metadata,doc_id,duplicate_of'
+
+
+def _npy_header(dtype: str, shape: Tuple[int, ...]) -> bytes:
+    """NPY 1.0 header padded to a fixed size, so it can be rewritten once the row count is known."""
+    header = repr({'descr': dtype, 'fortran_order': False, 'shape': shape}).encode("latin1")
+    prefix = b"\x93NUMPY\x01\x00"
+    padding = _NPY_HEADER_SIZE - len(prefix) - 2 - len(header) - 1
+    return prefix + (_NPY_HEADER_SIZE - len(prefix) - 2).to_bytes(2, "little") + header + b" " * padding + b"\n"
+
+
+def _decode_embedding(value) -> np.ndarray:
+    """A selected embedding: a pgvector text literal from PostgREST, or a list."""
+    if isinstance(value, str):
+        return vector_codec.from_literal(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _pages(store, batch_rows: int) -> Iterator[List[Dict]]:
+    """The collection's rows, `batch_rows` at a time, by id (keyset pagination, no OFFSET scans)."""
+    last_id = None
+    while True:
+        query = (store.client.table(store.table_name).select(_COLUMNS)
+                 .eq('collection', store.collection).order('id').limit(batch_rows))
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        metrics.API_CALLS.inc(service="supabase", operation="snapshot_read")
+        rows = query.execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_rows:
+            return
+        last_id = rows[-1]['id']
+
+
+def export_collection(store, directory: str, batch_rows: int = SNAPSHOT_BATCH_ROWS) -> Dict:
+    """Write the store's collection to a snapshot directory. Returns the manifest."""
+    start = time.time()
+    store.flush()  # Spooled rows belong in the snapshot
+    os.makedirs(directory, exist_ok=True)
+    rows = vectors = text_bytes = 0
+    dimensions = None
+    with open(os.path.join(directory, "records.jsonl"), "w") as records, \
+            open(os.path.join(directory, "texts.bin"), "wb") as texts, \
+            open(os.path.join(directory, "offsets.npy"), "wb") as offsets, \
+            open(os.path.join(directory, "embeddings.npy"), "wb") as embeddings:
+        offsets.write(_npy_header("<i8", (0,)))
+        offsets.write(np.zeros(1, dtype="<i8").tobytes())
+        embeddings.write(_npy_header("<f4", (0, 0)))
+        for page in _pages(store, batch_rows):
+            ends = []
+            matrix = []
+            for row in page:
+                records.write(json.dumps({'id': row['id'], 'doc_id': row.get('doc_id'),
+                                          'duplicate_of': row.get('duplicate_of'),
+                                          'metadata': row.get('metadata')}) + "\n")
+                data = (row.get('text') or '').encode("utf-8")
+                texts.write(data)
+                text_bytes += len(data)
+                ends.append(text_bytes)
+                if not row.get('duplicate_of'):
+                    matrix.append(_decode_embedding(row['embedding']))
+            offsets.write(np.asarray(ends, dtype="<i8").tobytes())
+            if matrix:
+                matrix = np.vstack(matrix).astype("<f4")
+                dimensions = dimensions or matrix.shape[1]
+                embeddings.write(matrix.tobytes())
+                vectors += len(matrix)
+            rows += len(page)
+        offsets.seek(0)
+        offsets.write(_npy_header("<i8", (rows + 1,)))
+        embeddings.seek(0)
+        embeddings.write(_npy_header("<f4", (vectors, dimensions or 0)))
+
+    metrics.API_CALLS.inc(service="supabase", operation="snapshot_read")
+    registry = (store.client.table(REGISTRY_TABLE).select('*')
+                .eq('collection', store.collection).execute().data)
+    try:
+        metrics.API_CALLS.inc(service="supabase", operation="snapshot_read")
+        centroids = (store.client.table(routing.CENTROIDS_TABLE).select('*')
+                     .eq('collection', store.collection).execute().data)
+    except Exception:
+        centroids = []  # document_routing.sql not applied
+    for row in centroids:
+        row['embedding'] = vector_codec.to_literal(_decode_embedding(row['embedding']))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'collection': store.collection,
+        'embedding_model': store.embedder.model_name,
+        'dimensions': dimensions,
+        'rows': rows,
+        'vectors': vectors,
+        'text_bytes': text_bytes,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'registry': registry,
+        'centroids': centroids,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, default=str)
+    print(f"📦 Exported {rows} rows ({vectors} embeddings) of {store.collection} in {time.time() - start:.1f}s")
+    return {k: v for k, v in manifest.items() if k not in ('registry', 'centroids')}
+
+
+def read_manifest(directory: str) -> Dict:
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')} (expected {FORMAT_VERSION})")
+    return manifest
+
+
+def import_collection(store, directory: str, batch_rows: int = SNAPSHOT_BATCH_ROWS) -> Dict:
+    """
+    Load a snapshot into the store's collection (which may differ from the exported one).
+
+    Rows are upserted, so importing over existing data replaces matching ids.
+    Raises ValueError if the snapshot was embedded with another model.
+    """
+    start = time.time()
+    manifest = read_manifest(directory)
+    if manifest['embedding_model'] != store.embedder.model_name:
+        raise ValueError(f"Snapshot embedded with {manifest['embedding_model']}, "
+                         f"this store uses {store.embedder.model_name}")
+    offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+    embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+    texts = np.memmap(os.path.join(directory, "texts.bin"), dtype=np.uint8, mode="r") \
+        if manifest['text_bytes'] else np.empty(0, dtype=np.uint8)
+
+    rows = vectors = 0
+    batch = []
+    with open(os.path.join(directory, "records.jsonl")) as records:
+        for line in records:
+            record = json.loads(line)
+            record['text'] = texts[offsets[rows]:offsets[rows + 1]].tobytes().decode("utf-8")
+            record['embedding'] = None
+            record['collection'] = store.collection
+            batch.append(record)
+            rows += 1
+            if len(batch) >= batch_rows:
+                vectors = _write_batch(store, batch, embeddings, vectors)
+                batch = []
+        if batch:
+            vectors = _write_batch(store, batch, embeddings, vectors)
+    if store.writer is not None:
+        store.writer.flush()
+
+    if manifest['registry']:
+        store.registry.restore(manifest['registry'])
+    if manifest['centroids']:
+        metrics.API_CALLS.inc(service="supabase", operation="centroids_upsert")
+        store.client.table(routing.CENTROIDS_TABLE).upsert(
+            [{**row, 'collection': store.collection} for row in manifest['centroids']]).execute()
+
+    seconds = time.time() - start
+    print(f"📦 Imported {rows} rows ({vectors} embeddings) into {store.collection} in {seconds:.1f}s")
+    return {'collection': store.collection, 'rows': rows, 'vectors': vectors,
+            'documents': len(manifest['registry']), 'seconds': round(seconds, 2)}
+
+
+def _write_batch(store, batch: List[Dict], embeddings: np.ndarray, vectors: int) -> int:
+    """Write one batch straight through the store's writer (not the spool: the snapshot is already on disk)."""
+    embedded = sum(1 for record in batch if not record['duplicate_of'])
+    with metrics.span("snapshot_import"):
+        store.write_rows(batch, np.asarray(embeddings[vectors:vectors + embedded]), len(batch))
+    return vectors + embedded
@@ -0,0 +1,354 @@
+"""
+Local write-ahead spool between embedding and the vector database.
+
+Without it, add_chunks embeds a batch and then waits on the Supabase
+upsert: a slow write stalls the ingest and a failed one loses the paid
+embeddings and aborts it. With VECTOR_SPOOL_ENABLED, each embedded batch is
+appended (and fsynced) to a local segment file and add_chunks returns; a
+background flusher reads the spool in order, writes up to
+VECTOR_SPOOL_FLUSH_ROWS rows per pass and retries failures with backoff.
+A segment is deleted once every row in it is written, and segments left by
+a previous process are replayed at startup (upserts, so replaying is safe).
+
+Each process locks its own worker-N subdirectory (see src/filelock.py), the
+lowest one free, so uvicorn workers never share segment files and a
+restarted worker picks up what a dead one left. A batch that still fails
+after VECTOR_SPOOL_MAX_ATTEMPTS is moved to worker-N/quarantine/ (same
+format; copy it back as the next numbered .spool file to replay it) so it
+cannot block the rows behind it.
+
+Frames carry a tag (the ingest they belong to, see VectorStore). Spooled is
+not written, so an ingest records its checkpoint through when_written(),
+which runs once the flusher has written everything appended before it, and
+never if a batch with that tag was quarantined. drain(tag) reports that
+tag's quarantined batches only, so concurrent ingests never see (or clear)
+each other's failures.
+
+Frame format (little-endian): magic, JSON length, vector count, dimensions,
+upsert batch size, then {"tag", "records"} as JSON (records without
+embeddings) and the embeddings as raw float32, one per record without
+'duplicate_of', in order (the same convention as src/pg_writer.py).
+"""
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    RETRY_DELAY,
+    VECTOR_SPOOL_DIR,
+    VECTOR_SPOOL_DRAIN_TIMEOUT,
+    VECTOR_SPOOL_FLUSH_ROWS,
+    VECTOR_SPOOL_MAX_ATTEMPTS,
+    VECTOR_SPOOL_SEGMENT_MB,
+)
+from src import filelock
+from src import metrics
+
+_FRAME = struct.Struct("<4sIIII")  # magic, JSON bytes, vectors, dimensions, upsert batch size
+_MAGIC = b"RSP3"
+_UNTAGGED_MAGIC = b"RSP2"  # Earlier frames: the JSON is the bare record list
+_SUFFIX = ".spool"
+_LOCK_FILE = ".lock"
+_QUARANTINE = "quarantine"
+_MAX_RETRY_DELAY = 60.0
+
+_directory = VECTOR_SPOOL_DIR
+
+
+def configure(directory: str):
+    """Directory for spools created from now on (e.g. a temporary one for benchmarks)."""
+    global _directory
+    _directory = directory
+
+
+def encode_frame(records: Sequence[Dict], embeddings: Sequence[Sequence[float]], batch_size: int = 0,
+                 tag: str = "") -> bytes:
+    matrix = np.asarray(embeddings, dtype="<f4")
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(0, 0)
+    header = json.dumps({'tag': tag, 'records': [{k: v for k, v in record.items() if k != 'embedding'}
+                                                 for record in records]}).encode()
+    return _FRAME.pack(_MAGIC, len(header), matrix.shape[0], matrix.shape[1], batch_size) + header + matrix.tobytes()
+
+
+def _read_frames(path: str, offset: int, end: int,
+                 max_rows: int) -> Tuple[List[Dict], np.ndarray, int, Optional[str], int]:
+    """
+    Records, embeddings, their batch size and tag, and the new offset for whole
+    frames from `offset`: up to about `max_rows` rows, all with the same batch
+    size and tag.
+    """
+    records, matrices = [], []
+    batch_size = tag = None
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while offset < end and len(records) < max_rows:
+            head = f.read(_FRAME.size)
+            magic, header_size, vectors, dims, size = (_FRAME.unpack(head) if len(head) == _FRAME.size
+                                                       else (b"", 0, 0, 0, 0))
+            frame_end = offset + _FRAME.size + header_size + vectors * dims * 4
+            if magic not in (_MAGIC, _UNTAGGED_MAGIC) or frame_end > end:
+                # Torn write from a crash: nothing after it was acknowledged
+                print(f"⚠️  Spool {os.path.basename(path)}: skipping {end - offset} unreadable bytes")
+                return records, _stack(matrices), batch_size or 0, tag, end
+            header = json.loads(f.read(header_size))
+            frame_tag, frame_records = ((header['tag'], header['records']) if magic == _MAGIC
+                                        else ("", header))
+            if batch_size is not None and (size != batch_size or frame_tag != tag):
+                break  # The next pass writes it with its own batch size and tag
+            batch_size, tag = size, frame_tag
+            records.extend(frame_records)
+            if vectors:
+                matrices.append(np.frombuffer(f.read(vectors * dims * 4), dtype="<f4").reshape(vectors, dims))
+            offset = frame_end
+    return records, _stack(matrices), batch_size or 0, tag, offset
+
+
+def _stack(matrices: List[np.ndarray]) -> np.ndarray:
+    return np.vstack(matrices) if matrices else np.empty((0, 0), dtype=np.float32)
+
+
+def _segment_names(directory: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory)
+                  if name.endswith(_SUFFIX) and name[:-len(_SUFFIX)].isdigit())
+
+
+class WriteSpool:
+    """Append-only segment files drained to the database by one background thread."""
+
+    def __init__(self, sink: Callable[[List[Dict], np.ndarray, int], None], directory: str = None,
+                 segment_mb: float = VECTOR_SPOOL_SEGMENT_MB, flush_rows: int = VECTOR_SPOOL_FLUSH_ROWS,
+                 retry_delay: float = RETRY_DELAY, max_attempts: int = VECTOR_SPOOL_MAX_ATTEMPTS):
+        """
+        Args:
+            sink: Writes records, their embeddings and an upsert batch size to the database
+                  (raises on failure)
+            directory: Spool root; this process locks its own worker-N subdirectory in it
+        """
+        self.sink = sink
+        self.directory, self._lock_fd = self._claim(directory or _directory)
+        self.segment_bytes = int(segment_mb * 1024 * 1024)
+        self.flush_rows = flush_rows
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+
+        # Segments oldest first; bytes written per segment; read position in the oldest
+        names = _segment_names(self.directory)
+        self._segments = [os.path.join(self.directory, name) for name in names]
+        self._sizes = {path: os.path.getsize(path) for path in self._segments}
+        self._offset = 0
+        self._sequence = int(names[-1][:-len(_SUFFIX)]) + 1 if names else 0
+        self._file = None
+        self._file_path = None
+        self._cond = threading.Condition()
+        self._thread = None
+        # Quarantined batch files per tag, reported (and cleared) by drain(tag)
+        self._quarantined: Dict[Optional[str], List[str]] = {}
+        # Per tag: (segment sequence, offset) marks, each with a callback to run once the flusher passes it
+        self._callbacks: Dict[str, List[Tuple[Tuple[int, int], Callable[[], None]]]] = {}
+        self.stats = {'rows_written': 0, 'retries': 0, 'quarantined_batches': 0, 'last_error': None}
+        if self._segments:
+            print(f"↩️  Replaying {len(self._segments)} spool segment(s) from {self.directory}")
+            self._start()
+
+    @staticmethod
+    def _claim(root: str) -> Tuple[str, int]:
+        """Lock the first free worker-N subdirectory of `root` (held for the life of the process)."""
+        for slot in itertools.count():
+            directory = os.path.join(root, f"worker-{slot}")
+            fd = filelock.try_lock(os.path.join(directory, _LOCK_FILE))
+            if fd is not None:
+                return directory, fd
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="vector-spool", daemon=True)
+            self._thread.start()
+
+    def append(self, records: Sequence[Dict], embeddings: Sequence[Sequence[float]], batch_size: int = 0,
+               tag: str = ""):
+        """
+        Persist rows locally; they reach the database in the background, `batch_size` rows per upsert.
+
+        tag: What the rows belong to (see when_written() and drain())
+        """
+        frame = encode_frame(records, embeddings, batch_size, tag)
+        with self._cond:
+            if self._file is None or self._sizes[self._file_path] >= self.segment_bytes:
+                self._rotate()
+            self._file.write(frame)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._sizes[self._file_path] += len(frame)
+            self._start()
+            self._cond.notify_all()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._file_path = os.path.join(self.directory, f"{self._sequence:012d}{_SUFFIX}")
+        self._sequence += 1
+        self._file = open(self._file_path, "ab")
+        self._segments.append(self._file_path)
+        self._sizes[self._file_path] = 0
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                while not self._segments:
+                    self._cond.wait()
+                path, offset = self._segments[0], self._offset
+                end = self._sizes[path]
+            new_offset = tag = None
+            try:
+                records, embeddings, batch_size, tag, new_offset = _read_frames(path, offset, end, self.flush_rows)
+                if records:
+                    with metrics.span("spool_flush"):
+                        self.sink(records, embeddings, batch_size or None)
+                    self.stats['rows_written'] += len(records)
+                failures = 0
+                self.stats['last_error'] = None
+            except Exception as e:
+                failures += 1
+                self.stats['retries'] += 1
+                self.stats['last_error'] = str(e)
+                metrics.API_ERRORS.inc(service="supabase", operation="spool_flush")
+                if failures < self.max_attempts:
+                    delay = min(self.retry_delay * 2 ** (failures - 1), _MAX_RETRY_DELAY)
+                    print(f"⚠️  Spool flush failed ({e}); retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                # Unreadable frames take the rest of what was written; a failing batch just itself
+                new_offset = self._quarantine(path, offset, new_offset if new_offset is not None else end, tag, e)
+                failures = 0
+            with self._cond:
+                self._offset = new_offset
+                if new_offset >= self._sizes[path]:
+                    self._remove_segment(path)
+                self._run_callbacks()
+                self._cond.notify_all()
+
+    def _position(self) -> Optional[Tuple[int, int]]:
+        """(segment sequence, offset) of the next byte to write to the database; None if all is written."""
+        if not self._segments:
+            return None
+        return int(os.path.basename(self._segments[0])[:-len(_SUFFIX)]), self._offset
+
+    def _end_mark(self) -> Optional[Tuple[int, int]]:
+        """Position just past the last row appended (None if all is written)."""
+        if not self._segments:
+            return None
+        last = self._segments[-1]
+        return int(os.path.basename(last)[:-len(_SUFFIX)]), self._sizes[last]
+
+    def _passed(self, mark: Optional[Tuple[int, int]]) -> bool:
+        position = self._position()
+        return mark is None or position is None or mark <= position
+
+    def _run_callbacks(self):
+        """Run the callbacks whose mark the flusher has passed (caller holds the condition)."""
+        for tag in list(self._callbacks):
+            waiting = self._callbacks[tag]
+            while waiting and self._passed(waiting[0][0]):
+                _, callback = waiting.pop(0)
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"⚠️  Spool callback for {tag} failed: {e}")
+            if not waiting:
+                del self._callbacks[tag]
+
+    def when_written(self, tag: str, callback: Callable[[], None]):
+        """
+        Run `callback` once every row appended so far is written (now, if it is).
+
+        It runs on the flusher thread, and never if a batch tagged `tag` is
+        quarantined before then (or already was, and drain(tag) has not reported it).
+        """
+        with self._cond:
+            if tag in self._quarantined:
+                return
+            mark = self._end_mark()
+            if mark is None:
+                callback()
+                return
+            self._callbacks.setdefault(tag, []).append((mark, callback))
+
+    def discard(self, tag: str):
+        """Drop a tag's pending callbacks and quarantine reports (its ingest failed and will start over)."""
+        with self._cond:
+            self._callbacks.pop(tag, None)
+            self._quarantined.pop(tag, None)
+
+    def _quarantine(self, path: str, offset: int, end: int, tag: Optional[str], error: Exception) -> int:
+        """Move bytes [offset, end) of a segment aside so the flusher can go on. Returns `end`."""
+        directory = os.path.join(self.directory, _QUARANTINE)
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, f"{os.path.basename(path)[:-len(_SUFFIX)]}-{offset}{_SUFFIX}")
+        try:
+            with open(path, "rb") as source, open(target, "wb") as f:
+                source.seek(offset)
+                f.write(source.read(end - offset))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"⚠️  Could not quarantine {os.path.basename(path)}: {e}")
+        self.stats['quarantined_batches'] += 1
+        with self._cond:
+            self._quarantined.setdefault(tag, []).append(target)
+            # Rows of this tag are missing: its progress must not be recorded past them
+            self._callbacks.pop(tag, None)
+        print(f"❌ Spool batch failed {self.max_attempts} times ({error}); moved to {target}")
+        return end
+
+    def _remove_segment(self, path: str):
+        """Drop a fully written segment (the open one too: the next append starts a new file)."""
+        if path == self._file_path:
+            self._file.close()
+            self._file = self._file_path = None
+        self._segments.pop(0)
+        del self._sizes[path]
+        self._offset = 0
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def drain(self, tag: str = None, timeout: float = VECTOR_SPOOL_DRAIN_TIMEOUT):
+        """
+        Block until every row spooled so far is written or quarantined.
+
+        RuntimeError after `timeout` seconds, or if batches tagged `tag` were
+        quarantined since its last drain (their rows are not in the database).
+        Without a tag, only untagged batches are reported: tagged ones are
+        left to the ingest they belong to.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            mark = self._end_mark()
+            while not self._passed(mark):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError(f"Vector spool not drained after {timeout}s "
+                                       f"(last error: {self.stats['last_error']}); rows stay spooled")
+                self._cond.wait(remaining)
+            if tag is not None:
+                quarantined = self._quarantined.pop(tag, [])
+            else:
+                quarantined = self._quarantined.pop(None, []) + self._quarantined.pop("", [])
+        if quarantined:
+            raise RuntimeError(f"{len(quarantined)} spooled batch(es) could not be written and were "
+                               f"quarantined: {', '.join(quarantined)}")
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            pending = sum(self._sizes.values()) - self._offset
+            segments = len(self._segments)
+        return {'directory': self.directory, 'segments': segments, 'pending_bytes': pending, **self.stats}
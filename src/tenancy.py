@@ -0,0 +1,42 @@
+"""
+Namespaces and collections.
+
+Every chunk row carries a `collection` key, "<namespace>__<collection>"
+(e.g. "public__default", "acme__contracts"). The vector table is LIST
+partitioned on that key, so each collection is its own physical partition
+with its own vector index: a search prunes to one partition and its cost
+follows that collection's size, not the whole table's.
+"""
+import re
+
+from config import DB_COLLECTION_NAME
+
+DEFAULT_NAMESPACE = "public"
+DEFAULT_COLLECTION = "default"
+
+# Lowercase words joined by single underscores: "__" is reserved as the separator.
+# 20 characters each keeps partition names under Postgres' 63-character limit.
+_NAME = re.compile(r"^[a-z0-9]+(_[a-z0-9]+)*$")
+_MAX_NAME_LENGTH = 20
+
+
+def _validate(kind: str, name: str) -> str:
+    if not name or len(name) > _MAX_NAME_LENGTH or not _NAME.match(name):
+        raise ValueError(f"Invalid {kind} '{name}': use up to {_MAX_NAME_LENGTH} lowercase letters, "
+                         f"digits and single underscores")
+    return name
+
+
+def collection_key(namespace: str = None, collection: str = None) -> str:
+    """The value stored in the `collection` column for a namespace and collection."""
+    namespace = _validate("namespace", namespace or DEFAULT_NAMESPACE)
+    collection = _validate("collection", collection or DEFAULT_COLLECTION)
+    return f"{namespace}__{collection}"
+
+
+DEFAULT_KEY = collection_key()
+
+
+def partition_name(key: str, table_name: str = DB_COLLECTION_NAME) -> str:
+    """Physical partition holding one collection (matches create_collection() in SQL)."""
+    return f"{table_name}__{key}"
@@ -1,15 +1,37 @@
-from typing import List, Dict
+from typing import List
+from src.chunk import Chunk
+from src.tokenizer import get_tokenizer
 import re
 
 class TextChunker:
     """Splits text into manageable chunks with smart sentence-based chunking."""
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50,
+                 unit: str = "chars", tokenizer=None):
+        """
+        Args:
+            chunk_size: Maximum chunk length, measured in `unit`
+            chunk_overlap: Overlap between consecutive chunks, measured in `unit`
+            unit: "chars" or "tokens"
+            tokenizer: Object with count_tokens(text) (defaults to the approximate counter)
+        """
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk unit: {unit}")
+        
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.unit = unit
+        self.tokenizer = tokenizer or get_tokenizer()
     
-    def split_text(self, text: str, metadata: dict = None) -> List[Dict]:
-        """Split text into chunks using smart sentence boundaries."""
+    def split_text(self, text: str, metadata: dict = None, page: int = None) -> List[Chunk]:
+        """
+        Split text into chunks using smart sentence boundaries.
+        
+        Args:
+            text: Text to split
+            metadata: Document-level metadata, shared (not copied) by every chunk
+            page: Page number recorded on each chunk
+        """
         chunks = []
         
         # Clean the text more aggressively
@@ -19,48 +41,60 @@ class TextChunker:
             return chunks
         
         # Split by sentences first for better chunks
-        sentences = self._split_sentences(text)
+        sentences = self._split_oversized(self._split_sentences(text))
         
         # Group sentences into chunks
         current_chunk = ""
+        current_len = 0
         chunk_id = 0
         start_char = 0
         
         for sentence in sentences:
+            sentence_len = self._length(sentence)
+            
             # Check if adding this sentence would exceed chunk size
-            if len(current_chunk) + len(sentence) > self.chunk_size and current_chunk:
+            if current_len + sentence_len > self.chunk_size and current_chunk:
                 # Save current chunk
-                chunk = {
-                    'id': chunk_id,
-                    'text': current_chunk.strip(),
-                    'start_char': start_char,
-                    'end_char': start_char + len(current_chunk),
-                    'metadata': metadata or {}
-                }
-                chunks.append(chunk)
+                chunks.append(self._make_chunk(chunk_id, current_chunk, start_char, metadata, page))
                 
                 # Start new chunk with overlap
                 overlap_text = self._get_overlap(current_chunk)
                 current_chunk = overlap_text + sentence
+                current_len = self._length(current_chunk)
                 start_char += len(current_chunk) - len(overlap_text)
                 chunk_id += 1
             else:
                 current_chunk += sentence
+                current_len += sentence_len
         
         # Add final chunk
         if current_chunk.strip():
-            chunk = {
-                'id': chunk_id,
-                'text': current_chunk.strip(),
-                'start_char': start_char,
-                'end_char': start_char + len(current_chunk),
-                'metadata': metadata or {}
-            }
-            chunks.append(chunk)
-        
-        print(f"✓ Created {len(chunks)} chunks (avg: {len(text) // max(len(chunks), 1)} chars/chunk)")
+            chunks.append(self._make_chunk(chunk_id, current_chunk, start_char, metadata, page))
+        
+        avg_tokens = sum(c.token_count for c in chunks) // max(len(chunks), 1)
+        print(f"✓ Created {len(chunks)} chunks (avg: {len(text) // max(len(chunks), 1)} chars, {avg_tokens} tokens/chunk)")
         return chunks
     
+    def _make_chunk(self, chunk_id: int, chunk_text: str, start_char: int,
+                    metadata: dict, page: int) -> Chunk:
+        """Build a chunk; the token count is stored so later stages can budget without recounting."""
+        stripped = chunk_text.strip()
+        return Chunk(
+            id=chunk_id,
+            text=stripped,
+            start_char=start_char,
+            end_char=start_char + len(chunk_text),
+            token_count=self.tokenizer.count_tokens(stripped),
+            metadata=metadata,
+            page=page,
+        )
+    
+    def _length(self, text: str) -> int:
+        """Length of text in the configured unit."""
+        if self.unit == "tokens":
+            return self.tokenizer.count_tokens(text)
+        return len(text)
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text."""
         # Remove multiple spaces/newlines
@@ -83,11 +117,53 @@ class TextChunker:
         
         return sentences
     
+    def _split_oversized(self, sentences: List[str]) -> List[str]:
+        """Break over-long sentences at word boundaries, and over-long words anywhere (embedders truncate them otherwise)."""
+        # Leave room for the overlap carried into the next chunk
+        limit = max(1, self.chunk_size - self.chunk_overlap)
+        result = []
+        for sentence in sentences:
+            if self._length(sentence) <= limit:
+                result.append(sentence)
+                continue
+            
+            piece = ""
+            piece_len = 0
+            for word in sentence.split():
+                word_len = self._length(word + ' ')
+                if piece_len + word_len > limit and piece:
+                    result.append(piece)
+                    piece, piece_len = "", 0
+                if word_len > limit:
+                    # URLs, hashes, unspaced scripts: no word boundary to break at
+                    result.extend(part + ' ' for part in self._split_word(word, limit))
+                    continue
+                piece += word + ' '
+                piece_len += word_len
+            if piece:
+                result.append(piece)
+        return result
+    
+    def _split_word(self, word: str, limit: int) -> List[str]:
+        """Cut a word into pieces of at most `limit` (in the chunk unit, trailing space included)."""
+        pieces = []
+        while word:
+            # Start from the word's average length per character, then shrink until it fits
+            size = max(1, len(word) * limit // max(self._length(word + ' '), 1))
+            while size > 1 and self._length(word[:size] + ' ') > limit:
+                size = max(1, size - max(1, size // 10))
+            pieces.append(word[:size])
+            word = word[size:]
+        return pieces
+    
     def _get_overlap(self, text: str, overlap_size: int = None) -> str:
         """Get the last part of text for overlap with next chunk."""
         if overlap_size is None:
             overlap_size = self.chunk_overlap
         
+        if self.unit == "tokens":
+            return self._get_token_overlap(text, overlap_size)
+        
         if len(text) <= overlap_size:
             return text
         
@@ -103,4 +179,23 @@ class TextChunker:
         if last_space > 0:
             return text_tail[last_space:].strip() + ' '
         
-        return text_tail
\ No newline at end of file
+        return text_tail
+    
+    def _get_token_overlap(self, text: str, overlap_tokens: int) -> str:
+        """Take whole trailing words until the overlap token budget is used."""
+        if overlap_tokens <= 0:
+            return ""
+        
+        words = text.split()
+        taken = 0
+        start = len(words)
+        while start > 0:
+            word_tokens = self.tokenizer.count_tokens(words[start - 1])
+            if taken + word_tokens > overlap_tokens:
+                break
+            taken += word_tokens
+            start -= 1
+        
+        if start == len(words):
+            return ""
+        return ' '.join(words[start:]) + ' '
@@ -0,0 +1,74 @@
+"""
+Token counting for chunk sizing and prompt budgeting.
+
+Cohere's embed models and Groq's llama models both work in sub-word tokens,
+so sizing chunks in characters either under-fills the context or gets
+truncated. The default counter is a fast approximation that needs no model
+download; real tokenizers can be plugged in when installed.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Callable, List
+
+# Words, numbers and individual punctuation marks each start a new token
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class ApproxTokenizer:
+    """Offline token estimate: ~1 token per short word, long words split every N chars."""
+
+    def __init__(self, chars_per_token: float = 4.0, cache_size: int = 8192):
+        self.chars_per_token = chars_per_token
+        # Sentences are counted once while chunking and again when chunks are built
+        self._cached_count = lru_cache(maxsize=cache_size)(self._count)
+
+    def count_tokens(self, text: str) -> int:
+        """Estimate the number of tokens in text."""
+        if not text:
+            return 0
+        return self._cached_count(text)
+
+    def _count(self, text: str) -> int:
+        tokens = 0
+        for piece in _PIECE_PATTERN.findall(text):
+            tokens += max(1, math.ceil(len(piece) / self.chars_per_token))
+        return tokens
+
+
+class CallableTokenizer:
+    """Wraps any encode function (text -> list of token ids)."""
+
+    def __init__(self, encode: Callable[[str], List], cache_size: int = 8192):
+        self._cached_count = lru_cache(maxsize=cache_size)(lambda text: len(encode(text)))
+
+    def count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        return self._cached_count(text)
+
+
+def get_tokenizer(name: str = "approx"):
+    """
+    Build a tokenizer by name.
+
+    Args:
+        name: "approx" (default, offline), "tiktoken:<encoding>" or
+              "hf:<model>" (HuggingFace `tokenizers`). Falls back to the
+              approximate counter if the library is not installed.
+    """
+    if name.startswith("tiktoken:"):
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(name.split(":", 1)[1])
+            return CallableTokenizer(encoding.encode)
+        except Exception as e:
+            print(f"⚠️  tiktoken unavailable ({e}), using approximate token counts")
+    elif name.startswith("hf:"):
+        try:
+            from tokenizers import Tokenizer
+            hf_tokenizer = Tokenizer.from_pretrained(name.split(":", 1)[1])
+            return CallableTokenizer(lambda text: hf_tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            print(f"⚠️  HuggingFace tokenizer unavailable ({e}), using approximate token counts")
+    return ApproxTokenizer()
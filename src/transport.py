@@ -0,0 +1,124 @@
+"""
+Shared pooled HTTP transport for the Cohere, Groq and Supabase clients.
+
+Each SDK would otherwise build its own httpx client, connection pool and TLS
+sessions. Here one httpx.HTTPTransport (one connection pool) is shared by
+every SDK client: connections to a host are reused across services and
+threads, HTTP/2 multiplexes concurrent requests over one connection where
+the `h2` package is installed, and idle connections are kept alive between
+requests. Per-host request counts, new connections (TLS handshakes) and
+pool occupancy are exported to /metrics.
+"""
+import importlib.util
+import threading
+import weakref
+from typing import Dict
+
+import httpx
+
+from config import (
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_RETRIES,
+)
+from src import metrics
+
+HTTP_REQUESTS = metrics.Counter("rag_http_requests_total", "HTTP requests sent through the shared pool",
+                                ("host", "status"))
+HTTP_CONNECTIONS_OPENED = metrics.Counter("rag_http_connections_opened_total",
+                                          "New connections (TCP + TLS handshakes) per host", ("host",))
+HTTP_CONNECTIONS = metrics.Gauge("rag_http_connections", "Pooled connections per host", ("host",))
+
+_lock = threading.Lock()
+_transport = None
+_seen_connections = weakref.WeakSet()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install httpx[http2])."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def get_transport() -> httpx.HTTPTransport:
+    """The process-wide transport, created on first use."""
+    global _transport
+    if _transport is None:
+        with _lock:
+            if _transport is None:
+                _transport = httpx.HTTPTransport(
+                    http2=http2_available(),
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                    ),
+                    retries=HTTP_RETRIES,  # Connection failures only; SDKs retry requests themselves
+                )
+    return _transport
+
+
+def _host(origin) -> str:
+    host = origin.host
+    return host.decode() if isinstance(host, bytes) else str(host)
+
+
+def _observe_pool():
+    """Count connections the pool opened since the last look and refresh the per-host gauge."""
+    counts: Dict[str, int] = {}
+    with _lock:
+        for connection in list(get_transport()._pool.connections):
+            host = _host(connection._origin)
+            if connection not in _seen_connections:
+                _seen_connections.add(connection)
+                HTTP_CONNECTIONS_OPENED.inc(host=host)
+            counts[host] = counts.get(host, 0) + 1
+    for (host,) in list(HTTP_CONNECTIONS._values):
+        counts.setdefault(host, 0)
+    for host, count in counts.items():
+        HTTP_CONNECTIONS.set(count, host=host)
+
+
+def _on_response(response: httpx.Response):
+    HTTP_REQUESTS.inc(host=response.request.url.host, status=f"{response.status_code // 100}xx")
+    _observe_pool()
+
+
+def client(timeout: float = 30.0, **kwargs) -> httpx.Client:
+    """
+    An httpx.Client backed by the shared transport.
+
+    Clients are cheap wrappers (headers, base URL, timeout); the pool lives in
+    the transport. Do not close them: closing a client closes the shared pool.
+    """
+    return httpx.Client(
+        transport=get_transport(),
+        timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+        event_hooks={"response": [_on_response]},
+        **kwargs,
+    )
+
+
+def share_postgrest_session(supabase_client):
+    """Move a Supabase client's PostgREST session onto the shared transport."""
+    session = supabase_client.postgrest.session
+    supabase_client.postgrest.session = client(
+        timeout=session.timeout.read or 30.0,
+        base_url=session.base_url,
+        headers=session.headers,
+    )
+    return supabase_client
+
+
+def get_stats() -> Dict:
+    """Pool settings and current connections (for /health)."""
+    connections = list(_transport._pool.connections) if _transport is not None else []
+    return {
+        "http2": http2_available(),
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive": HTTP_MAX_KEEPALIVE,
+        "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+        "connections": [repr(connection) for connection in connections],
+    }
@@ -0,0 +1,54 @@
+"""
+Compact wire format for embeddings sent through PostgREST.
+
+A JSON list of Python floats spends ~20 characters per dimension
+("-0.012329101562500001"), about 8 KB per 384-dim row. pgvector also accepts
+its text literal '[0.01233,-0.004512,...]' for vector and halfvec columns
+and RPC parameters; at 4 significant digits that is ~3.3 KB per row.
+Rows are cast to float32 in one NumPy call and each row is formatted with a
+single precompiled format string instead of per-float JSON encoding.
+"""
+from functools import lru_cache
+from typing import List, Sequence
+
+import numpy as np
+
+from config import EMBEDDING_WIRE_DIGITS, EMBEDDING_WIRE_FORMAT
+
+
+@lru_cache(maxsize=8)
+def _row_format(dimensions: int, digits: int) -> str:
+    return "[" + ",".join([f"%.{digits}g"] * dimensions) + "]"
+
+
+def to_literals(embeddings: Sequence[Sequence[float]], digits: int = EMBEDDING_WIRE_DIGITS) -> List[str]:
+    """Encode a batch of embeddings as pgvector text literals."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    row_format = _row_format(matrix.shape[1], digits)
+    return [row_format % tuple(row) for row in matrix.tolist()]
+
+
+def to_literal(embedding: Sequence[float], digits: int = EMBEDDING_WIRE_DIGITS) -> str:
+    """Encode one embedding (e.g. a query vector for an RPC call)."""
+    return to_literals([embedding], digits)[0]
+
+
+def from_literal(literal: str) -> np.ndarray:
+    """Decode a pgvector text literal (as returned when selecting the column)."""
+    return np.fromstring(literal.strip("[]"), dtype=np.float32, sep=",")
+
+
+def encode_batch(embeddings: Sequence[Sequence[float]]) -> list:
+    """Embeddings in the configured wire format ("text" literals or "json" float lists)."""
+    if EMBEDDING_WIRE_FORMAT == "json":
+        return [list(embedding) for embedding in embeddings]
+    return to_literals(embeddings)
+
+
+def encode(embedding: Sequence[float]):
+    """One embedding in the configured wire format."""
+    if EMBEDDING_WIRE_FORMAT == "json":
+        return list(embedding)
+    return to_literal(embedding)
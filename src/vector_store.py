@@ -1,28 +1,111 @@
-from supabase import create_client, Client
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from src.embeddings import EmbeddingManager
+from src.chunk import Chunk
+from src import metrics
+from src import transport
+from src import vector_codec
+from src import index_manager
+from src import tenancy
+from src import routing
+from src.dedup import Deduplicator
+from src.spool import WriteSpool
+from src.document_registry import DocumentRegistry
+from config import (
+    DB_BATCH_INSERT_SIZE,
+    DB_DELETE_BATCH_SIZE,
+    DEDUP_ENABLED,
+    INDEX_META_TTL_SECONDS,
+    ROUTING_ENABLED,
+    ROUTING_TOP_DOCUMENTS,
+    VECTOR_SPOOL_ENABLED,
+    VECTOR_WRITER,
+)
 import os
-import numpy as np
+import threading
+import time
+
+# PostgREST: no function with these parameters (PGRST202); Postgres: undefined function (42883)
+_MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+
+def _missing_function(error: Exception) -> bool:
+    """Whether an RPC failed because the database function lacks the parameters sent (not a timeout or 5xx)."""
+    code = getattr(error, 'code', None)
+    return code in _MISSING_FUNCTION_CODES or any(c in str(error) for c in _MISSING_FUNCTION_CODES)
 
 class VectorStore:
-    """Manages vector database using Supabase pgvector."""
+    """Manages vector database using Supabase pgvector (one collection of the partitioned table)."""
     
-    def __init__(self, collection_name: str = "pdf_qa_collection"):
-        print("🗄️ Initializing Supabase Vector Store...")
+    def __init__(self, collection_name: str = "pdf_qa_collection", embedder: EmbeddingManager = None,
+                 collection: str = tenancy.DEFAULT_KEY, parent: "VectorStore" = None):
+        """
+        Args:
+            collection_name: Partitioned vector table
+            collection: Collection key (see src/tenancy.py); selects the partition
+            parent: Store whose Supabase client is shared (see for_collection())
+        """
+        print(f"🗄️ Initializing Supabase Vector Store ({collection})...")
         
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_ANON_KEY")
+        self._url = os.getenv("SUPABASE_URL")
+        self._key = os.getenv("SUPABASE_ANON_KEY")
         
-        if not url or not key:
+        if not self._url or not self._key:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in .env")
         
-        self.client: Client = create_client(supabase_url=url, supabase_key=key)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._parent = parent
         self.table_name = collection_name
-        self.embedder = EmbeddingManager()
+        self.collection = collection
+        self.partition = tenancy.partition_name(collection, collection_name)
+        self.embedder = embedder or EmbeddingManager()
+        self.registry = DocumentRegistry(self)
+        # Per-collection caches: index parameters and whether the partition exists
+        self._index_meta = None
+        self._index_meta_at = 0.0
+        self._partition_ready = collection == tenancy.DEFAULT_KEY  # Created by setup_supabase.sql
+        
+        # Document centroids for two-level retrieval (see src/routing.py)
+        self.centroids = routing.CentroidAccumulator()
+        self._routing = ROUTING_ENABLED
+        self._search_embeddings = True  # match_documents accepts return_embeddings (add_search_function.sql)
+        # Near-duplicate detection across this collection's chunks (see src/dedup.py)
+        self.dedup = Deduplicator() if DEDUP_ENABLED else None
+        
+        # Optional direct Postgres bulk loader (connects on first write)
+        self.writer = None
+        if VECTOR_WRITER == "postgres":
+            from src.pg_writer import PostgresWriter
+            self.writer = PostgresWriter(self.table_name)
+        
+        # Local write-ahead spool, one per table: records carry their collection,
+        # so every collection's rows drain through the first store's writer
+        self.spool = None
+        if VECTOR_SPOOL_ENABLED:
+            self.spool = parent.spool if parent is not None else WriteSpool(self.write_rows)
         
         # Create table if not exists
         self._init_table()
-        print(f"✓ Connected to Supabase: {self.table_name}")
+        print(f"✓ Supabase vector store configured: {self.table_name}")
+    
+    def for_collection(self, collection: str) -> "VectorStore":
+        """A store for another collection sharing this one's embedder and Supabase client."""
+        return VectorStore(self.table_name, embedder=self.embedder, collection=collection, parent=self)
+    
+    @property
+    def client(self):
+        """Supabase client, imported and constructed on first use (keeps cold starts fast)."""
+        if self._parent is not None:
+            return self._parent.client
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = transport.share_postgrest_session(
+                        create_client(supabase_url=self._url, supabase_key=self._key)
+                    )
+                    print(f"✓ Connected to Supabase: {self.table_name}")
+        return self._client
     
     def _init_table(self):
         """Create table with pgvector if not exists."""
@@ -37,62 +120,314 @@ class VectorStore:
         # CREATE INDEX ON pdf_qa_collection USING ivfflat (embedding vector_cosine_ops);
         pass
     
-    def add_chunks(self, chunks: List[Dict]):
-        """Add text chunks to vector store."""
+    def add_chunks(self, chunks: List[Chunk], embed_batch_size: int = 96,
+                   upsert_batch_size: int = DB_BATCH_INSERT_SIZE,
+                   duplicates: List[Tuple[Chunk, str]] = None):
+        """
+        Add text chunks to vector store.
+        
+        Args:
+            chunks: Chunks to embed and store
+            embed_batch_size: Texts per embedding API call
+            upsert_batch_size: Rows per PostgREST write (the Postgres writer uses DB_BATCH_INSERT_SIZE)
+            duplicates: (chunk, id of the row it repeats) pairs, stored without an embedding
+        """
+        duplicates = duplicates or []
         print(f"\n💾 Adding {len(chunks)} chunks to Supabase...")
+        self._ensure_partition()
         
-        texts = [chunk['text'] for chunk in chunks]
-        embeddings = self.embedder.embed_batch(texts)
+        embeddings = []
+        if chunks:
+            with metrics.span("ingest_embed"):
+                embeddings = self.embedder.embed_batch([chunk.text for chunk in chunks], batch_size=embed_batch_size)
+            metrics.TOKENS.inc(sum(chunk.token_count for chunk in chunks), kind="embedding")
+            self.centroids.add(chunks, embeddings)
+        records = ([self._to_record(chunk, None) for chunk in chunks]
+                   + [self._to_record(chunk, None, duplicate_of=original) for chunk, original in duplicates])
         
-        records = []
-        for i, chunk in enumerate(chunks):
-            records.append({
-                'id': f"chunk_{chunk['id']}_{hash(chunk['text']) % 10000}",
-                'text': chunk['text'],
-                'embedding': embeddings[i],
-                'metadata': chunk.get('metadata', {})
-            })
+        if self.spool is not None:
+            # Written by the spool's flusher (batch size travels with the rows); call flush() to wait for it
+            with metrics.span("ingest_spool"):
+                self.spool.append(records, embeddings, upsert_batch_size,
+                                  tag=self._tag(records[0]['doc_id']) if records else "")
+            print(f"✓ Spooled {len(records)} chunks for writing")
+            return
         
-        # Insert in batches of 100
-        for i in range(0, len(records), 100):
-            batch = records[i:i+100]
-            self.client.table(self.table_name).upsert(batch).execute()
+        self.write_rows(records, embeddings, upsert_batch_size)
+        print(f"✓ Added {len(chunks)} chunks successfully"
+              + (f" (+{len(duplicates)} near-duplicates as references)" if duplicates else ""))
+    
+    def write_rows(self, records: List[Dict], embeddings, batch_size: int = None):
+        """
+        Write records to the table now, bypassing the spool (which uses this as its sink).
+        
+        `embeddings` holds one vector per record without 'duplicate_of', in order;
+        `batch_size` is rows per PostgREST upsert (default DB_BATCH_INSERT_SIZE).
+        """
+        batch_size = batch_size or DB_BATCH_INSERT_SIZE
+        self._ensure_partition()
+        if self.writer is not None:
+            # Rows are buffered and loaded with COPY; the spool needs them loaded before it moves on
+            with metrics.span("ingest_copy"):
+                self.writer.write(records, embeddings)
+                if self.spool is not None:
+                    self.writer.flush()
+            print(f"✓ Queued {len(records)} chunks for bulk load")
+            return
         
-        print(f"✓ Added {len(chunks)} chunks successfully")
+        # Insert in batches; encoded embeddings exist only for the batch being sent
+        vectors = 0
+        with metrics.span("ingest_upsert"):
+            for i in range(0, len(records), batch_size):
+                batch = [dict(record) for record in records[i:i+batch_size]]
+                embedded = [record for record in batch if not record['duplicate_of']]
+                if embedded:
+                    encoded = vector_codec.encode_batch(embeddings[vectors:vectors+len(embedded)])
+                    for record, embedding in zip(embedded, encoded):
+                        record['embedding'] = embedding
+                    vectors += len(embedded)
+                metrics.API_CALLS.inc(service="supabase", operation="upsert")
+                self.client.table(self.table_name).upsert(batch).execute()
+    
+    def _ensure_partition(self):
+        """Create this collection's partition on first write (idempotent SQL function)."""
+        if self._partition_ready:
+            return
+        metrics.API_CALLS.inc(service="supabase", operation="create_collection")
+        self.client.rpc('create_collection', {'target_collection': self.collection}).execute()
+        self._partition_ready = True
+    
+    def _to_record(self, chunk: Chunk, embedding, duplicate_of: str = None) -> Dict:
+        """Convert a chunk to the row sent to Supabase (the only place JSON dicts are built).
+
+        `embedding` is None when called from add_chunks: vectors travel separately
+        (spool frames, COPY buffers) and write_rows encodes them per upsert batch
+        (see src/vector_codec.py). Near-duplicates never get one and point at the
+        row they repeat instead.
+        """
+        return {
+            'id': chunk.record_id(),
+            'text': chunk.text,
+            'embedding': embedding,
+            'metadata': chunk.record_metadata(),
+            'doc_id': chunk.metadata.get('doc_id'),
+            'collection': self.collection,
+            'duplicate_of': duplicate_of
+        }
+    
+    def save_centroids(self, doc_id: str):
+        """Store the routing centroids accumulated for one document (call after its last batch)."""
+        rows = self.centroids.pop(doc_id, self.collection)
+        if not rows:
+            return
+        try:
+            metrics.API_CALLS.inc(service="supabase", operation="centroids_upsert")
+            # Replace, not merge: the section count may differ from an earlier ingest
+            self.client.table(routing.CENTROIDS_TABLE).delete().eq('collection', self.collection).eq('doc_id', doc_id).execute()
+            self.client.table(routing.CENTROIDS_TABLE).upsert(rows).execute()
+            print(f"   🧭 Stored {len(rows)} routing centroids")
+        except Exception as e:
+            # document_centroids not created yet (run document_routing.sql); the document
+            # is still searched, just on every routed query (see add_search_function.sql)
+            metrics.API_ERRORS.inc(service="supabase", operation="centroids_upsert")
+            print(f"⚠️  Routing centroids not stored for {doc_id}: {e}")
     
-    def search(self, query: str, top_k: int = 3) -> List[Dict]:
-        """Search for relevant chunks using cosine similarity."""
+    def _tag(self, doc_id: str) -> str:
+        """Spool tag of one document's ingest into this collection."""
+        return f"{self.collection}/{doc_id}"
+    
+    def flush(self, doc_id: str = None):
+        """
+        Write every row still spooled or buffered by the bulk loader.
+        
+        With `doc_id`, raises if any of that document's spooled batches were
+        quarantined (their rows are missing; see src/spool.py).
+        """
+        if self.spool is not None:
+            with metrics.span("ingest_spool_drain"):
+                self.spool.drain(self._tag(doc_id) if doc_id is not None else None)
+        if self.writer is not None:
+            with metrics.span("ingest_copy"):
+                self.writer.flush()
+    
+    def when_written(self, doc_id: str, callback):
+        """
+        Call `callback` once every row added so far is in the database.
+        
+        Immediately without the spool (after loading the bulk loader's buffer);
+        otherwise from the spool's flusher, and never if one of the document's
+        batches is quarantined first. Used to checkpoint ingest progress.
+        """
+        if self.spool is None:
+            self.flush()
+            callback()
+            return
+        self.spool.when_written(self._tag(doc_id), callback)
+    
+    def discard_pending(self, doc_id: str):
+        """Forget a failed ingest's pending when_written() callbacks and quarantine reports."""
+        if self.spool is not None:
+            self.spool.discard(self._tag(doc_id))
+    
+    def search(self, query: str, top_k: int = 3, route_count: int = None,
+               with_embeddings: bool = False) -> List[Dict]:
+        """
+        Search for relevant chunks using cosine similarity.
+        
+        Args:
+            route_count: Documents to route the query to (default ROUTING_TOP_DOCUMENTS, 0 = search all)
+            with_embeddings: Also return each chunk's embedding (pgvector text literal) for reranking;
+                             results have 'embedding': None if the database function predates it
+        """
         print(f"🔍 Searching for: '{query}'")
         
         query_embedding = self.embedder.embed_text(query)
         
+        params = {
+            'query_embedding': vector_codec.encode(query_embedding),
+            'match_count': top_k,
+            'target_collection': self.collection  # Prunes the search to this collection's partition
+        }
+        # probes / ef_search for the recall target on whatever index is built
+        params.update(index_manager.search_params(self.index_meta(), top_k))
+        route_count = ROUTING_TOP_DOCUMENTS if route_count is None else route_count
+        if self._routing and route_count:
+            params['route_count'] = route_count
+        if with_embeddings and self._search_embeddings:
+            params['return_embeddings'] = True
+        
         # Use RPC function for vector search
-        response = self.client.rpc(
-            'match_documents',
-            {
-                'query_embedding': query_embedding,
-                'match_count': top_k
-            }
-        ).execute()
+        metrics.API_CALLS.inc(service="supabase", operation="match_documents")
+        with metrics.span("vector_search"):
+            response = None
+            while response is None:
+                try:
+                    response = self.client.rpc('match_documents', params).execute()
+                except Exception as e:
+                    # Only an older match_documents turns a feature off (for this process);
+                    # timeouts and server errors are raised as they are
+                    if not _missing_function(e):
+                        raise
+                    if 'return_embeddings' in params:
+                        # match_documents without return_embeddings (rerun add_search_function.sql)
+                        print(f"⚠️  Search embeddings unavailable ({e}); reranking by text")
+                        self._search_embeddings = False
+                        del params['return_embeddings']
+                    elif 'route_count' in params:
+                        # match_documents without route_count (run document_routing.sql)
+                        print(f"⚠️  Document routing unavailable ({e}); searching all chunks")
+                        self._routing = False
+                        del params['route_count']
+                    else:
+                        raise
         
         formatted_results = []
         for doc in response.data:
-            formatted_results.append({
+            result = {
                 'text': doc['text'],
                 'metadata': doc['metadata'],
                 'distance': 1 - doc['similarity'],  # Convert similarity to distance
                 'id': doc['id']
-            })
+            }
+            if with_embeddings:
+                result['embedding'] = doc.get('embedding')
+            formatted_results.append(result)
         
         print(f"✓ Found {len(formatted_results)} relevant chunks")
         return formatted_results
     
+    def index_meta(self, refresh: bool = False) -> Dict:
+        """
+        The vector_index_meta row for this collection's partition, cached for INDEX_META_TTL_SECONDS.
+        
+        Empty if no index was built by manage.py (or the table does not exist
+        yet), in which case search sends no index parameters.
+        """
+        if refresh or time.time() - self._index_meta_at > INDEX_META_TTL_SECONDS:
+            metrics.CACHE_MISSES.inc(cache="index_meta")
+            try:
+                metrics.API_CALLS.inc(service="supabase", operation="index_meta")
+                response = self.client.table('vector_index_meta').select('*').eq('table_name', self.partition).execute()
+                self._index_meta = response.data[0] if response.data else {}
+            except Exception:
+                self._index_meta = {}
+            self._index_meta_at = time.time()
+        else:
+            metrics.CACHE_HITS.inc(cache="index_meta")
+        return self._index_meta
+    
     def count_documents(self) -> int:
         """Get total number of chunks."""
-        response = self.client.table(self.table_name).select('id', count='exact').execute()
+        metrics.API_CALLS.inc(service="supabase", operation="count")
+        response = self.client.table(self.table_name).select('id', count='exact').eq('collection', self.collection).execute()
         return response.count
     
+    def delete_document(self, doc_id: str, batch_size: int = DB_DELETE_BATCH_SIZE) -> int:
+        """Delete one document's chunks in bounded batches. Returns the number of rows deleted."""
+        self.flush()  # Spooled rows written afterwards would bring the document back
+        total = 0
+        while True:
+            metrics.API_CALLS.inc(service="supabase", operation="delete_document")
+            deleted = self.client.rpc('delete_document_chunks',
+                                      {'target_doc_id': doc_id, 'batch_size': batch_size,
+                                       'target_collection': self.collection}).execute().data or 0
+            total += deleted
+            if deleted < batch_size:
+                break
+        self._delete_centroids(doc_id)
+        self._forget(doc_id)
+        print(f"✓ Deleted {total} chunks of document {doc_id}")
+        return total
+    
+    def _delete_centroids(self, doc_id: str = None):
+        """Drop routing centroids for one document (or the whole collection)."""
+        try:
+            metrics.API_CALLS.inc(service="supabase", operation="centroids_delete")
+            query = self.client.table(routing.CENTROIDS_TABLE).delete().eq('collection', self.collection)
+            if doc_id is not None:
+                query = query.eq('doc_id', doc_id)
+            query.execute()
+        except Exception as e:
+            print(f"⚠️  Routing centroids not deleted: {e}")
+    
+    def _forget(self, doc_id: str = None):
+        """Drop in-memory state (dedup fingerprints, centroid sums) of deleted rows."""
+        if self.dedup is not None:
+            self.dedup.forget(doc_id)
+        self.centroids.forget(doc_id)
+    
+    def truncate(self):
+        """
+        Empty the collection with TRUNCATE (instant, no per-row WAL) and drop its vector index.
+        
+        Also clears the collection's registry, routing centroids and index
+        metadata in the same transaction.
+        """
+        self.flush()
+        metrics.API_CALLS.inc(service="supabase", operation="truncate")
+        self.client.rpc('truncate_collection', {'target_collection': self.collection}).execute()
+        self.index_meta(refresh=True)
+        self._forget()
+        print("✓ Collection truncated")
+    
     def clear(self):
-        """Delete all documents."""
-        self.client.table(self.table_name).delete().neq('id', '').execute()
+        """
+        Delete all documents (row by row; prefer truncate()).
+        
+        Leaves the same state as truncate() apart from the registry (see
+        DocumentRegistry.clear): routing centroids deleted, and the emptied
+        partition's vector index and index metadata dropped.
+        """
+        self.flush()
+        metrics.API_CALLS.inc(service="supabase", operation="delete")
+        self.client.table(self.table_name).delete().eq('collection', self.collection).execute()
+        self._delete_centroids()
+        try:
+            metrics.API_CALLS.inc(service="supabase", operation="reset_index")
+            self.client.rpc('reset_collection_index', {'target_collection': self.collection}).execute()
+        except Exception as e:
+            # Older database (rerun setup_supabase.sql), or rows written since the delete
+            print(f"⚠️  Vector index not reset: {e}")
+        self.index_meta(refresh=True)
+        self._forget()
         print("✓ Collection cleared")
\ No newline at end of file
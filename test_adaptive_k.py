@@ -0,0 +1,71 @@
+"""
+Unit tests for the adaptive top_k cutoff (src/adaptive_k.py).
+
+Run with: python -m pytest test_adaptive_k.py  (or python test_adaptive_k.py)
+"""
+from src.adaptive_k import cutoff
+from src.rag_system import RAGSystem
+from src.reranker import Reranker
+from src.tokenizer import get_tokenizer
+
+
+def test_cliff_cuts_at_the_largest_drop():
+    curve = [0.90, 0.88, 0.50, 0.49, 0.48]
+    assert cutoff(curve, baseline=0.3, min_k=1, max_k=8, min_gap=0.15, mass=0.99) == (2, 'gap')
+
+
+def test_small_drops_are_not_cliffs():
+    curve = [0.90, 0.80, 0.70, 0.60, 0.50]
+    # Relevance above the baseline: 0.4, 0.3, 0.2, 0.1, 0 -> the first two hold 70%
+    assert cutoff(curve, baseline=0.5, min_k=1, max_k=8, min_gap=0.15, mass=0.6) == (2, 'mass')
+    assert cutoff(curve, baseline=0.5, min_k=1, max_k=8, min_gap=0.15, mass=0.9) == (3, 'mass')
+
+
+def test_flat_curve_keeps_everything_up_to_max_k():
+    assert cutoff([0.8] * 5, baseline=0.3, min_k=1, max_k=8, min_gap=0.15, mass=1.0) == (5, 'max')
+    assert cutoff([0.8] * 10, baseline=0.3, min_k=1, max_k=4, min_gap=0.15, mass=1.0) == (4, 'max')
+
+
+def test_min_k_is_a_floor():
+    curve = [0.95, 0.40, 0.39, 0.38]
+    assert cutoff(curve, baseline=0.3, min_k=1, max_k=8, min_gap=0.15, mass=0.8) == (1, 'gap')
+    assert cutoff(curve, baseline=0.3, min_k=2, max_k=8, min_gap=0.15, mass=0.8) == (2, 'gap')
+    assert cutoff([0.9, 0.2], baseline=0.1, min_k=3, max_k=8, min_gap=0.15, mass=0.8) == (2, 'max')
+
+
+def test_nothing_above_baseline_skips_the_mass_rule():
+    assert cutoff([0.5, 0.45, 0.4], baseline=0.6, min_k=1, max_k=8, min_gap=0.15, mass=0.5) == (3, 'max')
+
+
+class _Store:
+    def __init__(self, results):
+        self.results = results
+
+    def search(self, question, top_k, with_embeddings=False):
+        return [dict(result) for result in self.results[:top_k]]
+
+
+def test_reranker_stays_above_the_cliff():
+    # 'b' repeats 'a'; 'x' and 'y' come after the similarity cliff
+    results = [
+        {'id': 'a', 'text': 'refund policy details', 'distance': 0.10, 'embedding': [1.0, 0.0, 0.0]},
+        {'id': 'b', 'text': 'refund policy details', 'distance': 0.11, 'embedding': [1.0, 0.001, 0.0]},
+        {'id': 'x', 'text': 'shipping times', 'distance': 0.45, 'embedding': [0.0, 1.0, 0.0]},
+        {'id': 'y', 'text': 'store hours', 'distance': 0.46, 'embedding': [0.0, 0.0, 1.0]},
+    ]
+    rag = RAGSystem.__new__(RAGSystem)  # Only what _retrieve uses
+    rag.store = lambda collection=None: _Store(results)
+    rag.reranker = Reranker()
+    rag.tokenizer = get_tokenizer("approx")
+    rag.context_token_budget = 1000
+
+    mode, _, sources = rag._retrieve("refund policy", None, 0.7, None)
+    assert mode == 'pdf'
+    assert [source['id'] for source in sources] == ['a']
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
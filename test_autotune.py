@@ -0,0 +1,66 @@
+"""
+Unit tests for startup auto-tuning (src/autotune.py).
+
+Run with: python -m pytest test_autotune.py  (or python test_autotune.py)
+"""
+import os
+from unittest import mock
+
+from src import autotune
+
+_CLOUD_VARS = ("RENDER", "RAILWAY_ENVIRONMENT", "FLY_APP_NAME", "RAG_PRESET")
+
+
+def _settings(env: dict, memory_mb, cpus: float = 4.0) -> dict:
+    """effective_settings() for an environment and a detected memory limit."""
+    clean = {key: value for key, value in os.environ.items() if key not in _CLOUD_VARS}
+    with mock.patch.dict(os.environ, dict(clean, **env), clear=True), \
+            mock.patch.object(autotune, "AUTO_TUNE", True), \
+            mock.patch.object(autotune, "detect_memory_limit_mb", return_value=memory_mb), \
+            mock.patch.object(autotune, "detect_cpu_quota", return_value=cpus):
+        autotune.effective_settings.cache_clear()
+        try:
+            return autotune.effective_settings()
+        finally:
+            autotune.effective_settings.cache_clear()
+
+
+def test_render_without_cgroup_limit_uses_the_plan_limit():
+    # No cgroup limit: detection falls back to the host's physical RAM
+    settings = _settings({"RENDER": "true"}, memory_mb=16000)
+    assert settings['cloud'] == 'render_free'
+    assert settings['memory_limit_mb'] == 512
+    assert settings['preset'] == '500mb'
+    assert (settings['buffer_size'], settings['upsert_batch_size'], settings['workers']) == (20, 50, 1)
+
+
+def test_smaller_cgroup_limit_wins_over_the_plan():
+    settings = _settings({"RENDER": "true"}, memory_mb=300)
+    assert (settings['memory_limit_mb'], settings['preset']) == (300, '500mb')
+
+
+def test_presets_follow_the_memory_limit():
+    assert _settings({}, memory_mb=1024)['preset'] == '1gb'
+    assert _settings({}, memory_mb=4096)['preset'] == '2gb'
+    assert _settings({}, memory_mb=None)['preset'] == '500mb'
+
+
+def test_unknown_preset_is_rejected():
+    try:
+        _settings({"RAG_PRESET": "huge"}, memory_mb=1024)
+    except ValueError as e:
+        assert "500mb" in str(e)
+    else:
+        raise AssertionError("RAG_PRESET=huge was accepted")
+
+
+def test_workers_never_exceed_the_cap():
+    settings = _settings({"RAG_PRESET": "local_gpu"}, memory_mb=16000, cpus=16)
+    assert settings['workers'] == autotune.API_MAX_WORKERS
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,58 @@
+"""
+Unit tests for running header and footer removal (src/boilerplate.py).
+
+Run with: python -m pytest test_boilerplate.py  (or python test_boilerplate.py)
+"""
+from src.boilerplate import BoilerplateStripper, normalize
+
+
+WORDS = ["revenue", "staff", "outlook", "risks", "assets", "debt", "climate", "board", "audit"]
+
+
+def _page(number: int, body: str) -> str:
+    # Both body lines differ per page even with digits ignored
+    return f"ACME Corp Annual Report\n\n{body}\nmore about {WORDS[number]}\n\nPage {number} of 40"
+
+
+def _learned(pages: int = 5) -> BoilerplateStripper:
+    stripper = BoilerplateStripper(sample_pages=pages, edge_lines=2, min_repeats=3)
+    for number in range(1, pages + 1):
+        stripper._observe(_page(number, f"Body text on {WORDS[-number]}."))
+    return stripper
+
+
+def test_normalize_collapses_digits_case_and_spaces():
+    assert normalize("Page  3 of 40") == normalize("page 4 OF 40") == "page # of #"
+
+
+def test_strip_page_removes_header_and_footer():
+    stripper = _learned()
+    assert stripper._strip_page(_page(7, "Unseen body.")) == "Unseen body.\nmore about board"
+    assert stripper.get_stats()['lines_removed'] == 2
+
+
+def test_strip_page_stops_at_first_content_line():
+    stripper = _learned()
+    page = "Unexpected title\nACME Corp Annual Report\nBody.\nPage 9 of 40"
+    # The header is no longer at the edge; the footer still is
+    assert stripper._strip_page(page) == "Unexpected title\nACME Corp Annual Report\nBody."
+
+
+def test_strip_page_keeps_rare_lines():
+    stripper = _learned(pages=2)  # Fewer pages than min_repeats: nothing is boilerplate yet
+    page = _page(3, "Body.")
+    assert stripper._strip_page(page) == page
+    assert stripper._strip_page("") == ""
+
+
+def test_strip_keeps_page_count_and_order():
+    pages = [_page(n, f"Body on {WORDS[-n]}.") for n in range(1, 8)]
+    stripped = list(BoilerplateStripper(sample_pages=4, edge_lines=2, min_repeats=3).strip(pages))
+    assert stripped == [f"Body on {WORDS[-n]}.\nmore about {WORDS[n]}" for n in range(1, 8)]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,126 @@
+"""
+Unit tests for ingestion checkpoints and resume (src/checkpoint.py).
+
+Run with: python -m pytest test_checkpoint.py  (or python test_checkpoint.py)
+"""
+import os
+import tempfile
+
+from src.checkpoint import CheckpointStore, IngestBusy
+
+
+def test_progress_survives_a_new_attempt():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        source = os.path.join(tmp, "report.pdf")
+        open(source, "w").close()
+
+        checkpoint = store.open("doc", "public__default", source)
+        checkpoint.save(pages_committed=25, chunks=130)
+        checkpoint.fail(ConnectionError("cohere down"))
+        checkpoint.release()
+
+        [job] = store.resumable()
+        assert (job['pages_committed'], job['last_error'], job['running']) == (25, "cohere down", False)
+        assert 'centroids' not in job
+
+        checkpoint = store.open("doc", "public__default", source)
+        assert (checkpoint.pages_committed, checkpoint.state['chunks'], checkpoint.state['attempts']) == (25, 130, 2)
+        checkpoint.complete()
+        assert store.pending() == []
+
+
+def test_a_held_job_is_busy():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        checkpoint = store.open("doc", "public__default", "report.pdf")
+        checkpoint.save()
+        try:
+            store.open("doc", "public__default", "report.pdf")
+        except IngestBusy:
+            pass
+        else:
+            raise AssertionError("the job was claimed twice")
+        assert store.pending()[0]['running'] is True
+        # Other documents and collections are separate jobs
+        store.open("doc", "tenant__acme", "report.pdf").release()
+        checkpoint.release()
+        store.open("doc", "public__default", "report.pdf").release()
+
+
+def test_jobs_fail_after_max_attempts():
+    from config import INGEST_MAX_ATTEMPTS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        source = os.path.join(tmp, "report.pdf")
+        open(source, "w").close()
+        for _ in range(INGEST_MAX_ATTEMPTS):
+            checkpoint = store.open("doc", "public__default", source)
+            checkpoint.fail(TimeoutError("slow"))
+            checkpoint.release()
+        assert store.pending()[0]['status'] == 'failed'
+        assert store.resumable() == []
+
+        # A re-upload starts a new round
+        checkpoint = store.open("doc", "public__default", source)
+        assert (checkpoint.state['status'], checkpoint.state['attempts']) == ('in_progress', 1)
+        checkpoint.release()
+
+
+def test_missing_source_is_not_resumed():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(tmp)
+        checkpoint = store.open("doc", "public__default", os.path.join(tmp, "gone.pdf"))
+        checkpoint.save(pages_committed=10)
+        checkpoint.release()
+        assert store.pending()[0]['source_available'] is False
+        assert store.resumable() == []
+
+
+def test_failed_ingest_resumes_without_embedding_committed_pages():
+    from benchmarks.corpus import build_corpus
+    from benchmarks.fakes import NO_LATENCY, install_fakes
+    from src import autotune, extraction_cache, spool
+    from src.rag_system import RAGSystem
+
+    install_fakes(NO_LATENCY)
+    pdf_path = build_corpus("medium")
+    with tempfile.TemporaryDirectory() as tmp:
+        extraction_cache.configure(tmp)
+        spool.configure(os.path.join(tmp, "spool"))
+        rag = RAGSystem(collection_name="pdf_qa_collection",
+                        settings=dict(autotune.effective_settings(), buffer_size=20))
+        rag.checkpoints = CheckpointStore(os.path.join(tmp, "checkpoints"))
+        embed_batch = rag.embedder.embed_batch
+        embedded = []
+
+        def failing_embed_batch(texts, batch_size=96):
+            if len(embedded) > 300:
+                raise ConnectionError("cohere down")
+            embedded.extend(texts)
+            return embed_batch(texts, batch_size=batch_size)
+
+        rag.embedder.embed_batch = failing_embed_batch
+        try:
+            rag.ingest_pdf(pdf_path)
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("the ingest did not fail")
+        [job] = rag.checkpoints.resumable()
+        assert job['pages_committed'] > 0
+
+        embedded.clear()
+        rag.embedder.embed_batch = lambda texts, batch_size=96: embedded.extend(texts) or embed_batch(texts, batch_size)
+        summary = rag.ingest_pdf(pdf_path)
+        assert summary['resumed_after_page'] == job['pages_committed']
+        assert len(embedded) < summary['chunks']
+        assert rag.checkpoints.pending() == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
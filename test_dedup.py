@@ -0,0 +1,86 @@
+"""
+Unit tests for near-duplicate detection (src/dedup.py).
+
+Run with: python -m pytest test_dedup.py  (or python test_dedup.py)
+"""
+from src.chunk import Chunk, document_metadata
+from src.dedup import Deduplicator, _bands, fingerprint
+
+TEXT = ("This document is confidential and intended solely for the use of the "
+        "individual or entity to whom it is addressed by the sender")
+
+
+def _chunk(id: int, text: str, doc_id: str = "doc-a") -> Chunk:
+    return Chunk(id, text, 0, len(text), len(text.split()), document_metadata("a.pdf", doc_id=doc_id), page=1)
+
+
+def test_fingerprint_is_stable_and_ignores_case():
+    assert fingerprint(TEXT) == fingerprint(TEXT.upper())
+    assert fingerprint("too few words here") is None
+
+
+def test_bands_cover_all_bits_once():
+    for max_hamming in (0, 3, 7):
+        bands = _bands(max_hamming)
+        assert len(bands) == max_hamming + 1
+        covered = 0
+        for shift, mask in bands:
+            assert covered & (mask << shift) == 0
+            covered |= mask << shift
+        assert covered == (1 << 64) - 1
+
+
+def test_find_within_max_hamming():
+    dedup = Deduplicator(max_hamming=3)
+    value = fingerprint(TEXT)
+    dedup._add("original", value, "doc-a")
+    # Flip three bits in three different bands: one band still matches
+    near = value ^ (1 << 0) ^ (1 << 20) ^ (1 << 40)
+    assert dedup._find(near, "other") == "original"
+
+
+def test_find_beyond_max_hamming():
+    dedup = Deduplicator(max_hamming=3)
+    value = fingerprint(TEXT)
+    dedup._add("original", value, "doc-a")
+    # One flipped bit in every band: no band matches
+    far = value
+    for shift, _ in dedup._bands:
+        far ^= 1 << shift
+    assert dedup._find(far, "other") is None
+    # Sharing a band is not enough if the whole fingerprint is too far
+    assert dedup._find(value ^ 0xFFFF << 48, "other") is None
+
+
+def test_find_skips_own_record():
+    dedup = Deduplicator()
+    value = fingerprint(TEXT)
+    dedup._add("original", value, "doc-a")
+    assert dedup._find(value, "original") is None
+
+
+def test_split_and_forget():
+    dedup = Deduplicator()
+    first, again, short = _chunk(0, TEXT), _chunk(1, TEXT, "doc-b"), _chunk(2, "short text")
+    unique, duplicates = dedup.split([first, again, short])
+    assert unique == [first, short]
+    assert duplicates == [(again, first.record_id())]
+
+    dedup.forget("doc-a")
+    unique, duplicates = dedup.split([again])
+    assert unique == [again] and duplicates == []
+
+
+def test_oldest_fingerprints_are_evicted():
+    dedup = Deduplicator(max_fingerprints=2)
+    for i, value in enumerate((0, 0xFFFFFFFFFFFFFFFF, 0xAAAAAAAAAAAAAAAA)):
+        dedup._add(f"r{i}", value, "doc-a")
+    assert list(dedup._entries) == ["r1", "r2"]
+    assert dedup._find(0, "other") is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
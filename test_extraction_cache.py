@@ -0,0 +1,69 @@
+"""
+Unit tests for the extraction cache and its use by PDFLoader (src/extraction_cache.py).
+
+Run with: python -m pytest test_extraction_cache.py  (or python test_extraction_cache.py)
+"""
+import os
+import tempfile
+from unittest import mock
+
+from benchmarks.corpus import build_corpus
+from src import extraction_cache
+from src.pdf_loader import PDFLoader
+
+
+def _loader(starts: list) -> PDFLoader:
+    """Loader for the small corpus that records the page index each extraction starts at."""
+    loader = PDFLoader(build_corpus("small"), file_hash="small")
+    extract = loader._extract_pages
+
+    def recording(start: int = 0):
+        starts.append(start)
+        return extract(start)
+
+    loader._extract_pages = recording
+    return loader
+
+
+def test_complete_extraction_is_served_from_the_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        extraction_cache.configure(tmp)
+        starts = []
+        first = list(_loader(starts).load_streaming())
+        second = list(_loader(starts).load_streaming())
+    assert second == first and len(first) == 10
+    assert starts == [0]  # The second load parsed nothing
+
+
+def test_stopped_extraction_resumes_after_the_cached_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        extraction_cache.configure(tmp)
+        expected = list(PDFLoader(build_corpus("small"), file_hash="other").load_streaming())
+
+        starts = []
+        pages = _loader(starts).load_streaming()
+        prefix = [next(pages) for _ in range(4)]
+        pages.close()  # The ingest failed after page 4
+        assert prefix == expected[:4]
+        assert any(name.endswith(".partial.pages.z") for name in os.listdir(tmp))
+
+        assert list(_loader(starts).load_streaming()) == expected
+        assert starts == [0, 4]
+        assert not any(name.endswith(".partial.pages.z") for name in os.listdir(tmp))
+        assert list(_loader(starts).load_streaming()) == expected
+        assert starts == [0, 4]
+
+
+def test_disabled_cache_always_extracts():
+    starts = []
+    with mock.patch.object(extraction_cache, "get_cache", return_value=None):
+        list(_loader(starts).load_streaming())
+        list(_loader(starts).load_streaming())
+    assert starts == [0, 0]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
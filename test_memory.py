@@ -111,7 +111,7 @@ try:
     print(f"✅ Text chunking successful")
     print(f"   Input length: {len(test_text)} characters")
     print(f"   Chunks created: {len(chunks)}")
-    print(f"   Avg chunk size: {sum(len(c) for c in chunks) // len(chunks)} chars")
+    print(f"   Avg chunk size: {sum(len(c.text) for c in chunks) // len(chunks)} chars")
     
     memory_after_chunk = process.memory_info().rss / 1024 / 1024
     print(f"   Memory: {memory_after_chunk:.2f} MB (+{memory_after_chunk - after_import_mb:.2f} MB)")
@@ -0,0 +1,82 @@
+"""
+Unit tests for the PGCOPY binary encoder (src/pg_writer.py).
+
+Run with: python -m pytest test_pg_writer.py  (or python test_pg_writer.py)
+"""
+import json
+import struct
+
+import numpy as np
+
+from src.pg_writer import encode_rows
+
+
+def _decode(data: bytes) -> list:
+    """Parse a PGCOPY binary stream back into tuples of raw fields (None for NULL)."""
+    assert data.startswith(b"PGCOPY\n\xff\r\n\x00")
+    offset = 11 + 8  # Signature, flags and header extension length
+    rows = []
+    while True:
+        (count,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        if count == -1:
+            assert offset == len(data)
+            return rows
+        fields = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            if length == -1:
+                fields.append(None)
+                continue
+            fields.append(data[offset:offset + length])
+            offset += length
+        rows.append(fields)
+
+
+def _records():
+    return [
+        {'id': "doc-p1-c0", 'text': "Refunds take 30 days.", 'metadata': {'page': 1},
+         'doc_id': "doc", 'collection': "public__default", 'duplicate_of': None},
+        {'id': "doc-p2-c0", 'text': "Refunds take 30 days.", 'metadata': {'page': 2},
+         'doc_id': "doc", 'collection': "public__default", 'duplicate_of': "doc-p1-c0"},
+        {'id': "doc-p3-c0", 'text': "Envíos en 5 días.", 'metadata': {},
+         'doc_id': None, 'collection': "public__default", 'duplicate_of': None},
+    ]
+
+
+def test_rows_round_trip():
+    embeddings = np.array([[0.5, -1.0, 0.25], [1.0, 2.0, 3.0]], dtype=np.float32)
+    rows = _decode(encode_rows(_records(), embeddings))
+    assert len(rows) == 3 and all(len(row) == 7 for row in rows)
+
+    first, duplicate, third = rows
+    assert first[0] == b"doc-p1-c0" and first[1] == "Refunds take 30 days.".encode()
+    dimensions, unused = struct.unpack_from("!hh", first[2])
+    assert (dimensions, unused) == (3, 0)
+    assert np.frombuffer(first[2][4:], dtype=">f4").tolist() == [0.5, -1.0, 0.25]
+    assert first[3][:1] == b"\x01" and json.loads(first[3][1:]) == {'page': 1}
+    assert (first[4], first[5], first[6]) == (b"doc", b"public__default", None)
+
+    # The duplicate has no embedding and does not consume one
+    assert duplicate[2] is None and duplicate[6] == b"doc-p1-c0"
+    assert np.frombuffer(third[2][4:], dtype=">f4").tolist() == [1.0, 2.0, 3.0]
+    assert third[1].decode() == "Envíos en 5 días." and third[4] is None
+
+
+def test_halfvec_sends_two_bytes_per_element():
+    embeddings = np.array([[0.5, -1.0, 0.25], [1.0, 2.0, 3.0]], dtype=np.float32)
+    rows = _decode(encode_rows(_records(), embeddings, vector_type="halfvec"))
+    assert len(rows[0][2]) == 4 + 3 * 2
+    assert np.frombuffer(rows[0][2][4:], dtype=">f2").tolist() == [0.5, -1.0, 0.25]
+
+
+def test_empty_batch_is_header_and_trailer():
+    assert _decode(encode_rows([], np.zeros((0, 384), dtype=np.float32))) == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
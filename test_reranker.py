@@ -0,0 +1,64 @@
+"""
+Unit tests for MMR reranking (src/reranker.py).
+
+Run with: python -m pytest test_reranker.py  (or python test_reranker.py)
+"""
+from src.reranker import Reranker, terms
+
+
+def _candidate(id: str, text: str, distance: float, embedding=None) -> dict:
+    result = {'id': id, 'text': text, 'distance': distance}
+    if embedding is not None:
+        result['embedding'] = embedding
+    return result
+
+
+def test_terms_drop_stopwords_and_short_words():
+    assert terms("What is the refund policy for an order?") == {"refund", "policy", "order"}
+
+
+def test_near_copies_are_dropped():
+    candidates = [
+        _candidate("a", "refund policy text", 0.10, [1.0, 0.0, 0.0]),
+        _candidate("b", "refund policy text again", 0.11, [1.0, 0.01, 0.0]),
+        _candidate("c", "shipping times", 0.30, [0.0, 1.0, 0.0]),
+    ]
+    ranked = Reranker(redundant_similarity=0.95).rerank("refund policy", candidates, top_k=3)
+    assert [r['id'] for r in ranked] == ["a", "c"]
+    assert all('embedding' not in r and 'rerank_score' in r for r in ranked)
+
+
+def test_diversity_beats_a_slightly_closer_repeat():
+    candidates = [
+        _candidate("a", "alpha", 0.10, [1.0, 0.0]),
+        _candidate("b", "alpha", 0.12, [0.9, 0.1]),
+        _candidate("c", "beta", 0.15, [0.0, 1.0]),
+    ]
+    reranker = Reranker(mmr_lambda=0.5, lexical_weight=0.0, redundant_similarity=1.1)
+    assert [r['id'] for r in reranker.rerank("question", candidates, top_k=2)] == ["a", "c"]
+    relevance_only = Reranker(mmr_lambda=1.0, lexical_weight=0.0, redundant_similarity=1.1)
+    assert [r['id'] for r in relevance_only.rerank("question", candidates, top_k=2)] == ["a", "b"]
+
+
+def test_question_terms_lift_relevance():
+    candidates = [_candidate("a", "unrelated words", 0.20), _candidate("b", "warranty period details", 0.22)]
+    ranked = Reranker(lexical_weight=0.5).rerank("warranty period", candidates, top_k=1)
+    assert [r['id'] for r in ranked] == ["b"]
+
+
+def test_without_embeddings_word_overlap_is_used():
+    candidates = [
+        _candidate("a", "battery life hours charging", 0.10),
+        _candidate("b", "battery life hours charging", 0.11),
+        _candidate("c", "screen size inches", 0.40),
+    ]
+    ranked = Reranker(redundant_similarity=0.95).rerank("battery", candidates, top_k=3)
+    assert [r['id'] for r in ranked] == ["a", "c"]
+    assert Reranker().rerank("anything", [], top_k=3) == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,79 @@
+"""
+Unit tests for collection snapshots (src/snapshot.py).
+
+Run with: python -m pytest test_snapshot.py  (or python test_snapshot.py)
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.corpus import build_corpus
+from benchmarks.fakes import NO_LATENCY, install_fakes
+from src import extraction_cache, snapshot, spool
+from src.checkpoint import CheckpointStore
+from src.document_registry import REGISTRY_TABLE
+from src.rag_system import RAGSystem
+from src.snapshot import _decode_embedding
+
+
+def _rows(db, collection: str) -> dict:
+    return {row['id']: row for row in db.tables["pdf_qa_collection"].values() if row['collection'] == collection}
+
+
+def test_export_and_import_round_trip():
+    fakes = install_fakes(NO_LATENCY)
+    db = fakes["supabase"]
+    with tempfile.TemporaryDirectory() as tmp:
+        extraction_cache.configure(tmp)
+        spool.configure(os.path.join(tmp, "spool"))
+        rag = RAGSystem(collection_name="pdf_qa_collection")
+        rag.checkpoints = CheckpointStore(os.path.join(tmp, "checkpoints"))
+        rag.ingest_pdf(build_corpus("small"))
+        source = rag.store()
+        exported = _rows(db, source.collection)
+
+        # Pages smaller than the collection: export and import both page through it
+        manifest = snapshot.export_collection(source, os.path.join(tmp, "snap"), batch_rows=7)
+        assert manifest['rows'] == len(exported) and manifest['dimensions'] == 384
+        target = rag.store("tenant__copy")
+        embed_calls = fakes["cohere"].calls
+        summary = snapshot.import_collection(target, os.path.join(tmp, "snap"), batch_rows=7)
+        assert summary['rows'] == len(exported) and summary['documents'] == 1
+        assert fakes["cohere"].calls == embed_calls  # Nothing was embedded again
+
+    imported = _rows(db, "tenant__copy")
+    assert imported.keys() == exported.keys()
+    for row_id, row in exported.items():
+        copy = imported[row_id]
+        assert (copy['text'], copy['metadata'], copy['doc_id'], copy['duplicate_of']) == \
+            (row['text'], row['metadata'], row['doc_id'], row['duplicate_of'])
+        if row['duplicate_of']:
+            assert copy['embedding'] is None
+        else:
+            np.testing.assert_allclose(_decode_embedding(copy['embedding']), _decode_embedding(row['embedding']),
+                                       rtol=1e-3, atol=1e-6)
+    registry = [row for row in db.tables[REGISTRY_TABLE].values() if row['collection'] == "tenant__copy"]
+    assert len(registry) == 1
+
+
+def test_snapshot_from_another_model_is_rejected():
+    install_fakes(NO_LATENCY)
+    with tempfile.TemporaryDirectory() as tmp:
+        spool.configure(os.path.join(tmp, "spool"))
+        store = RAGSystem(collection_name="pdf_qa_collection").store()
+        snapshot.export_collection(store, tmp)
+        store.embedder.model_name = "embed-other-v9"
+        try:
+            snapshot.import_collection(store, tmp)
+        except ValueError as e:
+            assert "embed-other-v9" in str(e)
+        else:
+            raise AssertionError("a snapshot from another embedding model was imported")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,176 @@
+"""
+Unit tests for the vector write spool (src/spool.py).
+
+Run with: python -m pytest test_spool.py  (or python test_spool.py)
+"""
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from src.spool import WriteSpool, _read_frames, encode_frame
+
+RECORDS = [{'id': 'a', 'text': 'first'}, {'id': 'b', 'text': 'second', 'duplicate_of': 'a'}]
+EMBEDDINGS = [[0.25, -1.0, 3.5]]  # One per record without 'duplicate_of'
+
+
+def _write(path: str, *frames: bytes) -> int:
+    with open(path, "ab") as f:
+        for frame in frames:
+            f.write(frame)
+    return os.path.getsize(path)
+
+
+def test_frame_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "000000000000.spool")
+        end = _write(path, encode_frame(RECORDS, EMBEDDINGS, 50))
+        records, embeddings, batch_size, tag, offset = _read_frames(path, 0, end, 100)
+    assert records == RECORDS and batch_size == 50 and tag == "" and offset == end
+    assert embeddings.dtype == np.float32 and embeddings.tolist() == EMBEDDINGS
+
+
+def test_frames_are_grouped_by_batch_size_and_tag():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "000000000000.spool")
+        first = encode_frame(RECORDS[:1], EMBEDDINGS, 50, "doc-a")
+        end = _write(path, first, first, encode_frame(RECORDS[:1], EMBEDDINGS, 10, "doc-a"),
+                     encode_frame(RECORDS[:1], EMBEDDINGS, 10, "doc-b"))
+        records, embeddings, batch_size, tag, offset = _read_frames(path, 0, end, 100)
+        assert (len(records), embeddings.shape, batch_size, tag) == (2, (2, 3), 50, "doc-a")
+        records, _, batch_size, tag, offset = _read_frames(path, offset, end, 100)
+        assert (len(records), batch_size, tag) == (1, 10, "doc-a")
+        records, _, batch_size, tag, offset = _read_frames(path, offset, end, 100)
+    assert (len(records), batch_size, tag, offset) == (1, 10, "doc-b", end)
+
+
+def test_torn_frame_is_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "000000000000.spool")
+        frame = encode_frame(RECORDS, EMBEDDINGS)
+        end = _write(path, frame, frame[:-5])
+        records, _, _, _, offset = _read_frames(path, 0, end, 100)
+    assert records == RECORDS and offset == end
+
+
+def test_leftover_segments_are_replayed():
+    written = []
+    with tempfile.TemporaryDirectory() as tmp:
+        worker = os.path.join(tmp, "worker-0")
+        os.makedirs(worker)
+        _write(os.path.join(worker, "000000000003.spool"), encode_frame(RECORDS, EMBEDDINGS, 7))
+        spool = WriteSpool(lambda records, emb, size: written.append((records, size)), tmp)
+        spool.drain(timeout=5)
+        assert os.listdir(worker) == [".lock"]
+        spool.append(RECORDS[:1], EMBEDDINGS)
+        spool.drain(timeout=5)
+    assert written == [(RECORDS, 7), (RECORDS[:1], None)]
+
+
+def _expect_quarantined(spool: WriteSpool, tag: str):
+    try:
+        spool.drain(tag, timeout=5)
+    except RuntimeError as e:
+        assert "quarantined" in str(e)
+    else:
+        raise AssertionError("drain() did not report the quarantined batch")
+
+
+def test_failing_batch_is_quarantined_for_its_tag_only():
+    written, committed = [], []
+
+    def sink(records, embeddings, batch_size):
+        if records[0]['id'] == 'a':
+            raise ConnectionError("boom")
+        written.append(records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = WriteSpool(sink, tmp, retry_delay=0, max_attempts=2)
+        spool.append(RECORDS[:1], EMBEDDINGS, 1, tag="doc-a")
+        spool.when_written("doc-a", lambda: committed.append("doc-a"))
+        spool.append([{'id': 'c', 'text': 'third'}], EMBEDDINGS, 2, tag="doc-b")
+        spool.when_written("doc-b", lambda: committed.append("doc-b"))
+        spool.drain(timeout=5)  # Another document's failure is not reported (or cleared) here
+        spool.drain("doc-b", timeout=5)
+        _expect_quarantined(spool, "doc-a")
+        quarantine = os.path.join(spool.directory, "quarantine")
+        [name] = os.listdir(quarantine)
+        path = os.path.join(quarantine, name)
+        records, _, _, tag, _ = _read_frames(path, 0, os.path.getsize(path), 100)
+        assert records == RECORDS[:1] and tag == "doc-a"
+        spool.drain("doc-a", timeout=5)  # Reported once
+    assert written == [[{'id': 'c', 'text': 'third'}]]
+    assert committed == ["doc-b"]  # doc-a's progress never counts the missing rows
+    assert spool.get_stats()['quarantined_batches'] == 1
+
+
+def test_when_written_waits_for_the_flusher():
+    committed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = WriteSpool(lambda *args: None, tmp)
+        spool.when_written("doc-a", lambda: committed.append(1))
+        assert committed == [1]  # Nothing spooled: right away
+        spool.append(RECORDS, EMBEDDINGS, tag="doc-a")
+        spool.when_written("doc-a", lambda: committed.append(2))
+        spool.drain("doc-a", timeout=5)
+    assert committed == [1, 2]
+
+
+def test_processes_get_separate_directories():
+    with tempfile.TemporaryDirectory() as tmp:
+        first = WriteSpool(lambda *args: None, tmp)
+        second = WriteSpool(lambda *args: None, tmp)
+        assert (os.path.basename(first.directory), os.path.basename(second.directory)) == ("worker-0", "worker-1")
+
+
+def test_quarantined_batch_is_redone_on_resume():
+    from benchmarks.corpus import build_corpus
+    from benchmarks.fakes import NO_LATENCY, install_fakes
+    from src import autotune, extraction_cache, spool
+    from src.checkpoint import CheckpointStore
+    from src.rag_system import RAGSystem
+
+    fakes = install_fakes(NO_LATENCY)
+    pdf_path = build_corpus("medium")
+    with tempfile.TemporaryDirectory() as tmp:
+        extraction_cache.configure(tmp)
+        spool.configure(os.path.join(tmp, "spool"))
+        # Small batches: checkpoints fall inside the document, one frame per flusher pass
+        rag = RAGSystem(collection_name="pdf_qa_collection",
+                        settings=dict(autotune.effective_settings(), buffer_size=20))
+        rag.checkpoints = CheckpointStore(os.path.join(tmp, "checkpoints"))
+        writer = rag.vector_store.spool
+        write_rows = writer.sink
+        writer.max_attempts, writer.retry_delay, writer.flush_rows = 1, 0, 1
+
+        def sink(records, embeddings, batch_size):
+            if any("-p40-" in record['id'] for record in records):
+                raise ConnectionError("boom")
+            write_rows(records, embeddings, batch_size)
+
+        writer.sink = sink
+        try:
+            rag.ingest_pdf(pdf_path)
+        except RuntimeError as e:
+            assert "quarantined" in str(e)
+        else:
+            raise AssertionError("the ingest did not fail")
+        [job] = rag.checkpoints.pending()
+        assert 0 < job['pages_committed'] < 40  # Later batches were written, but page 40 was not
+
+        writer.sink = write_rows
+        summary = rag.ingest_pdf(pdf_path)
+        assert summary['resumed_after_page'] == job['pages_committed']
+        assert rag.checkpoints.pending() == []
+
+    rows = fakes["supabase"].tables["pdf_qa_collection"].values()
+    pages = {int(re.search(r"-p(\d+)-", row['id']).group(1)) for row in rows}
+    assert pages == set(range(1, summary['pages'] + 1))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
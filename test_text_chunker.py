@@ -0,0 +1,85 @@
+"""
+Unit tests for token counting and chunking in either unit (src/tokenizer.py, src/text_chunker.py).
+
+Run with: python -m pytest test_text_chunker.py  (or python test_text_chunker.py)
+"""
+from benchmarks.fakes import NO_LATENCY, install_fakes
+from src import autotune
+from src.rag_system import RAGSystem
+from src.text_chunker import TextChunker
+from src.tokenizer import ApproxTokenizer, CallableTokenizer, get_tokenizer
+
+_TEXT = " ".join(f"Sentence number {i} talks about refunds and shipping." for i in range(60))
+
+
+def test_approx_tokenizer_counts_words_and_punctuation():
+    tokenizer = ApproxTokenizer()
+    assert tokenizer.count_tokens("") == 0
+    assert tokenizer.count_tokens("The cat sat.") == 4
+    assert tokenizer.count_tokens("Hello, world!") == 6  # 2 + 1 + 2 + 1
+    # Long words cost one token per 4 characters
+    assert tokenizer.count_tokens("internationalization") == 5
+
+
+def test_callable_tokenizer_counts_encoded_ids():
+    tokenizer = CallableTokenizer(lambda text: text.split())
+    assert tokenizer.count_tokens("one two three") == 3
+    assert tokenizer.count_tokens("") == 0
+
+
+def test_unknown_tokenizer_library_falls_back_to_approx():
+    assert isinstance(get_tokenizer("approx"), ApproxTokenizer)
+    assert isinstance(get_tokenizer("hf:no-such/model-for-tests"), ApproxTokenizer)
+
+
+def test_token_chunks_fit_the_token_size():
+    tokenizer = get_tokenizer("approx")
+    chunker = TextChunker(chunk_size=40, chunk_overlap=8, unit="tokens", tokenizer=tokenizer)
+    chunks = chunker.split_text(_TEXT, page=3)
+    assert len(chunks) > 5
+    assert all(chunk.token_count <= 40 for chunk in chunks)
+    assert all(chunk.token_count == tokenizer.count_tokens(chunk.text) for chunk in chunks)
+    assert all(chunk.page == 3 for chunk in chunks)
+
+
+def test_char_chunks_fit_the_char_size():
+    chunks = TextChunker(chunk_size=200, chunk_overlap=30, unit="chars").split_text(_TEXT)
+    assert len(chunks) > 5
+    assert all(len(chunk.text) <= 200 for chunk in chunks)
+
+
+def test_long_words_are_split():
+    chunker = TextChunker(chunk_size=20, chunk_overlap=4, unit="tokens")
+    chunks = chunker.split_text("x" * 400)
+    # Pieces (repeated only by the overlap) cover the whole word
+    assert len({piece for chunk in chunks for piece in chunk.text.split()}) > 1
+    assert sum(len(chunk.text.replace(" ", "")) for chunk in chunks) >= 400
+    assert all(chunk.token_count <= 20 for chunk in chunks)
+
+
+def test_unknown_unit_is_rejected():
+    try:
+        TextChunker(unit="words")
+    except ValueError as e:
+        assert "words" in str(e)
+    else:
+        raise AssertionError("unit='words' was accepted")
+
+
+def test_unit_override_uses_the_tuned_size_in_that_unit():
+    install_fakes(NO_LATENCY)
+    settings = dict(autotune.static_settings(), chunk_size=128, chunk_unit="tokens")
+    chunker = RAGSystem(collection_name="pdf_qa_collection", settings=settings, chunk_unit="chars").chunker
+    assert (chunker.unit, chunker.chunk_size) == ("chars", autotune.chunk_size_in(128, "tokens", "chars"))
+
+    settings = dict(settings, chunk_size=400, chunk_unit="chars")
+    chunker = RAGSystem(collection_name="pdf_qa_collection", settings=settings, chunk_unit="tokens").chunker
+    assert (chunker.unit, chunker.chunk_size) == ("tokens", autotune.chunk_size_in(400, "chars", "tokens"))
+    assert chunker.split_text(_TEXT)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,48 @@
+"""
+Unit tests for the embedding wire format (src/vector_codec.py).
+
+Run with: python -m pytest test_vector_codec.py  (or python test_vector_codec.py)
+"""
+import json
+from unittest import mock
+
+import numpy as np
+
+from src import vector_codec
+
+
+def test_literals_round_trip_within_the_precision():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(scale=0.05, size=(3, 384)).astype(np.float32)
+    literals = vector_codec.to_literals(embeddings, digits=4)
+    assert len(literals) == 3
+    for literal, embedding in zip(literals, embeddings):
+        assert literal.startswith("[") and literal.endswith("]")
+        decoded = vector_codec.from_literal(literal)
+        assert decoded.shape == (384,)
+        np.testing.assert_allclose(decoded, embedding, rtol=1e-3, atol=1e-6)
+
+
+def test_literal_is_much_smaller_than_json():
+    embedding = np.random.default_rng(1).normal(scale=0.05, size=384).tolist()
+    assert len(vector_codec.to_literal(embedding, digits=4)) < len(json.dumps(embedding)) / 2
+
+
+def test_single_vector_is_one_row():
+    assert vector_codec.to_literal([0.5, -0.25, 1.0]) == "[0.5,-0.25,1]"
+    assert vector_codec.to_literals(np.array([0.5, -0.25])) == ["[0.5,-0.25]"]
+
+
+def test_json_wire_format_sends_float_lists():
+    with mock.patch.object(vector_codec, "EMBEDDING_WIRE_FORMAT", "json"):
+        assert vector_codec.encode([0.5, 1.0]) == [0.5, 1.0]
+        assert vector_codec.encode_batch([[0.5], [1.0]]) == [[0.5], [1.0]]
+    with mock.patch.object(vector_codec, "EMBEDDING_WIRE_FORMAT", "text"):
+        assert vector_codec.encode([0.5, 1.0]) == "[0.5,1]"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
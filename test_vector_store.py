@@ -0,0 +1,112 @@
+"""
+Unit tests for VectorStore.search: fallbacks and routing (src/vector_store.py).
+
+Run with: python -m pytest test_vector_store.py  (or python test_vector_store.py)
+"""
+import numpy as np
+from postgrest.exceptions import APIError
+
+from benchmarks.fakes import NO_LATENCY, install_fakes
+from src.vector_store import VectorStore
+
+
+def _store_failing_with(error: Exception):
+    """A store whose first match_documents call raises `error` (later calls go to the fake)."""
+    fakes = install_fakes(NO_LATENCY)
+    db = fakes["supabase"]
+    store = VectorStore("pdf_qa_collection")
+    calls = []
+    rpc = db.rpc
+
+    def failing_rpc(name, params=None):
+        if name == 'match_documents':
+            calls.append(dict(params))
+            if len(calls) == 1:
+                raise error
+        return rpc(name, params)
+
+    db.rpc = failing_rpc
+    return store, calls
+
+
+def test_older_function_turns_the_feature_off():
+    store, calls = _store_failing_with(APIError({'code': 'PGRST202', 'message': 'Could not find the function'}))
+    store.search("question", top_k=3, with_embeddings=True)
+    assert store._search_embeddings is False and store._routing is True
+    assert 'return_embeddings' in calls[0] and 'return_embeddings' not in calls[1]
+
+
+def test_transient_errors_are_raised_and_change_nothing():
+    store, calls = _store_failing_with(APIError({'code': '57014', 'message': 'canceling statement due to statement timeout'}))
+    try:
+        store.search("question", top_k=3, with_embeddings=True)
+    except APIError:
+        pass
+    else:
+        raise AssertionError("the timeout was swallowed")
+    assert store._search_embeddings is True and store._routing is True
+    assert len(calls) == 1
+
+
+def test_documents_without_centroids_are_always_searched():
+    fakes = install_fakes(NO_LATENCY)
+    db = fakes["supabase"]
+    store = VectorStore("pdf_qa_collection")
+    rng = np.random.default_rng(0)
+    chunks, centroids = db.tables.setdefault("pdf_qa_collection", {}), db.tables.setdefault("document_centroids", {})
+    for doc_id in ("doc-a", "doc-b", "doc-c"):
+        vector = rng.normal(size=384).astype(np.float32)
+        chunks[("public__default", f"{doc_id}-p1-c0")] = {
+            'id': f"{doc_id}-p1-c0", 'text': doc_id, 'metadata': {}, 'doc_id': doc_id,
+            'collection': "public__default", 'embedding': vector, 'duplicate_of': None}
+        if doc_id != "doc-c":  # doc-c's centroids failed to save
+            centroids[("public__default", doc_id, 0)] = {
+                'collection': "public__default", 'doc_id': doc_id, 'section': 0, 'embedding': vector}
+
+    found = {result['text'] for result in store.search("question", top_k=10, route_count=1)}
+    assert "doc-c" in found and len(found) == 2
+
+
+def test_clear_without_truncate_resets_the_whole_collection():
+    import os
+    import tempfile
+
+    from benchmarks.corpus import build_corpus
+    from src import extraction_cache, spool
+    from src.checkpoint import CheckpointStore
+    from src.rag_system import RAGSystem
+
+    fakes = install_fakes(NO_LATENCY)
+    db = fakes["supabase"]
+
+    def permission_denied(db, **params):
+        raise APIError({'code': '42501', 'message': 'permission denied for function truncate_collection'})
+
+    db.functions["truncate_collection"] = permission_denied  # The anon key
+    with tempfile.TemporaryDirectory() as tmp:
+        extraction_cache.configure(tmp)
+        spool.configure(os.path.join(tmp, "spool"))
+        rag = RAGSystem(collection_name="pdf_qa_collection")
+        rag.checkpoints = CheckpointStore(os.path.join(tmp, "checkpoints"))
+        rag.ingest_pdf(build_corpus("small"))
+        store = rag.store()
+        partition = ("pdf_qa_collection__public__default",)
+        db.tables.setdefault("vector_index_meta", {})[partition] = {
+            'table_name': partition[0], 'index_type': 'ivfflat', 'lists': 4}
+        assert store.index_meta(refresh=True)['index_type'] == 'ivfflat'
+        store.centroids.restore("in-flight", {'0': {'chunks': 1, 'sum': [1.0] * 384}})
+
+        assert rag.clear()['method'] == 'delete'
+
+    for table in ("pdf_qa_collection", "document_registry", "document_centroids", "vector_index_meta"):
+        assert not db.tables.get(table), table
+    assert store.index_meta() == {}
+    assert store.dedup is None or not store.dedup._entries
+    assert store.centroids.state("in-flight") == {}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")